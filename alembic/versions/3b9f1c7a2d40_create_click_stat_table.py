@@ -0,0 +1,36 @@
+"""Create click_stat table
+
+Revision ID: 3b9f1c7a2d40
+Revises: e8e4007256c4
+Create Date: 2026-10-18 19:52:31.418207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9f1c7a2d40"
+down_revision: Union[str, Sequence[str], None] = "e8e4007256c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "click_stat",
+        sa.Column("link_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("clicks", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["link_id"], ["link.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("link_id", "bucket"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("click_stat")
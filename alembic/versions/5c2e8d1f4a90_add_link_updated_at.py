@@ -0,0 +1,32 @@
+"""Add link updated_at
+
+Revision ID: 5c2e8d1f4a90
+Revises: 3b9f1c7a2d40
+Create Date: 2026-10-18 21:14:08.530611
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c2e8d1f4a90"
+down_revision: Union[str, Sequence[str], None] = "3b9f1c7a2d40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: no table rewrite on Postgres
+    op.add_column("link", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.create_index(op.f("ix_link_updated_at"), "link", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_link_updated_at"), table_name="link")
+    op.drop_column("link", "updated_at")
@@ -0,0 +1,38 @@
+"""Create rate_limit table
+
+Revision ID: 7a3d9e2b6c15
+Revises: 5c2e8d1f4a90
+Create Date: 2026-10-18 23:02:47.193054
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a3d9e2b6c15"
+down_revision: Union[str, Sequence[str], None] = "5c2e8d1f4a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Written on every limited request: UNLOGGED skips the WAL, the rows are
+    # truncated after a crash and not replicated, which only resets limits
+    prefixes = ["UNLOGGED"] if op.get_bind().dialect.name == "postgresql" else []
+    op.create_table(
+        "rate_limit",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("tat", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+        prefixes=prefixes,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("rate_limit")
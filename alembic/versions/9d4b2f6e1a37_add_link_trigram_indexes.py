@@ -0,0 +1,53 @@
+"""Add link trigram indexes
+
+Revision ID: 9d4b2f6e1a37
+Revises: 7a3d9e2b6c15
+Create Date: 2026-10-18 23:41:05.518302
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4b2f6e1a37"
+down_revision: Union[str, Sequence[str], None] = "7a3d9e2b6c15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Serve the LIKE/ILIKE patterns of GET /api/links?q= (app/search.py)
+INDEXES = {
+    "ix_link_short_name_trgm": "short_name",
+    "ix_link_original_url_trgm": "original_url",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm only exists on Postgres, SQLite searches by scanning
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps the table writable while the indexes build, which
+    # takes minutes on millions of links. It cannot run in a transaction,
+    # and a failed build leaves an invalid index behind, dropped first.
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES.items():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY {name} "
+                f"ON link USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,238 @@
+"""Move link URLs to destination
+
+Revision ID: b5e1c8a3f702
+Revises: 9d4b2f6e1a37
+Create Date: 2026-10-19 00:24:51.730916
+
+Expand step: original_url stays, now nullable, for instances of the
+previous app version. A trigger keeps it and destination_id in step until
+the contract revision (f3a9c6d2b184) drops it.
+
+"""
+
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e1c8a3f702"
+down_revision: Union[str, Sequence[str], None] = "9d4b2f6e1a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# Postgres only. Rows written by the previous app version (original_url
+# only) get their destination interned, with the same hash as url_hash();
+# rows written by this one (destination_id only) get original_url, which
+# the previous version reads.
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION link_sync_destination() RETURNS trigger AS $$
+BEGIN
+    IF NEW.original_url IS NOT NULL AND (
+        (TG_OP = 'INSERT' AND NEW.destination_id IS NULL)
+        OR (TG_OP = 'UPDATE'
+            AND NEW.original_url IS DISTINCT FROM OLD.original_url
+            AND NEW.destination_id IS NOT DISTINCT FROM OLD.destination_id)
+    ) THEN
+        INSERT INTO destination (url, url_hash)
+        VALUES (
+            NEW.original_url,
+            substring(sha256(convert_to(NEW.original_url, 'UTF8')) FROM 1 FOR 16)
+        )
+        ON CONFLICT (url_hash) DO NOTHING;
+        SELECT id INTO NEW.destination_id FROM destination
+        WHERE url_hash = substring(
+            sha256(convert_to(NEW.original_url, 'UTF8')) FROM 1 FOR 16
+        );
+    ELSIF NEW.destination_id IS NOT NULL AND (
+        (TG_OP = 'INSERT' AND NEW.original_url IS NULL)
+        OR (TG_OP = 'UPDATE'
+            AND NEW.destination_id IS DISTINCT FROM OLD.destination_id
+            AND NEW.original_url IS NOT DISTINCT FROM OLD.original_url)
+    ) THEN
+        SELECT url INTO NEW.original_url FROM destination
+        WHERE id = NEW.destination_id;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+SYNC_TRIGGER = (
+    "CREATE TRIGGER link_sync_destination BEFORE INSERT OR UPDATE ON link "
+    "FOR EACH ROW EXECUTE FUNCTION link_sync_destination()"
+)
+
+link = sa.table(
+    "link",
+    sa.column("id", sa.Integer),
+    sa.column("original_url", sa.String),
+    sa.column("destination_id", sa.Integer),
+)
+destination = sa.table(
+    "destination",
+    sa.column("id", sa.Integer),
+    sa.column("url", sa.String),
+    sa.column("url_hash", sa.LargeBinary),
+)
+
+
+def url_hash(url: str) -> bytes:
+    # Must stay the same as app.destinations.url_hash
+    return hashlib.sha256(url.encode()).digest()[:16]
+
+
+def backfill(connection, commit: bool):
+    # Points links without a destination_id at the destination of their
+    # URL, BATCH_SIZE links per transaction. The URLs were normalized by
+    # LinkCreate when stored, so they are interned as they are.
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    update = (
+        link.update()
+        .where(link.c.id == sa.bindparam("link_id"))
+        .values(destination_id=sa.bindparam("new_destination_id"))
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(link.c.id, link.c.original_url)
+            .where(link.c.id > last_id, link.c.destination_id.is_(None))
+            .order_by(link.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+
+        hashes = {url_hash(url): url for _, url in rows}
+        connection.execute(
+            insert(destination)
+            .values([{"url": url, "url_hash": h} for h, url in hashes.items()])
+            .on_conflict_do_nothing(index_elements=["url_hash"])
+        )
+        destination_ids = dict(
+            connection.execute(
+                sa.select(destination.c.url_hash, destination.c.id).where(
+                    destination.c.url_hash.in_(list(hashes))
+                )
+            ).all()
+        )
+        connection.execute(
+            update,
+            [
+                {
+                    "link_id": link_id,
+                    "new_destination_id": destination_ids[url_hash(url)],
+                }
+                for link_id, url in rows
+            ],
+        )
+        if commit:
+            connection.commit()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "destination",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("url", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("url_hash", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_destination_url_hash"), "destination", ["url_hash"], unique=True
+    )
+    op.add_column("link", sa.Column("destination_id", sa.Integer(), nullable=True))
+
+    if op.get_bind().dialect.name != "postgresql":
+        backfill(op.get_bind(), commit=False)
+        with op.batch_alter_table("link") as batch_op:
+            batch_op.alter_column("original_url", nullable=True)
+            batch_op.alter_column("destination_id", nullable=False)
+            batch_op.create_foreign_key(
+                "link_destination_id_fkey", "destination", ["destination_id"], ["id"]
+            )
+            batch_op.create_index(
+                op.f("ix_link_destination_id"), ["destination_id"], unique=False
+            )
+        return
+
+    # Online on Postgres: both app versions keep serving (and creating)
+    # links while the batches run, each in its own transaction on a
+    # connection of its own. The DDL above and the trigger are committed
+    # when the block starts, so every later write is synced by the trigger
+    # and the backfill only has to cover the rows from before.
+    op.alter_column("link", "original_url", nullable=True)
+    op.execute(SYNC_FUNCTION)
+    op.execute(SYNC_TRIGGER)
+    with op.get_context().autocommit_block():
+        with op.get_bind().engine.connect() as connection:
+            backfill(connection, commit=True)
+
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_link_destination_id "
+            "ON link (destination_id)"
+        )
+        # Replaces ix_link_original_url_trgm for GET /api/links?q=
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_destination_url_trgm "
+            "ON destination USING gin (url gin_trgm_ops)"
+        )
+
+    op.execute(
+        "ALTER TABLE link ADD CONSTRAINT link_destination_id_fkey "
+        "FOREIGN KEY (destination_id) REFERENCES destination (id) NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE link ADD CONSTRAINT link_destination_id_not_null "
+        "CHECK (destination_id IS NOT NULL) NOT VALID"
+    )
+
+    # Validation scans the table but does not block writes, and a valid
+    # CHECK lets SET NOT NULL skip its own scan under an exclusive lock
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE link VALIDATE CONSTRAINT link_destination_id_fkey")
+        op.execute("ALTER TABLE link VALIDATE CONSTRAINT link_destination_id_not_null")
+        op.execute("ALTER TABLE link ALTER COLUMN destination_id SET NOT NULL")
+        op.execute("ALTER TABLE link DROP CONSTRAINT link_destination_id_not_null")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Not online: original_url is scanned for NULLs. On Postgres the trigger
+    # kept it filled, on SQLite links created since have none.
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    if is_postgres:
+        op.execute("DROP TRIGGER IF EXISTS link_sync_destination ON link")
+        op.execute("DROP FUNCTION IF EXISTS link_sync_destination()")
+    op.execute(
+        link.update()
+        .where(link.c.original_url.is_(None))
+        .values(
+            original_url=sa.select(destination.c.url)
+            .where(destination.c.id == link.c.destination_id)
+            .scalar_subquery()
+        )
+    )
+
+    with op.batch_alter_table("link") as batch_op:
+        batch_op.alter_column(
+            "original_url",
+            existing_type=sqlmodel.sql.sqltypes.AutoString(),
+            nullable=False,
+        )
+        batch_op.drop_index(op.f("ix_link_destination_id"))
+        batch_op.drop_constraint("link_destination_id_fkey", type_="foreignkey")
+        batch_op.drop_column("destination_id")
+
+    op.drop_index(op.f("ix_destination_url_hash"), table_name="destination")
+    op.drop_table("destination")
@@ -0,0 +1,35 @@
+"""Create link_version table
+
+Revision ID: c4f7a2e9d815
+Revises: b5e1c8a3f702
+Create Date: 2026-10-18 20:04:31.482907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4f7a2e9d815"
+down_revision: Union[str, Sequence[str], None] = "b5e1c8a3f702"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The row is created by the first write to link
+    op.create_table(
+        "link_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("changes", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("link_version")
@@ -0,0 +1,32 @@
+"""Add link short name sequence
+
+Revision ID: e8e4007256c4
+Revises: d63173572584
+Create Date: 2026-10-18 18:40:12.204871
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8e4007256c4"
+down_revision: Union[str, Sequence[str], None] = "d63173572584"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sequences only exist on Postgres, the "sequence" strategy needs it
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(sa.schema.CreateSequence(sa.Sequence("link_short_name_seq")))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(sa.schema.DropSequence(sa.Sequence("link_short_name_seq")))
@@ -0,0 +1,85 @@
+"""Drop link original_url
+
+Revision ID: f3a9c6d2b184
+Revises: c4f7a2e9d815
+Create Date: 2026-10-19 01:12:37.905214
+
+Contract step of b5e1c8a3f702: only applied by
+`python -m app.migrations --contract`, once no instance of an app version
+that reads original_url is left (see app/migrations.py).
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9c6d2b184"
+down_revision: Union[str, Sequence[str], None] = "c4f7a2e9d815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+contract = True
+EXPAND_REVISION = "b5e1c8a3f702"
+
+link = sa.table(
+    "link",
+    sa.column("original_url", sa.String),
+    sa.column("destination_id", sa.Integer),
+)
+destination = sa.table(
+    "destination",
+    sa.column("id", sa.Integer),
+    sa.column("url", sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        with op.batch_alter_table("link") as batch_op:
+            batch_op.drop_index(op.f("ix_link_original_url"))
+            batch_op.drop_column("original_url")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS link_sync_destination ON link")
+    op.execute("DROP FUNCTION IF EXISTS link_sync_destination()")
+    # Also drops ix_link_original_url and ix_link_original_url_trgm. The
+    # space of the column in existing rows is only reclaimed once they are
+    # rewritten (VACUUM FULL or pg_repack, see the README).
+    op.drop_column("link", "original_url")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Back to the expand state. Not online: one UPDATE of every link.
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    op.add_column(
+        "link",
+        sa.Column("original_url", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.execute(
+        link.update().values(
+            original_url=sa.select(destination.c.url)
+            .where(destination.c.id == link.c.destination_id)
+            .scalar_subquery()
+        )
+    )
+    op.create_index(
+        op.f("ix_link_original_url"), "link", ["original_url"], unique=False
+    )
+    if not is_postgres:
+        return
+
+    op.execute(
+        "CREATE INDEX ix_link_original_url_trgm "
+        "ON link USING gin (original_url gin_trgm_ops)"
+    )
+    # The trigger as the expand revision created it
+    expand = op.get_context().script.get_revision(EXPAND_REVISION).module
+    op.execute(expand.SYNC_FUNCTION)
+    op.execute(expand.SYNC_TRIGGER)
@@ -0,0 +1,281 @@
+import asyncio
+import re
+import time
+from typing import Optional
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sqlmodel.ext.asyncio.session import AsyncSession
+from werkzeug.datastructures import Headers
+
+from app import database, metrics, ratelimit
+from app.bloom import BLOOM_FILTER_ENABLED, short_name_filter
+from app.cache import MISSING, redirect_cache
+from app.clicks import record_click
+from app.httpcache import (
+    CLICKS_LOGGED_HEADER,
+    REFRESH_HEADER,
+    etag_matches,
+    not_found_cache_control,
+    redirect_cache_control,
+    redirect_etag,
+)
+from app.invalidation import invalidation_bus
+from app.pagination import decode_cursor, parse_page_size
+from app.routes import (
+    fetch_link,
+    fetch_link_version,
+    fetch_links_after,
+    fetch_links_range,
+    fetch_links_version,
+    find_redirect_target,
+    parse_range,
+)
+from app.search import parse_search
+
+REDIRECT_PATH = re.compile(r"^/r/(?P<short_name>[^/]+)$")
+LINK_PATH = re.compile(r"^/api/links/(?P<link_id>\d+)$")
+
+
+def header(scope, name: str) -> Optional[str]:
+    name = name.lower().encode()
+    for key, value in scope["headers"]:
+        if key.lower() == name:
+            return value.decode()
+    return None
+
+
+# Same revalidation headers as with_etag() in the Flask views
+def etag_headers(etag: str) -> list:
+    return [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+
+
+# Serves redirects and read-only link endpoints on the event loop with the
+# async engine, everything else is passed to the Flask app in a thread pool
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            invalidation_bus.ensure_listening()
+            if BLOOM_FILTER_ENABLED:
+                short_name_filter.ensure_running()
+            handled = await self.handle(scope, send)
+            if handled:
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if database.async_engine is not None:
+                    await database.async_engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle(self, scope, send) -> bool:
+        if not metrics.METRICS_ENABLED:
+            return await self.dispatch(scope, send) is not None
+
+        # Same metrics as the Flask hooks record for requests served there
+        started = time.perf_counter()
+        db_totals = metrics.start_db_timer()
+        status = None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            endpoint = await self.dispatch(scope, send_with_status)
+        finally:
+            metrics.stop_db_timer()
+
+        if endpoint is None:
+            return False
+
+        elapsed = time.perf_counter() - started
+        metrics.observe_request(endpoint, "GET", status, elapsed, db_totals)
+        return True
+
+    # Returns the name of the Flask view it stood in for, None if not handled
+    async def dispatch(self, scope, send) -> Optional[str]:
+        path = scope["path"]
+
+        match = REDIRECT_PATH.match(path)
+        if match:
+            if not await self.rate_limited(scope, send, "redirect_to_original"):
+                await self.redirect_to_original(scope, send, match["short_name"])
+            return "redirect_to_original"
+
+        if_none_match = header(scope, "if-none-match")
+        match = LINK_PATH.match(path)
+        if match:
+            await self.get_link(send, int(match["link_id"]), if_none_match)
+            return "get_link"
+
+        if path == "/api/links":
+            args = {}
+            query = scope["query_string"].decode()
+            for key, value in parse_qsl(query, keep_blank_values=True):
+                args.setdefault(key, value)
+
+            # The unpaginated listing streams from Flask
+            if "cursor" not in args and not args.get("range"):
+                return None
+
+            # Version and rows come from the same database
+            engine = database.get_async_read_engine()
+            async with AsyncSession(engine) as session:
+                etag = await session.run_sync(fetch_links_version)
+            if etag_matches(if_none_match, etag):
+                await self.send_response(send, 304, b"", etag_headers(etag))
+            elif "cursor" in args:
+                await self.get_links_by_cursor(send, engine, args, etag)
+            else:
+                await self.get_links_by_range(send, engine, args, etag)
+            return "get_links"
+
+        return None
+
+    async def rate_limited(self, scope, send, endpoint: str) -> bool:
+        # Writes are limited by the Flask app, see ratelimit.init_app()
+        if not ratelimit.RATE_LIMIT_ENABLED:
+            return False
+
+        remote_addr = scope["client"][0] if scope.get("client") else None
+        headers = Headers(
+            [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in scope["headers"]
+            ]
+        )
+        if ratelimit.limiter.blocking:
+            wait = await asyncio.to_thread(
+                ratelimit.retry_after, endpoint, remote_addr, headers
+            )
+        else:
+            wait = ratelimit.retry_after(endpoint, remote_addr, headers)
+        if wait <= 0:
+            return False
+
+        body, headers = ratelimit.too_many_requests(wait)
+        response_headers = [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ]
+        await self.send_json(send, body, 429, response_headers)
+        return True
+
+    async def redirect_to_original(self, scope, send, short_name: str):
+        # Same caching headers and database choice as the Flask view
+        if header(scope, REFRESH_HEADER) is not None:
+            target = MISSING
+            engine = database.get_async_engine()
+        else:
+            target = redirect_cache.get(short_name)
+            engine = database.get_async_read_engine(short_name)
+            if target is MISSING and not short_name_filter.might_exist(short_name):
+                target = None
+
+        if target is MISSING:
+            version = redirect_cache.version
+            async with AsyncSession(engine) as session:
+                target = await session.run_sync(find_redirect_target, short_name)
+
+            redirect_cache.set(short_name, target, version)
+
+        if target is None:
+            detail = {"detail": f"Short link {short_name} not found"}
+            cache_control = not_found_cache_control().encode()
+            return await self.send_json(
+                send, detail, 404, [(b"cache-control", cache_control)]
+            )
+
+        link_id, original_url = target
+        if header(scope, CLICKS_LOGGED_HEADER) is None:
+            record_click(link_id)
+
+        etag = redirect_etag(link_id, original_url)
+        response_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", redirect_cache_control().encode()),
+        ]
+        if etag_matches(header(scope, "if-none-match"), etag):
+            return await self.send_response(send, 304, b"", response_headers)
+
+        response_headers.append((b"location", original_url.encode()))
+        await self.send_response(send, 301, b"", response_headers)
+
+    async def get_link(self, send, link_id: int, if_none_match: Optional[str]):
+        async with AsyncSession(database.get_async_read_engine()) as session:
+            etag = await session.run_sync(fetch_link_version, link_id)
+            if etag and etag_matches(if_none_match, etag):
+                return await self.send_response(send, 304, b"", etag_headers(etag))
+
+            link = await session.run_sync(fetch_link, link_id) if etag else None
+
+        if not link:
+            detail = {"detail": f"Link with id {link_id} not found"}
+            return await self.send_json(send, detail, 404)
+
+        await self.send_json(send, link, 200, etag_headers(etag))
+
+    async def get_links_by_range(self, send, engine, args: dict, etag: str):
+        try:
+            start, end = parse_range(args["range"])
+            term = parse_search(args.get("q"))
+        except ValueError as e:
+            return await self.send_json(send, {"detail": str(e)}, 400)
+
+        async with AsyncSession(engine) as session:
+            links, content_range = await session.run_sync(
+                fetch_links_range, start, end, term
+            )
+
+        headers = [(b"content-range", content_range.encode())] + etag_headers(etag)
+        await self.send_json(send, links, 200, headers)
+
+    async def get_links_by_cursor(self, send, engine, args: dict, etag: str):
+        try:
+            after_id = decode_cursor(args["cursor"])
+            limit = parse_page_size(args.get("limit"))
+            term = parse_search(args.get("q"))
+        except ValueError as e:
+            return await self.send_json(send, {"detail": str(e)}, 400)
+
+        async with AsyncSession(engine) as session:
+            links, next_cursor = await session.run_sync(
+                fetch_links_after, after_id, limit, term
+            )
+
+        headers = [(b"x-next-cursor", next_cursor.encode())] if next_cursor else []
+        await self.send_json(send, links, 200, headers + etag_headers(etag))
+
+    async def send_json(self, send, data, status: int, headers=None):
+        # Same bytes as Flask's jsonify()
+        json_provider = self.flask_app.json
+        body = json_provider.dumps(data, separators=(",", ":")) + "\n"
+        headers = [(b"content-type", json_provider.mimetype.encode())] + (headers or [])
+        await self.send_response(send, status, body.encode(), headers)
+
+    async def send_response(self, send, status: int, body: bytes, headers):
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_asgi_app(flask_app) -> AsyncApp:
+    return AsyncApp(flask_app)
@@ -0,0 +1,24 @@
+import os
+import threading
+
+
+# A daemon thread started on first use. Threads do not survive fork, so
+# each worker starts its own, even if the master process started one.
+class WorkerThread:
+    def __init__(self, target, name: str):
+        self.target = target
+        self.name = name
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            thread.start()
@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from sqlmodel import func, select
+
+from app import database
+from app.background import WorkerThread
+from app.models import Link
+
+BLOOM_FILTER_ENABLED = os.getenv("BLOOM_FILTER_ENABLED", "false").lower() in (
+    "1",
+    "true",
+)
+BLOOM_FILTER_ERROR_RATE = float(os.getenv("BLOOM_FILTER_ERROR_RATE", "0.001"))
+# Caps the bit array; a capped filter has a higher false positive rate
+BLOOM_FILTER_MAX_MEMORY_MB = float(os.getenv("BLOOM_FILTER_MAX_MEMORY_MB", "64"))
+BLOOM_FILTER_MIN_CAPACITY = int(os.getenv("BLOOM_FILTER_MIN_CAPACITY", "100000"))
+# Deleted names stay in the filter until the next rebuild
+BLOOM_FILTER_REBUILD_INTERVAL = float(
+    os.getenv("BLOOM_FILTER_REBUILD_INTERVAL", "3600")
+)
+
+SCAN_CHUNK_ROWS = 10000
+# Room for the links created until the next rebuild
+CAPACITY_HEADROOM = 1.25
+
+logger = logging.getLogger(__name__)
+
+
+# Bit array with k positions per key, derived from one blake2b digest by
+# double hashing. No false negatives: a miss means the key was never added.
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float, max_bytes: int):
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.capacity = capacity
+        self.size = max(8, min(bits, max_bytes * 8))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        bits = self._bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def false_positive_rate(self) -> float:
+        # Expected for the keys added so far
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+# Per-worker filter of every Link.short_name. A background thread builds it
+# from a scan of the primary and rebuilds it periodically to drop deleted
+# names; names published on the invalidation bus are added in between.
+# Until the first build (or after lost invalidations) every name "might
+# exist" and redirects query the database as before.
+class ShortNameFilter:
+    def __init__(
+        self,
+        error_rate: float,
+        max_bytes: int,
+        min_capacity: int,
+        rebuild_interval: float,
+    ):
+        self.error_rate = error_rate
+        self.max_bytes = max_bytes
+        self.min_capacity = min_capacity
+        self.rebuild_interval = rebuild_interval
+        self.checks = 0
+        self.rejections = 0
+        self.builds = 0
+        self.build_seconds = None
+        self._filter = None
+        # Names added while a rebuild scans, added to the new filter after
+        self._pending = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._builder = WorkerThread(self._run, "bloom-filter")
+
+    def might_exist(self, short_name: str) -> bool:
+        bloom = self._filter
+        if bloom is None:
+            return True
+
+        self.checks += 1
+        if short_name in bloom:
+            return True
+        self.rejections += 1
+        return False
+
+    def add(self, *short_names: str):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(short_names)
+            if self._filter is None:
+                return
+
+            for short_name in short_names:
+                self._filter.add(short_name)
+            full = self._filter.count > self._filter.capacity
+
+        if full:
+            self._wakeup.set()
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+        self._wakeup.set()
+
+    def rebuild(self):
+        with self._build_lock:
+            started = time.perf_counter()
+            with self._lock:
+                self._pending = []
+            try:
+                bloom = self._scan()
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for short_name in self._pending:
+                    bloom.add(short_name)
+                self._pending = None
+                self._filter = bloom
+            self.builds += 1
+            self.build_seconds = time.perf_counter() - started
+
+    def _scan(self) -> BloomFilter:
+        with database.engine.connect() as connection:
+            count = connection.execute(select(func.count()).select_from(Link)).scalar()
+            capacity = max(self.min_capacity, math.ceil(count * CAPACITY_HEADROOM))
+            bloom = BloomFilter(capacity, self.error_rate, self.max_bytes)
+
+            statement = select(Link.short_name).execution_options(
+                yield_per=SCAN_CHUNK_ROWS
+            )
+            for rows in connection.execute(statement).partitions():
+                for (short_name,) in rows:
+                    bloom.add(short_name)
+        return bloom
+
+    def clear(self):
+        with self._lock:
+            self._filter = None
+            self.checks = 0
+            self.rejections = 0
+
+    def ensure_running(self):
+        self._builder.ensure_running()
+
+    def _run(self):
+        while True:
+            try:
+                self.rebuild()
+            except Exception as e:
+                # The previous filter (if any) stays in use
+                logger.error(f"Failed to build the bloom filter: {e}", exc_info=True)
+            self._wakeup.wait(self.rebuild_interval)
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        stats = {
+            "enabled": BLOOM_FILTER_ENABLED,
+            "ready": bloom is not None,
+            "error_rate": self.error_rate,
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "builds": self.builds,
+            "build_seconds": self.build_seconds,
+        }
+        if bloom is not None:
+            stats.update(
+                {
+                    "names": bloom.count,
+                    "capacity": bloom.capacity,
+                    "bits": bloom.size,
+                    "hashes": bloom.hashes,
+                    "memory_bytes": bloom.memory_bytes,
+                    "expected_false_positive_rate": bloom.false_positive_rate(),
+                }
+            )
+        return stats
+
+
+short_name_filter = ShortNameFilter(
+    BLOOM_FILTER_ERROR_RATE,
+    int(BLOOM_FILTER_MAX_MEMORY_MB * 2**20),
+    BLOOM_FILTER_MIN_CAPACITY,
+    BLOOM_FILTER_REBUILD_INTERVAL,
+)
@@ -0,0 +1,130 @@
+import json
+import os
+from datetime import datetime
+
+from pydantic import ValidationError
+
+from app.database import INSERT_DIALECTS
+from app.destinations import intern_destinations
+from app.models import Link
+from app.schemas import LinkCreate
+from app.shortnames import SHORT_NAME_ATTEMPTS, generate_short_names
+
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "500"))
+
+
+def parse_ndjson(stream):
+    # Yields decoded items, or the JSONDecodeError for lines that are not JSON
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def validate_items(items):
+    # Yields (index, LinkCreate) or (index, list of errors)
+    for index, item in enumerate(items):
+        if isinstance(item, ValueError):
+            yield index, [{"loc": ["body", index], "msg": str(item)}]
+            continue
+        if not isinstance(item, dict):
+            yield index, [{"loc": ["body", index], "msg": "Expected an object"}]
+            continue
+
+        try:
+            yield index, LinkCreate(**item)
+        except ValidationError as e:
+            errors = json.loads(e.json())
+            for error in errors:
+                if "loc" in error:
+                    error["loc"] = ["body", index] + list(error["loc"])
+            yield index, errors
+
+
+def batched(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_links(connection, links: list[LinkCreate]) -> dict:
+    # Returns the inserted rows by short_name. Items without a short_name
+    # get a generated one, and another one if it clashed with an existing name
+    generated = [link for link in links if link.short_name is None]
+    link_ids = assign_short_names(connection, generated)
+    created = insert_ignoring_duplicates(connection, links, link_ids)
+
+    for _ in range(SHORT_NAME_ATTEMPTS - 1):
+        clashed = [link for link in generated if link.short_name not in created]
+        if not clashed:
+            break
+        link_ids.update(assign_short_names(connection, clashed))
+        created.update(insert_ignoring_duplicates(connection, clashed, link_ids))
+
+    return created
+
+
+def assign_short_names(connection, links: list[LinkCreate]) -> dict:
+    link_ids = {}
+    if not links:
+        return link_ids
+
+    for link, (link_id, short_name) in zip(
+        links, generate_short_names(connection, len(links))
+    ):
+        link.short_name = short_name
+        if link_id is not None:
+            link_ids[id(link)] = link_id
+
+    return link_ids
+
+
+def insert_ignoring_duplicates(connection, links, link_ids: dict) -> dict:
+    # Multi-row INSERT ... ON CONFLICT (short_name) DO NOTHING RETURNING.
+    # Rows with a preallocated id need their own statement, since all rows
+    # of a multi-row INSERT must have the same columns.
+    insert = INSERT_DIALECTS[connection.dialect.name]
+    created_at = datetime.now()
+    items = [link.model_dump(mode="json") for link in links]
+    destination_ids = intern_destinations(
+        connection, {item["original_url"] for item in items}
+    )
+    urls = {destination_id: url for url, destination_id in destination_ids.items()}
+
+    rows_with_id, rows = [], []
+    for link, item in zip(links, items):
+        row = {
+            "destination_id": destination_ids[item["original_url"]],
+            "short_name": item["short_name"],
+            "created_at": created_at,
+        }
+        if id(link) in link_ids:
+            rows_with_id.append({**row, "id": link_ids[id(link)]})
+        else:
+            rows.append(row)
+
+    created = {}
+    for values in (rows, rows_with_id):
+        if not values:
+            continue
+        statement = (
+            insert(Link)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=["short_name"])
+            .returning(Link.id, Link.destination_id, Link.short_name, Link.created_at)
+        )
+        for link_id, destination_id, short_name, row_created_at in connection.execute(
+            statement
+        ):
+            url = urls[destination_id]
+            created[short_name] = (link_id, url, short_name, row_created_at)
+
+    return created
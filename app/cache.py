@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+REDIRECT_CACHE_SIZE = int(os.getenv("REDIRECT_CACHE_SIZE", "10000"))
+REDIRECT_CACHE_TTL = float(os.getenv("REDIRECT_CACHE_TTL", "60"))
+
+# Returned by TTLCache.get when the key is not cached.
+# A cached value of None is a valid (negative) entry.
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version: Optional[int] = None):
+        # Lookups capture `version` before querying the database, so a
+        # value read before a concurrent invalidation is never stored.
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self.version += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# short_name -> (link_id, original_url), or None for links that do not exist
+redirect_cache = TTLCache(REDIRECT_CACHE_SIZE, REDIRECT_CACHE_TTL)
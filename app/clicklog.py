@@ -0,0 +1,102 @@
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+from sqlmodel import select
+
+from app import database
+from app.clicks import click_buffer, record_click
+from app.models import Link
+
+# nginx logs every redirect it serves, cache hits included, as a syslog
+# datagram to this address (nginx.conf); clicks are counted in batches
+CLICK_LOG_BIND = os.getenv("CLICK_LOG_BIND", "127.0.0.1:8514")
+CLICK_LOG_BATCH_SIZE = int(os.getenv("CLICK_LOG_BATCH_SIZE", "1000"))
+CLICK_LOG_BATCH_INTERVAL = float(os.getenv("CLICK_LOG_BATCH_INTERVAL", "1"))
+
+# Short names per lookup query
+LOOKUP_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def parse_message(data: bytes) -> Optional[tuple[float, str]]:
+    # <190>Oct 18 19:50:47 host nginx: 1792353047.123 /r/name
+    _, _, message = data.decode("utf-8", "replace").partition("nginx: ")
+    timestamp, _, uri = message.strip().partition(" ")
+    if not uri.startswith("/r/") or uri == "/r/":
+        return None
+    try:
+        return float(timestamp), uri.removeprefix("/r/")
+    except ValueError:
+        return None
+
+
+def fetch_link_ids(short_names: set[str]) -> dict[str, int]:
+    names = list(short_names)
+    link_ids = {}
+    with database.engine.connect() as connection:
+        for start in range(0, len(names), LOOKUP_BATCH_SIZE):
+            rows = connection.execute(
+                select(Link.short_name, Link.id).where(
+                    Link.short_name.in_(names[start : start + LOOKUP_BATCH_SIZE])
+                )
+            )
+            link_ids.update(rows.all())
+    return link_ids
+
+
+def count_clicks(clicks: list[tuple[float, str]]) -> int:
+    link_ids = fetch_link_ids({short_name for _, short_name in clicks})
+    counted = 0
+    for timestamp, short_name in clicks:
+        # Deleted since the redirect was served
+        if short_name in link_ids:
+            record_click(link_ids[short_name], timestamp)
+            counted += 1
+    return counted
+
+
+def receive(sock: socket.socket, batch_size: int, interval: float) -> list:
+    clicks = []
+    deadline = time.monotonic() + interval
+    while len(clicks) < batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        sock.settimeout(remaining)
+        try:
+            data = sock.recv(65535)
+        except TimeoutError:
+            break
+        click = parse_message(data)
+        if click is not None:
+            clicks.append(click)
+    return clicks
+
+
+def serve(bind: str):
+    host, _, port = bind.rpartition(":")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, int(port)))
+    logger.info(f"Counting clicks logged to {bind}")
+
+    try:
+        while True:
+            clicks = receive(sock, CLICK_LOG_BATCH_SIZE, CLICK_LOG_BATCH_INTERVAL)
+            if not clicks:
+                continue
+            try:
+                count_clicks(clicks)
+            except Exception as e:
+                logger.error(f"Failed to count {len(clicks)} clicks: {e}")
+    finally:
+        sock.close()
+        click_buffer.flush()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve(CLICK_LOG_BIND)
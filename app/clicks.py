@@ -0,0 +1,145 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app import database
+from app.background import WorkerThread
+from app.models import ClickStat
+
+CLICK_TRACKING_ENABLED = os.getenv("CLICK_TRACKING_ENABLED", "true").lower() in (
+    "1",
+    "true",
+)
+CLICK_FLUSH_INTERVAL = float(os.getenv("CLICK_FLUSH_INTERVAL", "5"))
+CLICK_FLUSH_THRESHOLD = int(os.getenv("CLICK_FLUSH_THRESHOLD", "1000"))
+# Buckets kept in memory while the database is unreachable; the oldest
+# are dropped beyond this
+CLICK_MAX_PENDING = int(os.getenv("CLICK_MAX_PENDING", "100000"))
+
+# Rows per upsert statement, three bind parameters each, well under the
+# limits of Postgres (65535) and SQLite (32766)
+UPSERT_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+# Counts redirects per (link_id, minute) in memory; a background thread
+# upserts them into click_stat so that redirects never wait on a write
+class ClickBuffer:
+    def __init__(self, interval: float, threshold: int, max_pending: int):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_pending = max_pending
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = WorkerThread(self._run, "click-flusher")
+
+    def record(self, link_id: int, timestamp: Optional[float] = None):
+        key = (link_id, int((timestamp or time.time()) // 60))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            pending = len(self._counts)
+
+        self._flusher.ensure_running()
+        if pending >= self.threshold:
+            self._wakeup.set()
+
+    def pending(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+            if not counts:
+                return 0
+
+            keys = list(counts)
+            for start in range(0, len(keys), UPSERT_BATCH_SIZE):
+                batch = keys[start : start + UPSERT_BATCH_SIZE]
+                rows = [
+                    {
+                        "link_id": link_id,
+                        "bucket": datetime.fromtimestamp(minute * 60),
+                        "clicks": counts[(link_id, minute)],
+                    }
+                    for link_id, minute in batch
+                ]
+                try:
+                    self._upsert(rows)
+                except Exception as e:
+                    logger.error(f"Failed to flush click stats: {e}", exc_info=True)
+                    # Earlier batches are committed and must not be counted twice
+                    self._restore({key: counts[key] for key in keys[start:]})
+                    return start
+
+            return len(keys)
+
+    def _upsert(self, rows: list[dict]):
+        with database.engine.connect() as connection:
+            try:
+                connection.execute(upsert_statement(connection, rows))
+                connection.commit()
+            except IntegrityError:
+                # A link was deleted after its clicks were recorded
+                connection.rollback()
+                for row in rows:
+                    try:
+                        connection.execute(upsert_statement(connection, [row]))
+                        connection.commit()
+                    except IntegrityError:
+                        connection.rollback()
+
+    def _restore(self, counts: dict):
+        with self._lock:
+            for key, clicks in counts.items():
+                self._counts[key] = self._counts.get(key, 0) + clicks
+
+            excess = len(self._counts) - self.max_pending
+            if excess > 0:
+                # Keys are (link_id, minute); drop the oldest minutes
+                oldest = sorted(self._counts, key=lambda key: key[1])[:excess]
+                dropped = sum(self._counts.pop(key) for key in oldest)
+                logger.warning(
+                    f"Dropped {dropped} clicks in {excess} buckets "
+                    "that could not be written"
+                )
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def upsert_statement(connection, rows: list[dict]):
+    insert = database.INSERT_DIALECTS[connection.dialect.name]
+    statement = insert(ClickStat).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=["link_id", "bucket"],
+        set_={"clicks": ClickStat.clicks + statement.excluded.clicks},
+    )
+
+
+click_buffer = ClickBuffer(
+    CLICK_FLUSH_INTERVAL, CLICK_FLUSH_THRESHOLD, CLICK_MAX_PENDING
+)
+atexit.register(click_buffer.flush)
+
+
+def record_click(link_id: int, timestamp: Optional[float] = None):
+    if CLICK_TRACKING_ENABLED:
+        click_buffer.record(link_id, timestamp)
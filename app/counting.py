@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, func, select
+
+from app.models import Link
+
+# exact | estimated | cached
+LINK_COUNT_STRATEGY = os.getenv("LINK_COUNT_STRATEGY", "exact")
+LINK_COUNT_CACHE_TTL = float(os.getenv("LINK_COUNT_CACHE_TTL", "60"))
+
+if LINK_COUNT_STRATEGY not in ("exact", "estimated", "cached"):
+    raise ValueError(f"Unknown LINK_COUNT_STRATEGY: {LINK_COUNT_STRATEGY}")
+
+
+def exact_count(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(Link)).one()
+
+
+def estimated_count(session: Session) -> Optional[int]:
+    # Planner statistics are only available on Postgres. reltuples is -1
+    # until the table has been vacuumed or analyzed at least once.
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+
+    estimate = (
+        session.connection()
+        .execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = CAST(:table AS regclass)"
+            ),
+            {"table": Link.__tablename__},
+        )
+        .scalar()
+    )
+    if estimate is None or estimate < 0:
+        return None
+
+    return estimate
+
+
+# Exact count refreshed at most every `ttl` seconds and adjusted in place
+# by this worker's own creates and deletes in between. The lock is never
+# held across the query: under the ASGI app it runs on the event loop,
+# where a second request waiting on the lock would block the first one.
+class CachedCount:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.value = None
+        self.refreshed_at = 0.0
+        # Bumped by adjust() and reset() so a count that raced with them is
+        # returned but not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, session: Session) -> int:
+        with self._lock:
+            value, generation = self.value, self._generation
+            if value is not None and time.monotonic() - self.refreshed_at <= self.ttl:
+                return value
+
+        value = exact_count(session)
+        with self._lock:
+            if self._generation == generation:
+                self.value = value
+                self.refreshed_at = time.monotonic()
+        return value
+
+    def adjust(self, delta: int):
+        with self._lock:
+            self._generation += 1
+            if self.value is not None:
+                self.value = max(0, self.value + delta)
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+            self.value = None
+
+
+link_count_cache = CachedCount(LINK_COUNT_CACHE_TTL)
+
+
+def count_links(session: Session) -> tuple[int, bool]:
+    # Returns (total, is_estimate)
+    if LINK_COUNT_STRATEGY == "estimated":
+        estimate = estimated_count(session)
+        if estimate is not None:
+            return estimate, True
+    elif LINK_COUNT_STRATEGY == "cached":
+        return link_count_cache.get(session), False
+
+    return exact_count(session), False
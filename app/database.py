@@ -1,23 +1,248 @@
+import itertools
 import os
+import time
+from typing import Optional
 
 from dotenv import load_dotenv
+from sqlalchemy import make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine
 
+from app.pool import DB_EXTERNAL_POOLER, engine_options, pool_metrics
+
 load_dotenv()
 
+
+def normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set")
 
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg://", 1)
-elif DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
-
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args={
-        "prepare_threshold": None,
-    },
+DATABASE_URL = normalize_url(DATABASE_URL)
+DATABASE_BACKEND = make_url(DATABASE_URL).get_backend_name()
+
+# LISTEN and the migration lock need a session of their own, which PgBouncer
+# in transaction mode does not give, so with DB_EXTERNAL_POOLER they connect
+# here instead, bypassing it. None when the pooler is in the way.
+DATABASE_DIRECT_URL = os.getenv("DATABASE_DIRECT_URL")
+if DATABASE_DIRECT_URL:
+    DATABASE_DIRECT_URL = normalize_url(DATABASE_DIRECT_URL)
+elif not DB_EXTERNAL_POOLER:
+    DATABASE_DIRECT_URL = DATABASE_URL
+
+# Read replicas for redirects and link reads, comma-separated
+DATABASE_REPLICA_URLS = [
+    normalize_url(url.strip())
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# round_robin or least_connections
+DATABASE_REPLICA_STRATEGY = os.getenv("DATABASE_REPLICA_STRATEGY", "round_robin")
+# How long a worker reads from the primary after a link changed, longer
+# than the replication lag so that nobody reads what was just overwritten
+DATABASE_PRIMARY_STICKINESS = float(os.getenv("DATABASE_PRIMARY_STICKINESS", "5"))
+
+engine = create_engine(DATABASE_URL, echo=False, **engine_options(DATABASE_BACKEND))
+pool_metrics.attach(engine.pool)
+
+# Dialect-specific INSERT constructs that support ON CONFLICT
+INSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Observers of the time RawQuery executions take, which engine events do
+# not see, e.g. the per-request database time of app.metrics
+raw_query_listeners = []
+
+
+# A Core statement for hot paths, compiled once per dialect and run on a raw
+# pooled DBAPI connection: no Session, ORM rows or SQL compilation per call.
+# psycopg prepares it on the server, unless PgBouncer in transaction mode
+# (DB_EXTERNAL_POOLER) would hand the next call another server connection.
+class RawQuery:
+    def __init__(self, statement):
+        self.statement = statement
+        self._compiled = {}
+
+    def compile(self, dialect) -> tuple:
+        compiled = self._compiled.get(dialect.name)
+        if compiled is None:
+            sql = self.statement.compile(dialect=dialect)
+            # Positional paramstyles (SQLite's "?") take a tuple of values
+            names = tuple(sql.positiontup) if sql.positional else None
+            compiled = self._compiled[dialect.name] = (str(sql), names)
+        return compiled
+
+    def first(self, engine, **params) -> Optional[tuple]:
+        sql, names = self.compile(engine.dialect)
+        args = tuple(params[name] for name in names) if names else params
+        prepare = engine.dialect.name == "postgresql" and not DB_EXTERNAL_POOLER
+
+        started = time.perf_counter()
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if prepare:
+                cursor.execute(sql, args, prepare=True)
+            else:
+                cursor.execute(sql, args)
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            # Returned to the pool, which rolls the transaction back
+            connection.close()
+
+        for listener in raw_query_listeners:
+            listener(time.perf_counter() - started)
+        return tuple(row) if row else None
+
+
+# Async engine for the ASGI serving mode (app/asgi.py), created on first use
+# so that sync-only deployments do not need an async driver
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+async_engine = None
+
+
+def backend_of(url: str) -> str:
+    return make_url(url).get_backend_name()
+
+
+def async_url(url: str):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(
+            async_url(DATABASE_URL),
+            echo=False,
+            **engine_options(DATABASE_BACKEND, is_async=True),
+        )
+    return async_engine
+
+
+def in_use(engine) -> int:
+    # NullPool (DB_EXTERNAL_POOLER) does not count its connections
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+# Picks the engine for read-only requests. This worker's own writes stick
+# it to the primary for a while, so it reads its own writes. Links changed
+# by other workers (bus events) stick only their short names, so this
+# worker does not cache a redirect a lagging replica still has the old URL
+# for, while its other reads stay on the replicas.
+class ReplicaRouter:
+    # Expired short names are dropped once there are more than this
+    prune_size = 1000
+
+    def __init__(self, urls: list[str], strategy: str, stickiness: float):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown DATABASE_REPLICA_STRATEGY: {strategy}")
+
+        self.urls = urls
+        self.strategy = strategy
+        self.stickiness = stickiness
+        self.engines = [
+            create_engine(url, echo=False, **engine_options(backend_of(url)))
+            for url in urls
+        ]
+        self.async_engines = None
+        self._turn = itertools.count()
+        self._primary_until = 0.0
+        self._names_until = {}
+
+    def stick_to_primary(self):
+        self._primary_until = time.monotonic() + self.stickiness
+
+    def stick_names_to_primary(self, *short_names: str):
+        now = time.monotonic()
+        if len(self._names_until) > self.prune_size:
+            self._names_until = {
+                name: until for name, until in self._names_until.items() if until > now
+            }
+        for short_name in short_names:
+            self._names_until[short_name] = now + self.stickiness
+
+    def on_primary(self, short_name: Optional[str] = None) -> bool:
+        if not self.engines:
+            return True
+        now = time.monotonic()
+        if now < self._primary_until:
+            return True
+        return short_name is not None and now < self._names_until.get(short_name, 0)
+
+    def engine(self, short_name: Optional[str] = None):
+        if self.on_primary(short_name):
+            return engine
+        return self.pick(self.engines, in_use)
+
+    def async_engine(self, short_name: Optional[str] = None):
+        if self.on_primary(short_name):
+            return get_async_engine()
+
+        if self.async_engines is None:
+            self.async_engines = [
+                create_async_engine(
+                    async_url(url),
+                    echo=False,
+                    **engine_options(backend_of(url), is_async=True),
+                )
+                for url in self.urls
+            ]
+        return self.pick(self.async_engines, lambda engine: in_use(engine.sync_engine))
+
+    def pick(self, engines: list, load):
+        if self.strategy == "least_connections":
+            return min(engines, key=load)
+        return engines[next(self._turn) % len(engines)]
+
+    def reset_after_fork(self):
+        for replica in self.engines:
+            replica.dispose(close=False)
+        self.async_engines = None
+
+
+replicas = ReplicaRouter(
+    DATABASE_REPLICA_URLS, DATABASE_REPLICA_STRATEGY, DATABASE_PRIMARY_STICKINESS
 )
+
+
+# short_name: the redirect being looked up, read from the primary while
+# it has recently changed
+def read_engine(short_name: Optional[str] = None):
+    return replicas.engine(short_name)
+
+
+def get_async_read_engine(short_name: Optional[str] = None):
+    return replicas.async_engine(short_name)
+
+
+def stick_to_primary():
+    replicas.stick_to_primary()
+
+
+def stick_names_to_primary(*short_names: str):
+    replicas.stick_names_to_primary(*short_names)
+
+
+def reset_after_fork():
+    # Called in each gunicorn worker (gunicorn.conf.py) when the app was
+    # preloaded: pooled connections inherited from the master are dropped
+    # without closing them, as they still belong to the master
+    global async_engine
+    engine.dispose(close=False)
+    async_engine = None
+    replicas.reset_after_fork()
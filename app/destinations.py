@@ -0,0 +1,53 @@
+import hashlib
+
+from sqlmodel import select
+
+from app.database import INSERT_DIALECTS
+from app.models import Destination, Link
+
+# What the API returns for a link, in this order (format_link_values)
+LINK_COLUMNS = (Link.id, Destination.url, Link.short_name, Link.created_at)
+
+
+def select_links(*columns):
+    # Links with their URL, LINK_COLUMNS unless given other columns
+    return select(*(columns or LINK_COLUMNS)).join(
+        Destination, Link.destination_id == Destination.id
+    )
+
+
+def url_hash(url: str) -> bytes:
+    # Also computed by the migration that moved the URLs out of link
+    return hashlib.sha256(url.encode()).digest()[:16]
+
+
+# URLs arrive normalized by LinkCreate/LinkUpdate (pydantic's HttpUrl:
+# lower-case scheme and host, default ports dropped, percent-encoded), so
+# equal destinations are stored once. Destinations are never deleted, a
+# link to a campaign URL that lost its last link usually comes back.
+def intern_destinations(connection, urls) -> dict[str, int]:
+    # Returns the destination id of each URL, inserting the missing ones
+    urls_by_hash = {url_hash(url): url for url in urls}
+    if not urls_by_hash:
+        return {}
+
+    insert = INSERT_DIALECTS[connection.dialect.name]
+    connection.execute(
+        insert(Destination)
+        .values([{"url": url, "url_hash": h} for h, url in urls_by_hash.items()])
+        .on_conflict_do_nothing(index_elements=["url_hash"])
+    )
+    statement = select(Destination.id, Destination.url, Destination.url_hash).where(
+        Destination.url_hash.in_(list(urls_by_hash))
+    )
+
+    destination_ids = {}
+    for destination_id, url, digest in connection.execute(statement):
+        if url != urls_by_hash[digest]:
+            raise ValueError(f"URL hash collision between {url} and another URL")
+        destination_ids[url] = destination_id
+    return destination_ids
+
+
+def intern_destination(connection, url: str) -> int:
+    return intern_destinations(connection, [url])[url]
@@ -0,0 +1,79 @@
+import csv
+import io
+import os
+import zlib
+
+from app.destinations import select_links
+from app.models import Link
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+EXPORT_FIELDS = ["id", "original_url", "short_name", "short_url", "created_at"]
+
+COPY_LINKS_SQL = (
+    "COPY (SELECT link.id, destination.url, link.short_name, link.created_at "
+    "FROM link JOIN destination ON destination.id = link.destination_id "
+    "ORDER BY link.id) TO STDOUT (FORMAT BINARY)"
+)
+
+
+def iter_link_rows(engine):
+    # Yields (id, original_url, short_name, created_at) for every link
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            yield from _copy_link_rows(connection)
+            return
+
+        statement = (
+            select_links()
+            .order_by(Link.id)
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
+        for rows in connection.execute(statement).partitions():
+            yield from rows
+
+
+def _copy_link_rows(connection):
+    driver_connection = connection.connection.driver_connection
+    with driver_connection.cursor() as cursor:
+        with cursor.copy(COPY_LINKS_SQL) as copy:
+            copy.set_types(["int4", "varchar", "varchar", "timestamp"])
+            yield from copy.rows()
+
+
+def _chunked(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= EXPORT_CHUNK_ROWS:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def to_ndjson(links, dumps):
+    return _chunked(dumps(link) + "\n" for link in links)
+
+
+def to_csv(links):
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for link in links:
+            writer.writerow(link)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
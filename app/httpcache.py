@@ -0,0 +1,105 @@
+import hashlib
+import http.client
+import logging
+import os
+import queue
+from typing import Optional
+from urllib.parse import quote, urlsplit
+
+from app.background import WorkerThread
+
+# Browsers revalidate redirects, shared caches (nginx) keep them briefly
+REDIRECT_MAX_AGE = int(os.getenv("REDIRECT_MAX_AGE", "0"))
+REDIRECT_SHARED_MAX_AGE = int(os.getenv("REDIRECT_SHARED_MAX_AGE", "60"))
+REDIRECT_STALE_WHILE_REVALIDATE = int(
+    os.getenv("REDIRECT_STALE_WHILE_REVALIDATE", "30")
+)
+REDIRECT_NOT_FOUND_MAX_AGE = int(os.getenv("REDIRECT_NOT_FOUND_MAX_AGE", "10"))
+
+# nginx location that re-fetches a redirect into its cache, unset disables purging
+CACHE_PURGE_URL = os.getenv("CACHE_PURGE_URL")
+CACHE_PURGE_TIMEOUT = float(os.getenv("CACHE_PURGE_TIMEOUT", "2"))
+
+# Sent by the purger: skip the in-process redirect cache, which may be stale
+# in this worker until the invalidation reaches it
+REFRESH_HEADER = "X-Cache-Refresh"
+# Set by nginx when it logs the clicks itself (nginx.conf, app/clicklog.py)
+CLICKS_LOGGED_HEADER = "X-Clicks-Logged"
+
+logger = logging.getLogger(__name__)
+
+
+def redirect_etag(link_id: int, original_url: str) -> str:
+    digest = hashlib.blake2b(original_url.encode(), digest_size=8).hexdigest()
+    return f'"{link_id}-{digest}"'
+
+
+def redirect_cache_control() -> str:
+    return (
+        f"public, max-age={REDIRECT_MAX_AGE}, s-maxage={REDIRECT_SHARED_MAX_AGE}, "
+        f"stale-while-revalidate={REDIRECT_STALE_WHILE_REVALIDATE}"
+    )
+
+
+def not_found_cache_control() -> str:
+    return f"public, max-age=0, s-maxage={REDIRECT_NOT_FOUND_MAX_AGE}"
+
+
+def version_etag(*parts) -> str:
+    # Weak: equal versions mean equivalent, not byte-identical, responses
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+# Open-source nginx cannot purge, so a changed link is re-fetched through a
+# location that bypasses the cache and stores the fresh response (nginx.conf)
+class CachePurger:
+    def __init__(self, base_url: Optional[str], timeout: float):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = WorkerThread(self._run, "cache-purger")
+
+    def purge(self, *short_names: str):
+        if not self.base_url:
+            return
+
+        for short_name in short_names:
+            self._queue.put(short_name)
+        self._worker.ensure_running()
+
+    def join(self):
+        self._queue.join()
+
+    def refresh(self, short_name: str):
+        parts = urlsplit(self.base_url)
+        connection = http.client.HTTPConnection(
+            parts.hostname, parts.port or 80, timeout=self.timeout
+        )
+        try:
+            path = f"{parts.path.rstrip('/')}/r/{quote(short_name, safe='')}"
+            connection.request("GET", path, headers={REFRESH_HEADER: "1"})
+            connection.getresponse().read()
+        finally:
+            connection.close()
+
+    def _run(self):
+        while True:
+            short_name = self._queue.get()
+            try:
+                self.refresh(short_name)
+            except Exception as e:
+                logger.warning(f"Failed to purge /r/{short_name}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+cache_purger = CachePurger(CACHE_PURGE_URL, CACHE_PURGE_TIMEOUT)
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import make_url, text
+
+from app import database
+from app.background import WorkerThread
+from app.bloom import short_name_filter
+from app.cache import redirect_cache
+
+
+def default_backend(database_backend: str) -> str:
+    # The local bus only reaches the worker that made the change, so with
+    # several workers the others would serve stale redirects until their TTL
+    return "postgres" if database_backend == "postgresql" else "local"
+
+
+INVALIDATION_BACKEND = os.getenv(
+    "INVALIDATION_BACKEND", default_backend(database.DATABASE_BACKEND)
+)
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "link_invalidation")
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7900
+# Payload telling listeners to drop everything (see _listen_forever)
+RESET_PAYLOAD = "null"
+
+logger = logging.getLogger(__name__)
+
+
+# Delivers invalidations to subscribers of the current process only
+class LocalInvalidationBus:
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, on_invalidate, on_reset=None):
+        self._subscribers.append((on_invalidate, on_reset))
+
+    def publish(self, *short_names: str):
+        self._dispatch(short_names)
+
+    def ensure_listening(self):
+        pass
+
+    def _dispatch(self, short_names):
+        for on_invalidate, _ in self._subscribers:
+            on_invalidate(*short_names)
+
+    def _reset(self):
+        for _, on_reset in self._subscribers:
+            if on_reset:
+                on_reset()
+
+
+# Fans invalidations out to every worker through LISTEN/NOTIFY
+class PostgresInvalidationBus(LocalInvalidationBus):
+    reconnect_delay = 1.0
+
+    def __init__(self, channel: str):
+        super().__init__()
+        self.channel = channel
+        self._listener = WorkerThread(self._listen_forever, "invalidation-listener")
+
+    def publish(self, *short_names: str):
+        # Evict locally right away, the notification reaches other workers
+        self._dispatch(short_names)
+
+        try:
+            self._notify(notify_payloads(short_names))
+        except Exception as e:
+            logger.error(f"Failed to publish invalidation: {e}", exc_info=True)
+            # Other workers would keep serving stale entries otherwise
+            try:
+                self._notify([RESET_PAYLOAD])
+            except Exception as e:
+                logger.error(f"Failed to publish reset: {e}", exc_info=True)
+
+    def _notify(self, payloads: list[str]):
+        # One transaction, so listeners get all of them or none
+        with database.engine.connect() as connection:
+            for payload in payloads:
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": payload},
+                )
+            connection.commit()
+
+    def ensure_listening(self):
+        self._listener.ensure_running()
+
+    def _listen_forever(self):
+        # Only needed with this backend, and slow to import
+        import psycopg
+
+        conninfo = (
+            make_url(database.DATABASE_DIRECT_URL)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+
+        while True:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f'LISTEN "{self.channel}"')
+                    # Anything published while we were not listening is lost
+                    self._reset()
+
+                    for notify in connection.notifies():
+                        short_names = json.loads(notify.payload)
+                        if short_names is None:
+                            self._reset()
+                        else:
+                            self._dispatch(short_names)
+            except Exception as e:
+                logger.warning(f"Invalidation listener disconnected: {e}")
+                time.sleep(self.reconnect_delay)
+
+
+def notify_payloads(short_names) -> list[str]:
+    # JSON lists of names, each under NOTIFY_PAYLOAD_LIMIT bytes
+    payloads = []
+    batch, size = [], 2
+    for name in short_names:
+        encoded = len(json.dumps(name).encode()) + 1
+        if batch and size + encoded > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(json.dumps(batch, separators=(",", ":")))
+            batch, size = [], 2
+        batch.append(name)
+        size += encoded
+    if batch:
+        payloads.append(json.dumps(batch, separators=(",", ":")))
+
+    if any(len(payload.encode()) >= NOTIFY_PAYLOAD_LIMIT for payload in payloads):
+        # A single name too long for a payload
+        return [RESET_PAYLOAD]
+    return payloads
+
+
+def create_bus(backend: str) -> LocalInvalidationBus:
+    if backend == "local":
+        return LocalInvalidationBus()
+    if backend == "postgres":
+        if database.DATABASE_DIRECT_URL is None:
+            # LISTEN through PgBouncer in transaction mode gets no notifications
+            raise ValueError(
+                "INVALIDATION_BACKEND=postgres with DB_EXTERNAL_POOLER "
+                "requires DATABASE_DIRECT_URL"
+            )
+        return PostgresInvalidationBus(INVALIDATION_CHANNEL)
+
+    raise ValueError(f"Unknown INVALIDATION_BACKEND: {backend}")
+
+
+invalidation_bus = create_bus(INVALIDATION_BACKEND)
+invalidation_bus.subscribe(redirect_cache.invalidate, redirect_cache.invalidate_all)
+# Changed links are read back from the primary until replicas caught up;
+# after lost invalidations the whole worker reads from it for a while
+invalidation_bus.subscribe(database.stick_names_to_primary, database.stick_to_primary)
+# New names must pass the bloom filter; after lost invalidations it is
+# bypassed until rebuilt
+invalidation_bus.subscribe(short_name_filter.add, short_name_filter.reset)
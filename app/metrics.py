@@ -0,0 +1,230 @@
+import os
+import time
+from contextvars import ContextVar
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from app.pool import CHECKOUT_WAIT_BUCKETS, pool_metrics
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true")
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+REQUESTS = Counter("http_requests", "HTTP requests", ["endpoint", "method", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response is returned (streamed bodies excluded)",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per request",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request",
+    ["endpoint"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+POOL_CONNECTS = Counter("db_pool_connects", "Database connections opened")
+POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations", "Pooled connections invalidated after an error"
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=CHECKOUT_WAIT_BUCKETS,
+)
+
+# [seconds, queries] of the request being served, None outside of requests
+_request_db = ContextVar("request_db", default=None)
+
+
+def start_db_timer() -> list:
+    totals = [0.0, 0]
+    _request_db.set(totals)
+    return totals
+
+
+def stop_db_timer():
+    _request_db.set(None)
+
+
+# labels() validates and locks on every call, so children are looked up once
+_children = {}
+
+
+def request_children(endpoint: str, method: str, status: int) -> tuple:
+    key = (endpoint, method, status)
+    children = _children.get(key)
+    if children is None:
+        labels = (endpoint, method, str(status))
+        children = _children[key] = (
+            REQUESTS.labels(*labels),
+            REQUEST_LATENCY.labels(*labels),
+            REQUEST_DB_TIME.labels(endpoint),
+            REQUEST_DB_QUERIES.labels(endpoint),
+        )
+    return children
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds, db_totals):
+    requests, latency, db_time, db_queries = request_children(endpoint, method, status)
+    requests.inc()
+    latency.observe(seconds)
+    db_time.observe(db_totals[0])
+    db_queries.observe(db_totals[1])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_db.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    totals = _request_db.get()
+    started = getattr(context, "_metrics_started", None)
+    if totals is not None and started is not None:
+        totals[0] += time.perf_counter() - started
+        totals[1] += 1
+
+
+def _observe_raw_query(seconds: float):
+    totals = _request_db.get()
+    if totals is not None:
+        totals[0] += seconds
+        totals[1] += 1
+
+
+def _on_connect(dbapi_connection, connection_record):
+    POOL_CONNECTS.inc()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKED_OUT.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    POOL_CHECKED_OUT.dec()
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    POOL_INVALIDATIONS.inc()
+
+
+# Engine and Pool class events cover every engine, including the async one
+ENGINE_LISTENERS = (
+    (Engine, "before_cursor_execute", _before_cursor_execute),
+    (Engine, "after_cursor_execute", _after_cursor_execute),
+    (Pool, "connect", _on_connect),
+    (Pool, "checkout", _on_checkout),
+    (Pool, "checkin", _on_checkin),
+    (Pool, "invalidate", _on_invalidate),
+)
+
+
+def listen():
+    for target, name, listener in ENGINE_LISTENERS:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+    if POOL_CHECKOUT_WAIT.observe not in pool_metrics.checkout_wait_listeners:
+        pool_metrics.checkout_wait_listeners.append(POOL_CHECKOUT_WAIT.observe)
+
+    # Imported here: the engine is created on import and needs DATABASE_URL
+    from app import database
+
+    if _observe_raw_query not in database.raw_query_listeners:
+        database.raw_query_listeners.append(_observe_raw_query)
+
+
+def endpoint_label() -> str:
+    if request.endpoint is None:
+        return "unmatched"
+    # "api.get_links" -> "get_links"
+    return request.endpoint.rpartition(".")[2]
+
+
+def before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db = start_db_timer()
+
+
+def after_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+
+    stop_db_timer()
+    observe_request(
+        endpoint_label(),
+        request.method,
+        response.status_code,
+        time.perf_counter() - started,
+        g.pop("metrics_db"),
+    )
+    return response
+
+
+def render_metrics():
+    # With several gunicorn workers every worker writes its samples to
+    # PROMETHEUS_MULTIPROC_DIR, and the scraped worker aggregates them
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    if not METRICS_ENABLED:
+        return
+
+    listen()
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.add_url_rule("/metrics", "metrics", render_metrics)
+
+
+def mark_process_dead(pid: int):
+    # Called by gunicorn when a worker exits, drops its live gauges
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,86 @@
+import argparse
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from alembic import command
+from app import database
+
+ALEMBIC_INI = Path(__file__).parent.parent / "alembic.ini"
+# Arbitrary key shared by every process that runs migrations
+MIGRATION_LOCK_KEY = 313_001
+
+
+# Revisions marked `contract = True` drop what the previous app version
+# still uses, which keeps running during a rolling deploy. "head" stops
+# before the first of them that is pending unless contract is set, except
+# on a fresh database, where no previous version can be running.
+def upgrade_target(config: Config, connection, contract: bool) -> str:
+    current = MigrationContext.configure(connection).get_current_revision()
+    if contract or current is None:
+        return "head"
+
+    script = ScriptDirectory.from_config(config)
+    pending = list(script.iterate_revisions("head", current))[:-1]
+    for revision in reversed(pending):
+        if getattr(revision.module, "contract", False):
+            return revision.down_revision
+    return "head"
+
+
+def direct_engine():
+    if database.DATABASE_DIRECT_URL is None:
+        raise ValueError("DB_EXTERNAL_POOLER requires DATABASE_DIRECT_URL")
+    if database.DATABASE_DIRECT_URL == database.DATABASE_URL:
+        return database.engine
+    return create_engine(database.DATABASE_DIRECT_URL, poolclass=NullPool)
+
+
+def upgrade(engine=None, revision: str = "head", contract: bool = False):
+    engine = engine or direct_engine()
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+
+    with engine.connect() as connection:
+        # Several containers may start at once, only one of them migrates.
+        # A session lock, hence the direct connection (DATABASE_DIRECT_URL).
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(
+                text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+            connection.commit()
+
+        try:
+            if revision == "head":
+                revision = upgrade_target(config, connection, contract)
+                connection.commit()
+            config.attributes["connection"] = connection
+            command.upgrade(config, revision)
+            connection.commit()
+        finally:
+            connection.rollback()
+            if is_postgres:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": MIGRATION_LOCK_KEY},
+                )
+                connection.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument(
+        "--contract",
+        action="store_true",
+        help="also apply contract revisions; only once every instance runs "
+        "the current app version",
+    )
+    args = parser.parse_args()
+
+    upgrade(contract=args.contract)
+    print("Database migrations applied successfully")
@@ -1,11 +1,64 @@
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Column, ForeignKey, Integer, Sequence
 from sqlmodel import Field, SQLModel
 
 
+# Destination URLs, stored once however many links point at them
+# (app/destinations.py). On Postgres url has a pg_trgm GIN index for
+# GET /api/links?q= (created by a migration only, SQLite has no pg_trgm).
+class Destination(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str = Field(nullable=False)
+    # Truncated SHA-256 of url: a 16 byte key instead of indexing the URL
+    url_hash: bytes = Field(unique=True, index=True)
+
+
+# short_name also has a pg_trgm GIN index on Postgres
 class Link(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    original_url: str = Field(index=True)
+    destination_id: int = Field(foreign_key="destination.id", index=True)
     short_name: str = Field(unique=True, index=True)
     created_at: datetime = Field(default_factory=datetime.now, nullable=False)
+    # Set by update_link, part of the ETags of GET /api/links
+    updated_at: Optional[datetime] = Field(default=None, index=True)
+
+
+# Version of the link table, the ETag of GET /api/links. A single row
+# (id 1), bumped by every write to link in the same transaction: its row
+# lock orders the writes, so unlike max(id) or max(updated_at) it cannot
+# miss a write that commits after a later one.
+class LinkVersion(SQLModel, table=True):
+    __tablename__ = "link_version"
+
+    id: int = Field(primary_key=True)
+    changes: int = Field(default=0, nullable=False)
+
+
+# Source of generated short names for the "sequence" strategy (Postgres only)
+short_name_seq = Sequence("link_short_name_seq", metadata=SQLModel.metadata)
+
+
+# Redirects per link and minute, written in batches by app.clicks
+class ClickStat(SQLModel, table=True):
+    __tablename__ = "click_stat"
+
+    link_id: int = Field(
+        sa_column=Column(
+            Integer, ForeignKey("link.id", ondelete="CASCADE"), primary_key=True
+        )
+    )
+    bucket: datetime = Field(primary_key=True)
+    clicks: int = Field(default=0, nullable=False)
+
+
+# Token buckets of app.ratelimit's postgres backend, one row per client and
+# route group. UNLOGGED on Postgres (see the migration): losing them in a
+# crash only resets the limits.
+class RateLimit(SQLModel, table=True):
+    __tablename__ = "rate_limit"
+
+    key: str = Field(primary_key=True)
+    # When the bucket is full again, in epoch seconds of the database clock
+    tat: float = Field(nullable=False)
@@ -0,0 +1,42 @@
+import base64
+import json
+import os
+from typing import Optional
+
+LINKS_PAGE_SIZE = int(os.getenv("LINKS_PAGE_SIZE", "25"))
+LINKS_MAX_PAGE_SIZE = int(os.getenv("LINKS_MAX_PAGE_SIZE", "1000"))
+
+
+# Cursors are opaque to clients: base64url of the last seen key
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    # An empty cursor starts from the first page
+    if not cursor:
+        return 0
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        last_id = payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    if not isinstance(last_id, int) or last_id < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return last_id
+
+
+def parse_page_size(value: Optional[str]) -> int:
+    if value is None:
+        return LINKS_PAGE_SIZE
+
+    limit = int(value)
+    if limit < 1 or limit > LINKS_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {LINKS_MAX_PAGE_SIZE}")
+
+    return limit
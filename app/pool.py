@@ -0,0 +1,141 @@
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool, QueuePool
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_STATEMENT_TIMEOUT = os.getenv("DB_STATEMENT_TIMEOUT")
+# PgBouncer (or another pooler) in transaction mode: no client-side pool,
+# no server-side prepared statements and no session-level settings
+DB_EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "").lower() in ("1", "true")
+
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        # Extra observers of the checkout wait, e.g. the /metrics histogram
+        self.checkout_wait_listeners = []
+        self._lock = threading.Lock()
+
+    def attach(self, pool):
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out -= 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def observe_checkout_wait(self, seconds: float):
+        self.checkout_wait.observe(seconds)
+        for listener in self.checkout_wait_listeners:
+            listener(seconds)
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), overflow=max(0, pool.overflow()))
+        stats["checkout_wait_seconds"] = self.checkout_wait.snapshot()
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+# Pool events fire once a connection has been handed out, so the time
+# spent waiting for one is measured around the pool's own checkout
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.observe_checkout_wait(time.perf_counter() - started)
+
+
+def postgres_connect_args() -> dict:
+    connect_args = {"prepare_threshold": None, "connect_timeout": DB_CONNECT_TIMEOUT}
+    if DB_STATEMENT_TIMEOUT and not DB_EXTERNAL_POOLER:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"
+    return connect_args
+
+
+def engine_options(backend: str, is_async: bool = False) -> dict:
+    # Pool settings only apply to Postgres, SQLite keeps SQLAlchemy defaults
+    if backend != "postgresql":
+        return {}
+
+    options = {"connect_args": postgres_connect_args()}
+    if DB_EXTERNAL_POOLER:
+        options["poolclass"] = NullPool
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if not is_async:
+        options["poolclass"] = InstrumentedQueuePool
+    return options
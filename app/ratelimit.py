@@ -0,0 +1,234 @@
+import logging
+import math
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from flask import jsonify, request
+from sqlalchemy import text
+
+from app import database
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() in ("1", "true")
+# local: per worker, postgres: shared by every worker (UNLOGGED rate_limit table)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")
+# Only these peers may tell the client address in X-Real-IP (nginx.conf)
+RATE_LIMIT_TRUSTED_PROXIES = {
+    address.strip()
+    for address in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+}
+# Known X-API-Key values get a bucket of their own instead of their IP's
+RATE_LIMIT_API_KEYS = {
+    key.strip()
+    for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",")
+    if key.strip()
+}
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_CLEANUP_INTERVAL = float(os.getenv("RATE_LIMIT_CLEANUP_INTERVAL", "60"))
+
+API_KEY_HEADER = "X-API-Key"
+CLIENT_IP_HEADER = "X-Real-IP"
+
+# Views limited per group. Reads are not limited.
+ENDPOINT_GROUPS = {
+    "redirect_to_original": "redirect",
+    "create_link": "write",
+    "create_links_bulk": "write",
+    "update_link": "write",
+    "delete_link": "write",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class Limit(NamedTuple):
+    rate: float  # requests per second once the burst is used up
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        return 1 / self.rate
+
+
+DEFAULT_LIMITS = {"redirect": Limit(20, 100), "write": Limit(1, 20)}
+
+
+def parse_limits(value: str) -> dict[str, Limit]:
+    # "redirect=20:100,write=1:20", rate per second and burst
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        group, _, spec = item.partition("=")
+        rate, _, burst = spec.partition(":")
+        try:
+            limit = Limit(float(rate), int(burst))
+        except ValueError:
+            limit = Limit(0, 0)
+        if group.strip() not in DEFAULT_LIMITS or limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"Invalid RATE_LIMITS entry: {item}")
+        limits[group.strip()] = limit
+    return limits
+
+
+RATE_LIMITS = {**DEFAULT_LIMITS, **parse_limits(os.getenv("RATE_LIMITS", ""))}
+
+
+# Token buckets stored as GCRA: one "theoretical arrival time" per key
+# instead of a token count and a refill time. A request is allowed while
+# the next arrival time stays within burst * interval of now, and each one
+# pushes it by an interval, so an idle key is the same as a full bucket.
+class LocalRateLimiter:
+    # Cheap enough to call on the event loop (app/asgi.py)
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._arrivals = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        # Returns 0 if allowed, else the seconds until a request is allowed
+        now = time.monotonic()
+        with self._lock:
+            arrival = max(self._arrivals.get(key, now), now) + limit.interval
+            wait = arrival - now - limit.burst * limit.interval
+            if wait > 0:
+                return wait
+
+            if key not in self._arrivals and len(self._arrivals) >= self.max_keys:
+                self._evict(now)
+            self._arrivals[key] = arrival
+        return 0.0
+
+    def _evict(self, now: float):
+        # Full buckets first, then the oldest keys
+        self._arrivals = {
+            key: arrival for key, arrival in self._arrivals.items() if arrival > now
+        }
+        excess = len(self._arrivals) - self.max_keys + 1
+        for key in list(self._arrivals)[: max(excess, 0)]:
+            del self._arrivals[key]
+
+
+# The same algorithm in one upsert, on the database clock so that workers
+# on different hosts agree. The update only happens if the request is
+# allowed, so a denied request returns no row.
+ACQUIRE_SQL = text(
+    """
+    INSERT INTO rate_limit (key, tat)
+    VALUES (:key, EXTRACT(EPOCH FROM clock_timestamp())::float8 + :interval)
+    ON CONFLICT (key) DO UPDATE
+    SET tat = GREATEST(rate_limit.tat, EXCLUDED.tat - :interval) + :interval
+    WHERE GREATEST(rate_limit.tat, EXCLUDED.tat - :interval)
+        - (EXCLUDED.tat - :interval) <= :window - :interval
+    RETURNING tat
+    """
+)
+WAIT_SQL = text(
+    "SELECT tat + :interval - :window - EXTRACT(EPOCH FROM clock_timestamp())::float8 "
+    "FROM rate_limit WHERE key = :key"
+)
+# Rows in the past are full buckets, deleting them changes no limit
+CLEANUP_SQL = text(
+    "DELETE FROM rate_limit WHERE tat < EXTRACT(EPOCH FROM clock_timestamp())::float8"
+)
+
+
+class PostgresRateLimiter:
+    # A database round trip, run in a thread by the async app
+    blocking = True
+
+    def __init__(self, cleanup_interval: float):
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = time.monotonic() + cleanup_interval
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        params = {
+            "key": key,
+            "interval": limit.interval,
+            "window": limit.burst * limit.interval,
+        }
+        try:
+            with database.engine.connect() as connection:
+                wait = 0.0
+                if connection.execute(ACQUIRE_SQL, params).first() is None:
+                    wait = connection.execute(WAIT_SQL, params).scalar() or 0.0
+                self._cleanup(connection)
+                connection.commit()
+            return max(wait, 0.0)
+        except Exception as e:
+            # An outage of the limiter must not take the service down
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return 0.0
+
+    def _cleanup(self, connection):
+        if time.monotonic() < self._next_cleanup:
+            return
+        self._next_cleanup = time.monotonic() + self.cleanup_interval
+        connection.execute(CLEANUP_SQL)
+
+
+def create_limiter(backend: str):
+    if backend == "local":
+        return LocalRateLimiter(RATE_LIMIT_MAX_KEYS)
+    if backend == "postgres":
+        return PostgresRateLimiter(RATE_LIMIT_CLEANUP_INTERVAL)
+
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+
+
+limiter = create_limiter(RATE_LIMIT_BACKEND)
+
+
+def client_key(remote_addr: Optional[str], headers) -> Optional[str]:
+    # None for requests from the proxy itself (cache refreshes), which
+    # nginx sends without X-Real-IP
+    api_key = headers.get(API_KEY_HEADER)
+    if api_key and api_key in RATE_LIMIT_API_KEYS:
+        return f"key:{api_key}"
+
+    if remote_addr in RATE_LIMIT_TRUSTED_PROXIES:
+        client_ip = headers.get(CLIENT_IP_HEADER)
+        return f"ip:{client_ip}" if client_ip else None
+    return f"ip:{remote_addr}"
+
+
+def limit_for(endpoint: Optional[str]) -> tuple[Optional[str], Optional[Limit]]:
+    group = ENDPOINT_GROUPS.get(endpoint)
+    return group, RATE_LIMITS.get(group)
+
+
+def retry_after(endpoint: Optional[str], remote_addr, headers) -> float:
+    # Seconds the client has to wait, 0 if the request may proceed
+    group, limit = limit_for(endpoint)
+    if limit is None:
+        return 0.0
+
+    key = client_key(remote_addr, headers)
+    if key is None:
+        return 0.0
+    return limiter.acquire(f"{group}:{key}", limit)
+
+
+def too_many_requests(wait: float) -> tuple[dict, dict]:
+    # Body and headers of the 429. Never cached: nginx keys redirects by
+    # URI, not by client
+    seconds = math.ceil(wait)
+    detail = f"Too many requests, retry in {seconds} seconds"
+    return {"detail": detail}, {
+        "Retry-After": str(seconds),
+        "Cache-Control": "no-store",
+    }
+
+
+def before_request():
+    endpoint = request.endpoint.rpartition(".")[2] if request.endpoint else None
+    wait = retry_after(endpoint, request.remote_addr, request.headers)
+    if wait > 0:
+        body, headers = too_many_requests(wait)
+        return jsonify(body), 429, headers
+
+
+def init_app(app):
+    if RATE_LIMIT_ENABLED:
+        app.before_request(before_request)
@@ -1,92 +1,382 @@
 import json
 import os
-
-from flask import Blueprint, jsonify, make_response, redirect, request
+from datetime import datetime
+from typing import Optional
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    redirect,
+    request,
+    stream_with_context,
+)
 from pydantic import ValidationError
+from sqlalchemy import bindparam
 from sqlalchemy.exc import IntegrityError
-from sqlmodel import Session, func, select
+from sqlmodel import Session, select
 
 from app import database
-from app.models import Link
+from app.bloom import BLOOM_FILTER_ENABLED, short_name_filter
+from app.bulk import (
+    BULK_INSERT_BATCH_SIZE,
+    batched,
+    insert_links,
+    parse_ndjson,
+    validate_items,
+)
+from app.cache import MISSING, redirect_cache
+from app.clicks import record_click
+from app.counting import count_links, link_count_cache
+from app.destinations import intern_destination, select_links
+from app.export import gzip_stream, iter_link_rows, to_csv, to_ndjson
+from app.httpcache import (
+    CLICKS_LOGGED_HEADER,
+    REFRESH_HEADER,
+    cache_purger,
+    etag_matches,
+    not_found_cache_control,
+    redirect_cache_control,
+    redirect_etag,
+    version_etag,
+)
+from app.invalidation import invalidation_bus
+from app.models import ClickStat, Destination, Link, LinkVersion
+from app.pagination import decode_cursor, encode_cursor, parse_page_size
+from app.pool import pool_metrics
 from app.schemas import LinkCreate, LinkUpdate
+from app.search import count_matches, parse_search, search_filter
+from app.shortnames import SHORT_NAME_ATTEMPTS, generate_short_names
 
 BASE_URL = os.getenv("BASE_URL")
+LINKS_STREAM_CHUNK_SIZE = int(os.getenv("LINKS_STREAM_CHUNK_SIZE", "1000"))
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 api = Blueprint("api", __name__)
 
 
-def format_link_response(link: Link) -> dict:
+@api.before_request
+def listen_for_invalidations():
+    invalidation_bus.ensure_listening()
+    if BLOOM_FILTER_ENABLED:
+        short_name_filter.ensure_running()
+
+
+def format_link_response(link: Link, original_url: str) -> dict:
+    return format_link_values(link.id, original_url, link.short_name, link.created_at)
+
+
+def format_link_values(
+    link_id: int, original_url: str, short_name: str, created_at: datetime
+) -> dict:
     return {
-        "id": link.id,
-        "original_url": link.original_url,
-        "short_name": link.short_name,
-        "short_url": f"{BASE_URL}/r/{link.short_name}",
-        "created_at": link.created_at.isoformat(),
+        "id": link_id,
+        "original_url": original_url,
+        "short_name": short_name,
+        "short_url": f"{BASE_URL}/r/{short_name}",
+        "created_at": created_at.isoformat(),
     }
 
 
+def format_total(total_count: int, is_estimate: bool) -> str:
+    # Clients parse the total with parseInt, so the marker goes after it
+    return f"{total_count} (estimated)" if is_estimate else str(total_count)
+
+
 # HEALTH CHECK
 @api.route("/ping")
 def ping():
     return "pong"
 
 
+def parse_range(range_param: str) -> tuple[int, int]:
+    try:
+        range_str = range_param.strip("[]").replace(" ", "")
+        start, end = map(int, range_str.split(","))
+    except (ValueError, AttributeError):
+        raise ValueError(
+            f"Invalid range format. Expected [start,end], got: {range_param}"
+        )
+
+    if start < 0 or end < 0:
+        raise ValueError("Range values must be non-negative")
+
+    if start > end:
+        raise ValueError("Range start must be less than end")
+
+    return start, end
+
+
+# Query helpers shared by the Flask views and the async app (app/asgi.py).
+# Lists select plain columns (LINK_COLUMNS), building Link objects costs
+# more than the query.
+
+
+def fetch_links_range(
+    session: Session, start: int, end: int, term: Optional[str] = None
+) -> tuple[list, str]:
+    statement = select_links().order_by(Link.id).offset(start).limit(end - start + 1)
+    if term:
+        condition = search_filter(session, term)
+        statement = statement.where(condition)
+    rows = session.exec(statement).all()
+    if term:
+        total = format_total(*count_matches(session, condition))
+    else:
+        total = format_total(*count_links(session))
+
+    if len(rows) > 0:
+        content_range = f"links {start + 1}-{start + len(rows)}/{total}"
+    else:
+        content_range = f"links */{total}"
+
+    return [format_link_values(*row) for row in rows], content_range
+
+
+def fetch_links_after(
+    session: Session, after_id: int, limit: int, term: Optional[str] = None
+) -> tuple[list, Optional[str]]:
+    # Keyset pagination: constant cost per page regardless of its depth
+    statement = (
+        select_links().where(Link.id > after_id).order_by(Link.id).limit(limit + 1)
+    )
+    if term:
+        statement = statement.where(search_filter(session, term))
+    rows = session.exec(statement).all()
+
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return [format_link_values(*row) for row in rows[:limit]], next_cursor
+
+
+# Versions for the ETags of the link endpoints. The listing is versioned by
+# the change counter in link_version, a primary key lookup; no count(*),
+# which scans the table on Postgres.
+def fetch_links_version(session: Session) -> str:
+    statement = select(LinkVersion.changes).where(LinkVersion.id == 1)
+    return version_etag("links", session.exec(statement).first())
+
+
+# Call in the transaction of every write to link, before its commit
+def count_link_change(connection):
+    insert = database.INSERT_DIALECTS[connection.dialect.name]
+    statement = insert(LinkVersion).values(id=1, changes=1)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=["id"], set_={"changes": LinkVersion.changes + 1}
+        )
+    )
+
+
+def fetch_link_version(session: Session, link_id: int) -> Optional[str]:
+    statement = select(Link.created_at, Link.updated_at).where(Link.id == link_id)
+    row = session.exec(statement).first()
+    return version_etag("link", link_id, *row) if row else None
+
+
+def fetch_link(session: Session, link_id: int) -> Optional[dict]:
+    row = session.exec(select_links().where(Link.id == link_id)).first()
+    return format_link_values(*row) if row else None
+
+
+# Redirects run the statement through database.RawQuery, the async app
+# through a Session
+REDIRECT_TARGET_STATEMENT = select_links(Link.id, Destination.url).where(
+    Link.short_name == bindparam("short_name")
+)
+redirect_target_query = database.RawQuery(REDIRECT_TARGET_STATEMENT)
+
+
+def find_redirect_target(
+    session: Session, short_name: str
+) -> Optional[tuple[int, str]]:
+    params = {"short_name": short_name}
+    row = session.exec(REDIRECT_TARGET_STATEMENT, params=params).first()
+    return tuple(row) if row else None
+
+
+def fetch_click_stats(session: Session, link_id: int) -> Optional[dict]:
+    if session.get(Link, link_id) is None:
+        return None
+
+    statement = (
+        select(ClickStat.bucket, ClickStat.clicks)
+        .where(ClickStat.link_id == link_id)
+        .order_by(ClickStat.bucket)
+    )
+    buckets = [
+        {"bucket": bucket.isoformat(), "clicks": clicks}
+        for bucket, clicks in session.exec(statement)
+    ]
+    return {
+        "link_id": link_id,
+        "total": sum(bucket["clicks"] for bucket in buckets),
+        "buckets": buckets,
+    }
+
+
+def publish_link_change(*short_names: str):
+    # This worker reads its own writes from the primary for a while. Evict
+    # the redirects from every worker's cache and from nginx.
+    database.stick_to_primary()
+    invalidation_bus.publish(*short_names)
+    cache_purger.purge(*short_names)
+
+
+# Responses of the polled link endpoints are revalidated on every request
+def not_modified(etag: str) -> Response:
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag: str):
+    response = make_response(response)
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 # CRUD
 @api.route("/api/links", methods=["GET"])
 def get_links():
-    with Session(database.engine) as session:
-        range_param = request.args.get("range")
-        statement = select(Link)
-        total_count = session.exec(select(func.count()).select_from(Link)).one()
+    # Version and rows come from the same database. Versioned before the
+    # rows are read: a write in between only makes the next poll load the
+    # list again
+    engine = database.read_engine()
+    with Session(engine) as session:
+        etag = fetch_links_version(session)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return not_modified(etag)
 
-        if range_param:
-            try:
-                range_str = range_param.strip("[]").replace(" ", "")
-                start, end = map(int, range_str.split(","))
+    response = list_links(engine)
+    return with_etag(response, etag)
 
-                if start < 0 or end < 0:
-                    return jsonify({"detail": "Range values must be non-negative"}), 400
 
-                if start > end:
-                    return jsonify({"detail": "Range start must be less than end"}), 400
+def list_links(engine):
+    # q searches short_name prefixes and destination URL substrings
+    try:
+        term = parse_search(request.args.get("q"))
+    except ValueError as e:
+        return jsonify({"detail": str(e)}), 400
 
-                offset = start
-                limit = end - start + 1
-                statement = statement.offset(offset).limit(limit)
-                links = session.exec(statement).all()
-                actual_end = start + len(links)
+    cursor_param = request.args.get("cursor")
+    if cursor_param is not None:
+        return get_links_by_cursor(engine, cursor_param, term)
 
-                response = make_response(
-                    jsonify([format_link_response(link) for link in links])
-                )
+    range_param = request.args.get("range")
+    if range_param:
+        try:
+            start, end = parse_range(range_param)
+        except ValueError as e:
+            return jsonify({"detail": str(e)}), 400
 
-                if len(links) > 0:
-                    response.headers["Content-Range"] = (
-                        f"links {start + 1}-{actual_end}/{total_count}"
-                    )
-                else:
-                    response.headers["Content-Range"] = f"links */{total_count}"
+        with Session(engine) as session:
+            links, content_range = fetch_links_range(session, start, end, term)
 
-                return response, 200
+        response = make_response(jsonify(links))
+        response.headers["Content-Range"] = content_range
 
-            except (ValueError, AttributeError):
-                detail = (
-                    f"Invalid range format. "
-                    f"Expected [start,end], got: {range_param}"
-                )
-                return jsonify({"detail": detail}), 400
+        return response, 200
 
-        links = session.exec(statement).all()
-        response = make_response(
-            jsonify([format_link_response(link) for link in links])
+    statement = select_links().order_by(Link.id)
+    with Session(engine) as session:
+        if term:
+            condition = search_filter(session, term)
+            statement = statement.where(condition)
+            total_count, is_estimate = count_matches(session, condition)
+        else:
+            total_count, is_estimate = count_links(session)
+
+    total = format_total(total_count, is_estimate)
+    response = Response(
+        stream_with_context(stream_links(engine, statement)),
+        mimetype=current_app.json.mimetype,
+    )
+
+    # Sent before the rows, so the range end is only known for exact
+    # totals; an estimate is not the number of rows that will follow
+    if total_count > 0 and not is_estimate:
+        response.headers["Content-Range"] = f"links 1-{total_count}/{total}"
+    else:
+        response.headers["Content-Range"] = f"links */{total}"
+
+    return response, 200
+
+
+def stream_links(engine, statement):
+    # Writes the same bytes as jsonify(list) while holding only one chunk
+    # of rows in memory, fetched through a server-side cursor
+    json_provider = current_app.json
+    pretty = json_provider.compact is False or (
+        json_provider.compact is None and current_app.debug
+    )
+
+    with Session(engine) as session:
+        result = session.exec(
+            statement.execution_options(yield_per=LINKS_STREAM_CHUNK_SIZE)
         )
 
-        if total_count > 0:
-            response.headers["Content-Range"] = f"links 1-{total_count}/{total_count}"
-        else:
-            response.headers["Content-Range"] = f"links */{total_count}"
+        if pretty:
+            links = [format_link_values(*row) for row in result]
+            yield json_provider.dumps(links, indent=2) + "\n"
+            return
 
-        return response, 200
+        separator = "["
+        for rows in result.partitions():
+            # One dumps() per chunk, without the brackets of the chunk's list
+            links = [format_link_values(*row) for row in rows]
+            yield separator + json_provider.dumps(links, separators=(",", ":"))[1:-1]
+            separator = ","
+
+        yield "[]\n" if separator == "[" else "]\n"
+
+
+def get_links_by_cursor(engine, cursor_param: str, term: Optional[str]):
+    try:
+        after_id = decode_cursor(cursor_param)
+        limit = parse_page_size(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"detail": str(e)}), 400
+
+    with Session(engine) as session:
+        links, next_cursor = fetch_links_after(session, after_id, limit, term)
+
+    response = make_response(jsonify(links))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return response, 200
+
+
+@api.route("/api/links/export", methods=["GET"])
+def export_links():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_MIMETYPES:
+        detail = f"Invalid format. Expected ndjson or csv, got: {export_format}"
+        return jsonify({"detail": detail}), 400
+
+    links = (format_link_values(*row) for row in iter_link_rows(database.engine))
+    if export_format == "csv":
+        chunks = to_csv(links)
+    else:
+        json_provider = current_app.json
+        chunks = to_ndjson(
+            links, lambda link: json_provider.dumps(link, separators=(",", ":"))
+        )
+
+    filename = f"links.{export_format}"
+    mimetype = EXPORT_MIMETYPES[export_format]
+    if request.args.get("gzip", "").lower() in ("1", "true"):
+        chunks = gzip_stream(chunks)
+        filename += ".gz"
+        mimetype = "application/gzip"
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    return response, 200
 
 
 @api.route("/api/links", methods=["POST"])
@@ -96,13 +386,12 @@ def create_link():
         link_data = LinkCreate(**data)
 
         with Session(database.engine) as session:
-            link_dict = link_data.model_dump(mode="json")
-            new_link = Link(**link_dict)
-            session.add(new_link)
-            session.commit()
-            session.refresh(new_link)
+            new_link, original_url = save_new_link(session, link_data)
+
+            publish_link_change(new_link.short_name)
+            link_count_cache.adjust(1)
 
-            return jsonify(format_link_response(new_link)), 201
+            return jsonify(format_link_response(new_link, original_url)), 201
 
     except ValidationError as e:
         # Parse JSON string to ensure it's JSON-serializable
@@ -126,15 +415,106 @@ def create_link():
         return jsonify({"detail": "An error occured while creating the link"}), 500
 
 
+def save_new_link(session: Session, link_data: LinkCreate) -> tuple[Link, str]:
+    # A generated name can only clash with a custom name that happens to
+    # look the same, so pick another one instead of failing the request
+    generate = link_data.short_name is None
+    attempts = SHORT_NAME_ATTEMPTS if generate else 1
+
+    for attempt in range(attempts):
+        link_dict = link_data.model_dump(mode="json")
+        original_url = link_dict.pop("original_url")
+        # Same transaction: rolled back with the link on a clash
+        link_dict["destination_id"] = intern_destination(
+            session.connection(), original_url
+        )
+        if generate:
+            link_id, short_name = generate_short_names(session.connection(), 1)[0]
+            link_dict.update(id=link_id, short_name=short_name)
+
+        new_link = Link(**link_dict)
+        session.add(new_link)
+        count_link_change(session.connection())
+        try:
+            session.commit()
+            break
+        except IntegrityError:
+            session.rollback()
+            if attempt == attempts - 1:
+                raise
+
+    session.refresh(new_link)
+    return new_link, original_url
+
+
+@api.route("/api/links/bulk", methods=["POST"])
+def create_links_bulk():
+    if request.mimetype == "application/x-ndjson":
+        items = parse_ndjson(request.stream)
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            detail = "Expected a JSON array or an NDJSON stream of links"
+            return jsonify({"detail": detail}), 400
+
+    results = []
+    created_count = duplicate_count = invalid_count = 0
+
+    # Each batch is committed on its own, so bad items never abort the import
+    with database.engine.connect() as connection:
+        for batch in batched(validate_items(items), BULK_INSERT_BATCH_SIZE):
+            valid = [item for _, item in batch if isinstance(item, LinkCreate)]
+            created = insert_links(connection, valid) if valid else {}
+            if created:
+                count_link_change(connection)
+            connection.commit()
+
+            created_names = []
+            for index, item in batch:
+                if not isinstance(item, LinkCreate):
+                    invalid_count += 1
+                    results.append({"index": index, "status": 422, "detail": item})
+                elif item.short_name in created:
+                    # Only the first item with a given short_name gets the row
+                    link = format_link_values(*created.pop(item.short_name))
+                    created_names.append(item.short_name)
+                    results.append({"index": index, "status": 201, "link": link})
+                else:
+                    duplicate_count += 1
+                    detail = f'Short name "{item.short_name}" already exists'
+                    results.append({"index": index, "status": 409, "detail": detail})
+
+            if created_names:
+                created_count += len(created_names)
+                # Not purged from nginx: new names can only have a cached
+                # 404, which expires after REDIRECT_NOT_FOUND_MAX_AGE
+                database.stick_to_primary()
+                invalidation_bus.publish(*created_names)
+                link_count_cache.adjust(len(created_names))
+
+    return jsonify(
+        {
+            "created": created_count,
+            "duplicates": duplicate_count,
+            "invalid": invalid_count,
+            "items": results,
+        }
+    ), 200
+
+
 @api.route("/api/links/<int:link_id>", methods=["GET"])
 def get_link(link_id: int):
-    with Session(database.engine) as session:
-        link = session.get(Link, link_id)
+    with Session(database.read_engine()) as session:
+        etag = fetch_link_version(session, link_id)
+        if etag and etag_matches(request.headers.get("If-None-Match"), etag):
+            return not_modified(etag)
 
-        if not link:
-            return jsonify({"detail": f"Link with id {link_id} not found"}), 404
+        link = fetch_link(session, link_id) if etag else None
+
+    if not link:
+        return jsonify({"detail": f"Link with id {link_id} not found"}), 404
 
-        return jsonify(format_link_response(link)), 200
+    return with_etag(make_response(jsonify(link)), etag)
 
 
 @api.route("/api/links/<int:link_id>", methods=["PUT"])
@@ -149,15 +529,27 @@ def update_link(link_id: int):
             if not link:
                 return jsonify({"detail": f"Link with id {link_id} not found"}), 404
 
+            old_short_name = link.short_name
             update_dict = update_data.model_dump(exclude_unset=True, mode="json")
+            original_url = update_dict.pop("original_url", None)
+            if original_url is not None:
+                link.destination_id = intern_destination(
+                    session.connection(), original_url
+                )
+            else:
+                original_url = session.get(Destination, link.destination_id).url
             for key, value in update_dict.items():
                 setattr(link, key, value)
+            link.updated_at = datetime.now()
 
             session.add(link)
+            count_link_change(session.connection())
             session.commit()
             session.refresh(link)
 
-            return jsonify(format_link_response(link)), 200
+            publish_link_change(old_short_name, link.short_name)
+
+            return jsonify(format_link_response(link, original_url)), 200
 
     except ValidationError as e:
         # Parse JSON string to ensure it's JSON-serializable
@@ -193,19 +585,83 @@ def delete_link(link_id: int):
             return jsonify({"detail": f"Link with id {link_id} not found"}), 404
 
         session.delete(link)
+        count_link_change(session.connection())
         session.commit()
 
+        publish_link_change(link.short_name)
+        link_count_cache.adjust(-1)
+
         return "", 204
 
 
 # REDIRECT
+def lookup_redirect_target(short_name: str) -> Optional[tuple[int, str]]:
+    # Purge requests from nginx must not be answered from this worker's
+    # cache, nor from a replica that may not have the change yet
+    if REFRESH_HEADER in request.headers:
+        target = MISSING
+        engine = database.engine
+    else:
+        target = redirect_cache.get(short_name)
+        engine = database.read_engine(short_name)
+        # Unknown names (mostly probes) are answered without a query
+        if target is MISSING and not short_name_filter.might_exist(short_name):
+            return None
+
+    if target is MISSING:
+        version = redirect_cache.version
+        target = redirect_target_query.first(engine, short_name=short_name)
+
+        redirect_cache.set(short_name, target, version)
+
+    return target
+
+
 @api.route("/r/<short_name>")
 def redirect_to_original(short_name: str):
+    target = lookup_redirect_target(short_name)
+
+    if target is None:
+        response = jsonify({"detail": f"Short link {short_name} not found"})
+        response.headers["Cache-Control"] = not_found_cache_control()
+        return response, 404
+
+    link_id, original_url = target
+    if CLICKS_LOGGED_HEADER not in request.headers:
+        record_click(link_id)
+
+    etag = redirect_etag(link_id, original_url)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = Response(status=304)
+    else:
+        response = redirect(original_url, code=301)
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = redirect_cache_control()
+    return response
+
+
+# CLICKS
+@api.route("/api/links/<int:link_id>/stats", methods=["GET"])
+def get_link_stats(link_id: int):
     with Session(database.engine) as session:
-        statement = select(Link).where(Link.short_name == short_name)
-        link = session.exec(statement).first()
+        stats = fetch_click_stats(session, link_id)
+
+    if stats is None:
+        return jsonify({"detail": f"Link with id {link_id} not found"}), 404
+
+    return jsonify(stats), 200
+
+
+# CACHE
+@api.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(
+        {"redirect": redirect_cache.stats(), "bloom": short_name_filter.stats()}
+    ), 200
 
-        if not link:
-            return jsonify({"detail": f"Short link {short_name} not found"}), 404
 
-    return redirect(link.original_url, code=301)
+# POOL
+@api.route("/api/pool/stats", methods=["GET"])
+def get_pool_stats():
+    return jsonify(pool_metrics.stats(database.engine.pool)), 200
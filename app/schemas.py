@@ -3,21 +3,29 @@ from typing import Optional
 from pydantic import BaseModel, HttpUrl, field_validator
 
 
+def validate_short_name(value: str) -> str:
+    if len(value.strip()) == 0:
+        raise ValueError("short_name cannot be empty")
+    if len(value) > 50:
+        raise ValueError("short_name cannot be longer than 50 ch.")
+    if not value.replace("-", "").replace("_", "").isalnum():
+        raise ValueError("short_name can only contain a-z, 0-9, -, _")
+
+    return value.strip().lower()
+
+
 class LinkCreate(BaseModel):
     original_url: HttpUrl
-    short_name: str
+    # Generated by the server when omitted
+    short_name: Optional[str] = None
 
     @field_validator("short_name")
     @classmethod
-    def validate_short_name(cls, value: str) -> str:
-        if not value or len(value.strip()) == 0:
-            raise ValueError("short_name cannot be empty")
-        if len(value) > 50:
-            raise ValueError("short_name cannot be longer than 50 ch.")
-        if not value.replace("-", "").replace("_", "").isalnum():
-            raise ValueError("short_name can only contain a-z, 0-9, -, _")
+    def validate_short_name(cls, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
 
-        return value.strip().lower()
+        return validate_short_name(value)
 
 
 class LinkUpdate(BaseModel):
@@ -29,11 +37,5 @@ class LinkUpdate(BaseModel):
     def validate_short_name(cls, value: str) -> str:
         if value is None:
             return None
-        if len(value.strip()) == 0:
-            raise ValueError("short_name cannot be empty")
-        if len(value) > 50:
-            raise ValueError("short_name cannot be longer than 50 ch.")
-        if not value.replace("-", "").replace("_", "").isalnum():
-            raise ValueError("short_name can only contain a-z, 0-9, -, _")
-
-        return value.strip().lower()
+
+        return validate_short_name(value)
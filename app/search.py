@@ -0,0 +1,75 @@
+import os
+from typing import Optional
+
+from sqlmodel import Session, func, or_, select
+
+from app.models import Destination, Link
+
+# Shorter terms have no trigram, pg_trgm indexes cannot narrow them down
+LINKS_SEARCH_MIN_LENGTH = 3
+LINKS_SEARCH_MAX_LENGTH = 200
+# Matches counted for Content-Range, more are reported as an estimate
+LINKS_SEARCH_COUNT_LIMIT = int(os.getenv("LINKS_SEARCH_COUNT_LIMIT", "10000"))
+# Matching destinations passed to the link query as a list of ids
+SEARCH_MAX_DESTINATIONS = 1000
+
+LIKE_ESCAPE = "\\"
+
+
+def parse_search(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+
+    term = value.strip()
+    if not LINKS_SEARCH_MIN_LENGTH <= len(term) <= LINKS_SEARCH_MAX_LENGTH:
+        raise ValueError(
+            f"q must be between {LINKS_SEARCH_MIN_LENGTH} and "
+            f"{LINKS_SEARCH_MAX_LENGTH} characters"
+        )
+
+    return term
+
+
+def escape_like(term: str) -> str:
+    for char in (LIKE_ESCAPE, "%", "_"):
+        term = term.replace(char, LIKE_ESCAPE + char)
+    return term
+
+
+# short_name prefix or destination URL substring (which covers domains).
+# The patterns are ordinary bind parameters; the pg_trgm GIN indexes serve
+# LIKE and ILIKE with any pattern, SQLite scans. Short names are stored
+# lowercase, so their case-sensitive LIKE gets the lowercased term (on
+# Postgres, unlike SQLite, LIKE is case-sensitive). Matching destinations
+# are looked up first: there are far fewer of them than links, and a list
+# of ids lets Postgres combine ix_link_destination_id with the short_name
+# index. Terms matching too many of them use a subquery instead.
+def search_filter(session: Session, term: str):
+    pattern = escape_like(term)
+    destinations = select(Destination.id).where(
+        Destination.url.ilike(f"%{pattern}%", escape=LIKE_ESCAPE)
+    )
+    destination_ids = session.exec(
+        destinations.limit(SEARCH_MAX_DESTINATIONS + 1)
+    ).all()
+    if len(destination_ids) > SEARCH_MAX_DESTINATIONS:
+        destination_ids = destinations
+
+    return or_(
+        Link.short_name.like(f"{pattern.lower()}%", escape=LIKE_ESCAPE),
+        Link.destination_id.in_(destination_ids),
+    )
+
+
+def count_matches(session: Session, condition) -> tuple[int, bool]:
+    # Returns (total, is_estimate) like counting.count_links for links
+    # matching a search_filter(). Broad terms match most of the table,
+    # counting stops at LINKS_SEARCH_COUNT_LIMIT.
+    matches = (
+        select(Link.id).where(condition).limit(LINKS_SEARCH_COUNT_LIMIT + 1).subquery()
+    )
+    total = session.exec(select(func.count()).select_from(matches)).one()
+    if total > LINKS_SEARCH_COUNT_LIMIT:
+        return LINKS_SEARCH_COUNT_LIMIT, True
+
+    return total, False
@@ -0,0 +1,79 @@
+import os
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+# auto: orjson when installed (uv sync --extra orjson), stdlib: always json
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+
+COMPACT_SEPARATORS = (",", ":")
+# Searched for as "e-<digit>" first, a leading \d makes re scan every byte
+NEGATIVE_EXPONENT = re.compile(rb"e-\d")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # The same bytes as DefaultJSONProvider (sorted keys, ASCII escapes,
+    # Flask's date format), built by orjson for the compact output. Output
+    # orjson would write differently is serialized again with json.dumps.
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+
+        self._orjson = orjson
+        # Dates and dataclasses go through Flask's default(), as with json
+        self._options = (
+            orjson.OPT_SORT_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def dumps(self, obj, **kwargs) -> str:
+        if (
+            kwargs.keys() == {"separators"}
+            and kwargs["separators"] == COMPACT_SEPARATORS
+        ):
+            output = self.dumps_compact(obj)
+            if output is not None:
+                return output.decode()
+        return super().dumps(obj, **kwargs)
+
+    def dumps_compact(self, obj):
+        # Returns None if only json.dumps gets the bytes right. orjson writes
+        # non-ASCII as UTF-8, DEL (0x7f) unescaped and floats below 1e-4
+        # without an exponent ("0.00001") or with a short one ("2.5e-7"). NaN
+        # would become null, but no response contains one.
+        try:
+            output = self._orjson.dumps(obj, default=self.default, option=self._options)
+        except TypeError:
+            # Integers over 64 bits or non-string keys
+            return None
+        if not output.isascii() or b"\x7f" in output or b"0.0000" in output:
+            return None
+        for match in NEGATIVE_EXPONENT.finditer(output):
+            if output[match.start() - 1 : match.start()].isdigit():
+                return None
+        return output
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+
+        output = self.dumps_compact(self._prepare_response_obj(args, kwargs))
+        if output is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(output + b"\n", mimetype=self.mimetype)
+
+
+def json_provider_class():
+    if JSON_PROVIDER == "stdlib":
+        return DefaultJSONProvider
+    if JSON_PROVIDER not in ("auto", "orjson"):
+        raise ValueError(f"Unknown JSON_PROVIDER: {JSON_PROVIDER}")
+
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        if JSON_PROVIDER == "orjson":
+            raise
+        return DefaultJSONProvider
+    return OrjsonProvider
@@ -0,0 +1,116 @@
+import os
+import secrets
+import threading
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import func, select, text
+
+from app.models import Link, short_name_seq
+from app.schemas import validate_short_name
+
+# random | sequence | hashid
+SHORT_NAME_STRATEGY = os.getenv("SHORT_NAME_STRATEGY", "random")
+SHORT_NAME_LENGTH = int(os.getenv("SHORT_NAME_LENGTH", "8"))
+SHORT_NAME_BLOCK_SIZE = int(os.getenv("SHORT_NAME_BLOCK_SIZE", "256"))
+SHORT_NAME_SALT = int(os.getenv("SHORT_NAME_SALT", "0"))
+SHORT_NAME_ATTEMPTS = 3
+
+# Short names are lowercased on validation, so only lowercase base36 is
+# collision-free after validation
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Odd and not a multiple of 3, hence coprime with 36 ** length
+MULTIPLIER = 2_654_435_761
+
+
+def encode(number: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        number, digit = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def scramble(number: int, length: int) -> str:
+    # Bijection on [0, 36 ** length): sequential numbers give distinct,
+    # non-sequential names of a fixed length
+    space = len(ALPHABET) ** length
+    return encode((number * MULTIPLIER + SHORT_NAME_SALT) % space, length)
+
+
+# Names drawn at random and checked against the database a block at a
+# time; each worker hands out its own reserved block without further queries
+class RandomAllocator:
+    def __init__(self, length: int, block_size: int):
+        self.length = length
+        self.block_size = block_size
+        self._reserved = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self, connection, count: int) -> list[tuple[None, str]]:
+        with self._lock:
+            while len(self._reserved) < count:
+                self._refill(connection, max(self.block_size, count))
+            return [(None, self._reserved.popleft()) for _ in range(count)]
+
+    def _refill(self, connection, size: int):
+        candidates = {
+            "".join(secrets.choice(ALPHABET) for _ in range(self.length))
+            for _ in range(size)
+        }
+        taken = connection.execute(
+            select(Link.short_name).where(Link.short_name.in_(candidates))
+        ).scalars()
+        self._reserved.extend(candidates - set(taken))
+
+
+# Postgres sequence dedicated to short names
+class SequenceAllocator:
+    def __init__(self, length: int):
+        self.length = length
+
+    def reserve(self, connection, count: int) -> list[tuple[None, str]]:
+        numbers = connection.execute(
+            select(short_name_seq.next_value()).select_from(
+                func.generate_series(1, count)
+            )
+        ).scalars()
+        return [(None, scramble(number, self.length)) for number in numbers]
+
+
+# Name derived from Link.id: ids are taken from the table's own sequence
+# up front, so the row is inserted once with both id and name
+class HashidAllocator:
+    def __init__(self, length: int):
+        self.length = length
+
+    def reserve(self, connection, count: int) -> list[tuple[int, str]]:
+        ids = connection.execute(
+            text(
+                "SELECT nextval(pg_get_serial_sequence('link', 'id')) "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": count},
+        ).scalars()
+        return [(link_id, scramble(link_id, self.length)) for link_id in ids]
+
+
+def create_allocator(strategy: str):
+    if strategy == "random":
+        return RandomAllocator(SHORT_NAME_LENGTH, SHORT_NAME_BLOCK_SIZE)
+    if strategy == "sequence":
+        return SequenceAllocator(SHORT_NAME_LENGTH)
+    if strategy == "hashid":
+        return HashidAllocator(SHORT_NAME_LENGTH)
+
+    raise ValueError(f"Unknown SHORT_NAME_STRATEGY: {strategy}")
+
+
+short_name_allocator = create_allocator(SHORT_NAME_STRATEGY)
+
+
+def generate_short_names(connection, count: int) -> list[tuple[Optional[int], str]]:
+    # Returns (id or None, short_name) pairs; ids are set by "hashid" only
+    reserved = short_name_allocator.reserve(connection, count)
+    return [(link_id, validate_short_name(name)) for link_id, name in reserved]
@@ -0,0 +1,77 @@
+import os
+
+from werkzeug.exceptions import HTTPException
+
+SENTRY_ENVIRONMENT = os.getenv("SENTRY_ENVIRONMENT", "production")
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.1"))
+# Hot paths are traced rarely or not at all unless overridden
+DEFAULT_ENDPOINT_RATES = {"ping": 0.0, "redirect_to_original": 0.001}
+
+
+def parse_rates(value: str) -> dict[str, float]:
+    # "redirect_to_original=0.001,create_link=0.5"
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        endpoint, _, rate = item.partition("=")
+        try:
+            rate = float(rate)
+        except ValueError:
+            rate = -1.0
+        if not endpoint.strip() or not 0 <= rate <= 1:
+            raise ValueError(f"Invalid SENTRY_TRACES_SAMPLE_RATES entry: {item}")
+        rates[endpoint.strip()] = rate
+    return rates
+
+
+SENTRY_TRACES_SAMPLE_RATES = {
+    **DEFAULT_ENDPOINT_RATES,
+    **parse_rates(os.getenv("SENTRY_TRACES_SAMPLE_RATES", "")),
+}
+
+
+# Picks the trace sample rate of a request from the view it is routed to
+class TracesSampler:
+    def __init__(self, url_map, default_rate: float, rates: dict[str, float]):
+        self.url_map = url_map
+        self.default_rate = default_rate
+        self.rates = rates
+
+    def __call__(self, sampling_context: dict) -> float:
+        # Keep the decision of an upstream service for distributed traces
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+
+        environ = sampling_context.get("wsgi_environ")
+        if environ is None:
+            return self.default_rate
+
+        endpoint = self.endpoint(
+            environ.get("PATH_INFO", ""), environ["REQUEST_METHOD"]
+        )
+        return self.rates.get(endpoint, self.default_rate)
+
+    def endpoint(self, path: str, method: str) -> str:
+        try:
+            endpoint, _ = self.url_map.bind("").match(path, method)
+        # NotFound, MethodNotAllowed and RequestRedirect
+        except HTTPException:
+            return "unmatched"
+        # "api.get_links" -> "get_links"
+        return endpoint.rpartition(".")[2]
+
+
+def init_sentry(app, dsn: str):
+    import sentry_sdk
+    from sentry_sdk.integrations.flask import FlaskIntegration
+
+    sentry_sdk.init(
+        dsn=dsn,
+        integrations=[FlaskIntegration()],
+        # Errors are reported regardless of trace sampling
+        sample_rate=1.0,
+        traces_sampler=TracesSampler(
+            app.url_map, SENTRY_TRACES_SAMPLE_RATE, SENTRY_TRACES_SAMPLE_RATES
+        ),
+        environment=SENTRY_ENVIRONMENT,
+    )
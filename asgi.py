@@ -0,0 +1,4 @@
+from app.asgi import create_asgi_app
+from main import app as flask_app
+
+app = create_asgi_app(flask_app)
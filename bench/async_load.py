@@ -0,0 +1,93 @@
+"""Sync vs. async serving of redirects and read-only link endpoints.
+
+Runs the same gunicorn worker count once with the default sync workers
+(main:app) and once with uvicorn workers serving asgi:app, then opens
+--connections concurrent keep-alive connections against each.
+
+    uv run python -m bench.async_load --connections 1000 --workers 2
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+
+from bench.common import migrate, run_async_load, wait_for, write_results
+from bench.seed import seed_api
+
+PROFILES = {
+    "sync": ["main:app"],
+    "async": ["--worker-class", "uvicorn.workers.UvicornWorker", "asgi:app"],
+}
+
+
+def run(profile: str, args) -> list[dict]:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--workers",
+            str(args.workers),
+            "--backlog",
+            "4096",
+            *PROFILES[profile],
+        ],
+        env=dict(os.environ, REDIRECT_CACHE_SIZE=str(args.cache_size)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(base_url)
+        names = list(seed_api(base_url, args.links, prefix="async"))
+        workloads = {
+            "redirect": lambda: f"/r/{random.choice(names)}",
+            "get_link": lambda: f"/api/links/{random.randint(1, args.links)}",
+            "get_links": lambda: "/api/links?range=[0,24]",
+        }
+
+        results = []
+        for workload, next_path in workloads.items():
+            result = run_async_load(
+                base_url, next_path, args.connections, args.duration
+            )
+            result.update(profile=profile, workload=workload)
+            print(
+                f"{profile:<5} {workload:<9} rps={result['rps']:>8} "
+                f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                f"errors={result['errors']}"
+            )
+            results.append(result)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", default="sync,async")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--links", type=int, default=1000)
+    # Disabled by default so that every redirect reaches the database
+    parser.add_argument("--cache-size", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", default="bench_async_load.json")
+    args = parser.parse_args()
+
+    migrate()
+    results = []
+    for profile in args.profiles.split(","):
+        results.extend(run(profile, args))
+
+    write_results(args.output, {"connections": args.connections, "runs": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Size, accuracy and speed of the short name bloom filter.
+
+For each error rate: builds a filter of --names random short names and
+reports its memory, build time, the cost of a lookup and the measured
+false positive rate on names that were never added. Then times redirects
+of unknown names in-process through the Flask app with and without the
+filter (temporary SQLite database unless DATABASE_URL is set).
+
+    uv run python -m bench.bloom_filter --names 1000000 --error-rates 0.01,0.001
+"""
+
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from bench.common import write_results
+from bench.seed import example_url, insert_links
+
+ALPHABET = string.ascii_letters + string.digits
+
+
+def random_names(count: int, length: int = 8) -> list[str]:
+    return ["".join(random.choices(ALPHABET, k=length)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--probes", type=int, default=100000)
+    parser.add_argument("--error-rates", default="0.01,0.001,0.0001")
+    parser.add_argument("--max-memory-mb", type=float, default=64)
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", default="bench_bloom_filter.json")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from flask import Flask
+    from sqlmodel import Session, SQLModel, delete
+
+    from app import database
+    from app.bloom import BloomFilter, short_name_filter
+    from app.cache import redirect_cache
+    from app.models import Link
+    from app.routes import api
+
+    names = random_names(args.names)
+    # One character longer than the names, so none of them was added
+    probes = random_names(args.probes, 9)
+    max_bytes = int(args.max_memory_mb * 2**20)
+
+    results = {"names": args.names, "filters": [], "requests": {}}
+    for error_rate in map(float, args.error_rates.split(",")):
+        bloom = BloomFilter(len(names), error_rate, max_bytes)
+        started = time.perf_counter()
+        for name in names:
+            bloom.add(name)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        false_positives = sum(probe in bloom for probe in probes)
+        lookup_us = (time.perf_counter() - started) / len(probes) * 1e6
+
+        result = {
+            "error_rate": error_rate,
+            "memory_mb": round(bloom.memory_bytes / 2**20, 2),
+            "hashes": bloom.hashes,
+            "build_seconds": round(build_seconds, 2),
+            "lookup_us": round(lookup_us, 2),
+            "expected_false_positive_rate": bloom.false_positive_rate(),
+            "false_positive_rate": false_positives / len(probes),
+        }
+        print(
+            f"error_rate={error_rate:<7} {result['memory_mb']:>7}MB "
+            f"k={bloom.hashes:<2} build={result['build_seconds']}s "
+            f"lookup={result['lookup_us']}us "
+            f"false positives={result['false_positive_rate']:.5f}"
+        )
+        results["filters"].append(result)
+
+    SQLModel.metadata.create_all(database.engine)
+    with Session(database.engine) as session:
+        session.exec(delete(Link))
+        insert_links(
+            session.connection(),
+            {name: example_url(i) for i, name in enumerate(names[: args.links])},
+        )
+        session.commit()
+
+    app = Flask("bench")
+    app.register_blueprint(api)
+    client = app.test_client()
+    paths = [f"/r/{probe}" for probe in probes[: args.requests]]
+
+    for label in ("database", "bloom_filter"):
+        if label == "bloom_filter":
+            short_name_filter.rebuild()
+        # Every probe misses the redirect cache
+        redirect_cache.clear()
+        started = time.perf_counter()
+        for path in paths:
+            client.get(path)
+        us_per_request = (time.perf_counter() - started) / len(paths) * 1e6
+        results["requests"][label] = round(us_per_request, 2)
+        print(f"unknown name redirect via {label:<13} {us_per_request:>8.2f}us")
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
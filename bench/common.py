@@ -0,0 +1,224 @@
+import asyncio
+import http.client
+import json
+import math
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def write_results(path: str, results: dict):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+
+class HttpClient:
+    # Keep-alive client that does not follow redirects
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = json.dumps(body)
+            headers.setdefault("Content-Type", "application/json")
+
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    self.close()
+                return response.status, response.headers, data
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def run_load(base_url: str, next_request, concurrency: int, duration: float) -> dict:
+    # Sends next_request() -> (method, path, body) from `concurrency`
+    # threads for `duration` seconds
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        client = HttpClient(base_url)
+        local_latencies = []
+        local_statuses = {}
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, _, _ = client.request(*next_request())
+            except OSError:
+                status = 0
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        client.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = summarize(latencies, time.perf_counter() - started)
+    summary["statuses"] = {str(status): statuses[status] for status in sorted(statuses)}
+    summary["errors"] = sum(
+        count for status, count in statuses.items() if status == 0 or status >= 500
+    )
+    return summary
+
+
+def migrate():
+    # The app no longer migrates on import
+    subprocess.run(
+        [sys.executable, "-m", "app.migrations"], check=True, capture_output=True
+    )
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    for child in Path(f"/proc/{pid}/task/{pid}/children").read_text().split():
+        pids += process_tree(int(child))
+    return pids
+
+
+def memory_mb(pid: int):
+    # Linux only
+    try:
+        total = 0
+        for process in process_tree(pid):
+            for line in Path(f"/proc/{process}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+        return round(total / 1024, 1)
+    except OSError:
+        return None
+
+
+def wait_for(base_url: str, path: str = "/ping", timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, _, _ = HttpClient(base_url, timeout=1).request("GET", path)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{base_url}{path} did not respond in {timeout}s")
+
+
+async def _async_request(reader, writer, host: str, method: str, path: str):
+    request = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: 0\r\n\r\n"
+    writer.write(request.encode())
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+    if length:
+        await reader.readexactly(length)
+
+    return status, keep_alive
+
+
+def run_async_load(base_url: str, next_path, connections: int, duration: float) -> dict:
+    # One asyncio task per connection, so thousands of concurrent
+    # connections do not need thousands of client threads
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    latencies = []
+    statuses = {}
+
+    async def connection_loop(deadline: float):
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                status, keep_alive = await _async_request(
+                    reader, writer, host, "GET", next_path()
+                )
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                status, keep_alive = 0, False
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(connection_loop(deadline) for _ in range(connections)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+
+    summary = summarize(latencies, time.perf_counter() - started)
+    summary["statuses"] = {str(status): statuses[status] for status in sorted(statuses)}
+    summary["errors"] = sum(
+        count for status, count in statuses.items() if status == 0 or status >= 500
+    )
+    return summary
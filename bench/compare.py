@@ -0,0 +1,53 @@
+"""Compare two bench.endpoints result files run by run.
+
+Prints the change of req/s and p99 for every (database, scenario) present
+in both files. Exits with 1 if a run lost more than --max-regression
+percent of its throughput, so it can gate CI.
+
+    uv run python -m bench.compare baseline.json bench_endpoints.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_runs(path: str) -> dict:
+    with open(path) as f:
+        results = json.load(f)
+    return {(run["database"], run["scenario"]): run for run in results["runs"]}
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--max-regression", type=float, default=10)
+    args = parser.parse_args()
+
+    baseline = load_runs(args.baseline)
+    current = load_runs(args.current)
+
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        rps_change = change(before["rps"], after["rps"])
+        p99_change = change(before["p99_ms"], after["p99_ms"])
+        regressed = rps_change < -args.max_regression
+        regressions += regressed
+        print(
+            f"{key[0]:<8} {key[1]:<12} "
+            f"rps {before['rps']:>8} -> {after['rps']:>8} ({rps_change:+.1f}%) "
+            f"p99 {before['p99_ms']}ms -> {after['p99_ms']}ms ({p99_change:+.1f}%)"
+            + ("  REGRESSION" if regressed else "")
+        )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare the gunicorn.conf.py worker profiles under the same mixed load.
+
+For each profile (and preload on/off) starts gunicorn with the shipped
+config, measures the time until /ping answers and the memory of all its
+processes (PSS, so copy-on-write sharing counts once), then drives 90%
+redirects, 8% link reads and 2% creates. Uses a temporary SQLite database
+unless DATABASE_URL is set; gevent needs `pip install gevent`.
+
+    uv run python -m bench.gunicorn_profiles --profiles sync,gthread,uvicorn
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.common import (
+    memory_mb,
+    migrate,
+    run_load,
+    wait_for,
+    write_results,
+)
+from bench.seed import seed_api
+
+
+def run(profile: str, preload: str, args) -> dict:
+    env = dict(
+        os.environ,
+        GUNICORN_PROFILE=profile,
+        GUNICORN_PRELOAD=preload,
+        GUNICORN_BIND=f"127.0.0.1:{args.port}",
+    )
+    if args.workers:
+        env["GUNICORN_WORKERS"] = str(args.workers)
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(base_url)
+        startup = time.perf_counter() - started
+        seeded = seed_api(base_url, args.links)
+        names, ids = list(seeded), list(seeded.values())
+
+        def next_request():
+            roll = random.random()
+            if roll < 0.9:
+                return "GET", f"/r/{random.choice(names)}", None
+            if roll < 0.98:
+                return "GET", f"/api/links/{random.choice(ids)}", None
+            return "POST", "/api/links", {"original_url": "https://example.com/new"}
+
+        result = run_load(base_url, next_request, args.concurrency, args.duration)
+        result.update(
+            profile=profile,
+            preload=preload,
+            startup_s=round(startup, 3),
+            memory_mb=memory_mb(server.pid),
+        )
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", default="sync,gthread,gevent,uvicorn")
+    parser.add_argument("--preload", default="true,false")
+    parser.add_argument("--workers", type=int, default=0, help="0: profile default")
+    parser.add_argument("--links", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", default="bench_gunicorn_profiles.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    migrate()
+
+    results = []
+    for profile in args.profiles.split(","):
+        for preload in args.preload.split(","):
+            result = run(profile, preload, args)
+            print(
+                f"profile={profile:<8} preload={preload:<5} rps={result['rps']:>8} "
+                f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                f"startup={result['startup_s']}s memory={result['memory_mb']}MB "
+                f"errors={result['errors']}"
+            )
+            results.append(result)
+
+    write_results(args.output, {"cpus": os.cpu_count(), "runs": results})
+
+
+if __name__ == "__main__":
+    main()
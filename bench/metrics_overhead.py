@@ -0,0 +1,94 @@
+"""Per-request cost of the /metrics instrumentation.
+
+Serves the same requests in-process through two Flask apps, one with the
+metrics hooks and one without, and reports the added time per request.
+Query timing hooks into the engine, so it is active for both apps and the
+overhead shown is that of the request hooks (about 1us per query more).
+Uses a temporary SQLite database unless DATABASE_URL is set.
+
+    uv run python -m bench.metrics_overhead --requests 20000
+    uv run python -m bench.metrics_overhead --multiprocess
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench.common import percentile, write_results
+from bench.seed import seed_database
+
+PATHS = {
+    "redirect": "/r/bench0",
+    "get_link": "/api/links/1",
+    "range": "/api/links?range=[0,9]",
+}
+
+
+def measure(client, path: str, count: int) -> list[float]:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        client.get(path)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--multiprocess", action="store_true")
+    parser.add_argument("--output", default="bench_metrics_overhead.json")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/bench.db")
+    if args.multiprocess:
+        # Must be set before prometheus_client is imported
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = workdir
+
+    from flask import Flask
+    from sqlmodel import SQLModel
+
+    from app import database, metrics
+    from app.routes import api
+
+    SQLModel.metadata.create_all(database.engine)
+    seed_database(database.engine, 10)
+
+    apps = {}
+    for name, instrumented in (("baseline", False), ("metrics", True)):
+        app = Flask(name)
+        app.register_blueprint(api)
+        if instrumented:
+            metrics.init_app(app)
+        apps[name] = app.test_client()
+
+    results = []
+    for label, path in PATHS.items():
+        latencies = {name: [] for name in apps}
+        # Alternate the apps so both see the same warm caches and noise
+        for _ in range(args.rounds):
+            for name, client in apps.items():
+                latencies[name] += measure(client, path, args.requests // args.rounds)
+
+        result = {"request": label, "path": path}
+        for name, values in latencies.items():
+            result[f"{name}_mean_us"] = round(sum(values) / len(values) * 1e6, 2)
+            result[f"{name}_p99_us"] = round(percentile(values, 99) * 1e6, 2)
+        result["overhead_us"] = round(
+            result["metrics_mean_us"] - result["baseline_mean_us"], 2
+        )
+        print(
+            f"{label:<9} baseline={result['baseline_mean_us']:>8}us "
+            f"metrics={result['metrics_mean_us']:>8}us "
+            f"overhead={result['overhead_us']}us"
+        )
+        results.append(result)
+
+    write_results(args.output, {"multiprocess": args.multiprocess, "requests": results})
+
+
+if __name__ == "__main__":
+    main()
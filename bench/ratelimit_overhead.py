@@ -0,0 +1,98 @@
+"""Per-request cost of the rate limiter.
+
+Times limiter.acquire() alone, then serves the same redirects in-process
+through a Flask app without the limiter and one with it, and reports the
+added time per request. Limits are set high enough that nothing is denied.
+The postgres backend is measured too when DATABASE_URL points to Postgres
+(run the migrations first); otherwise a temporary SQLite database is used
+and only the local backend.
+
+    uv run python -m bench.ratelimit_overhead --requests 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench.common import percentile, write_results
+from bench.metrics_overhead import measure
+from bench.seed import seed_database
+
+PATH = "/r/bench0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--output", default="bench_ratelimit_overhead.json")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from flask import Flask
+    from sqlmodel import SQLModel
+
+    from app import database, ratelimit
+    from app.routes import api
+
+    SQLModel.metadata.create_all(database.engine)
+    seed_database(database.engine, 1)
+
+    limit = ratelimit.Limit(rate=1e6, burst=10**9)
+    ratelimit.RATE_LIMITS = {"redirect": limit, "write": limit}
+    limiters = {"local": ratelimit.LocalRateLimiter(args.clients)}
+    if database.DATABASE_BACKEND == "postgresql":
+        limiters["postgres"] = ratelimit.PostgresRateLimiter(60)
+
+    results = {"backend": database.DATABASE_BACKEND, "acquire": {}, "requests": {}}
+    keys = [f"redirect:ip:10.0.{i // 256}.{i % 256}" for i in range(args.clients)]
+    for name, limiter in limiters.items():
+        started = time.perf_counter()
+        for i in range(args.requests):
+            limiter.acquire(keys[i % len(keys)], limit)
+        elapsed = time.perf_counter() - started
+        results["acquire"][name] = round(elapsed / args.requests * 1e6, 2)
+        print(f"acquire {name:<9} {results['acquire'][name]:>8}us")
+
+    apps = {}
+    for name, limited in (("baseline", False), ("limited", True)):
+        app = Flask(name)
+        app.register_blueprint(api)
+        if limited:
+            app.before_request(ratelimit.before_request)
+        apps[name] = app.test_client()
+        # Not a trusted proxy, so every request is keyed and counted
+        apps[name].environ_base["REMOTE_ADDR"] = "203.0.113.7"
+
+    for name, limiter in limiters.items():
+        ratelimit.limiter = limiter
+        latencies = {app_name: [] for app_name in apps}
+        # Alternate the apps so both see the same warm caches and noise
+        for _ in range(args.rounds):
+            for app_name, client in apps.items():
+                latencies[app_name] += measure(
+                    client, PATH, args.requests // args.rounds
+                )
+
+        result = {}
+        for app_name, values in latencies.items():
+            result[f"{app_name}_mean_us"] = round(sum(values) / len(values) * 1e6, 2)
+            result[f"{app_name}_p99_us"] = round(percentile(values, 99) * 1e6, 2)
+        result["overhead_us"] = round(
+            result["limited_mean_us"] - result["baseline_mean_us"], 2
+        )
+        print(
+            f"redirect {name:<8} baseline={result['baseline_mean_us']:>8}us "
+            f"limited={result['limited_mean_us']:>8}us "
+            f"overhead={result['overhead_us']}us"
+        )
+        results["requests"][name] = result
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Per-redirect cost of the database lookup, with cProfile breakdowns.
+
+Runs the same short_name lookups in-process three ways: an ORM Session
+loading Link objects (the original code), a Session selecting two columns
+(the async app), and the precompiled RawQuery the Flask view uses. Also
+times whole redirect requests through the Flask test client, bypassing
+the redirect cache. Uses a temporary SQLite database unless DATABASE_URL
+is set; with Postgres the RawQuery runs as a prepared statement.
+
+    uv run python -m bench.redirect_profile --lookups 20000 --top 15
+"""
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import random
+import tempfile
+import time
+
+from bench.common import migrate, write_results
+from bench.seed import seed_database
+
+
+def profile(function, names: list[str], top: int, dump: str = None) -> dict:
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    for short_name in names:
+        function(short_name)
+    profiler.disable()
+    # Includes the profiler's own overhead, the timed run below does not
+    profiled = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for short_name in names:
+        function(short_name)
+    elapsed = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    if dump:
+        stats.dump_stats(dump)
+    stats.sort_stats("cumulative").print_stats(top)
+    return {
+        "us_per_lookup": round(elapsed / len(names) * 1e6, 1),
+        "profiled_us_per_lookup": round(profiled / len(names) * 1e6, 1),
+        "function_calls": stats.total_calls // len(names),
+        "profile": stats.stream.getvalue(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--dump-dir", help="write .prof files for snakeviz etc.")
+    parser.add_argument("--output", default="bench_redirect_profile.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    migrate()
+
+    from sqlmodel import Session, delete, select
+
+    from app import database
+    from app.httpcache import REFRESH_HEADER
+    from app.models import Destination, Link
+    from app.routes import find_redirect_target, redirect_target_query
+    from main import app
+
+    with Session(database.engine) as session:
+        session.exec(delete(Link))
+        session.commit()
+    seed_database(database.engine, args.links)
+
+    def orm_lookup(short_name):
+        with Session(database.engine) as session:
+            statement = select(Link).where(Link.short_name == short_name)
+            link = session.exec(statement).first()
+            if link is None:
+                return None
+            return link.id, session.get(Destination, link.destination_id).url
+
+    def session_lookup(short_name):
+        with Session(database.engine) as session:
+            return find_redirect_target(session, short_name)
+
+    def raw_lookup(short_name):
+        return redirect_target_query.first(database.engine, short_name=short_name)
+
+    client = app.test_client()
+
+    def redirect_request(short_name):
+        client.get(f"/r/{short_name}", headers={REFRESH_HEADER: "1"})
+
+    names = [f"bench{random.randrange(args.links)}" for _ in range(args.lookups)]
+    assert orm_lookup(names[0]) == session_lookup(names[0]) == raw_lookup(names[0])
+
+    lookups = {
+        "orm_session": orm_lookup,
+        "column_session": session_lookup,
+        "raw_query": raw_lookup,
+        "redirect_request": redirect_request,
+    }
+    results = {}
+    for name, function in lookups.items():
+        # Warm up caches, prepared statements and the pool
+        for short_name in names[:100]:
+            function(short_name)
+        dump = os.path.join(args.dump_dir, f"{name}.prof") if args.dump_dir else None
+        results[name] = profile(function, names, args.top, dump)
+        print(
+            f"{name:<17} {results[name]['us_per_lookup']:>7}us/lookup "
+            f"{results[name]['function_calls']:>5} calls/lookup"
+        )
+    for name, result in results.items():
+        print(f"\n== {name}\n{result.pop('profile')}")
+
+    write_results(
+        args.output,
+        {"backend": database.DATABASE_BACKEND, "lookups": args.lookups, **results},
+    )
+
+
+if __name__ == "__main__":
+    main()
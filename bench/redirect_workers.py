@@ -0,0 +1,120 @@
+"""Redirect p99 vs. gunicorn worker count with cross-worker invalidation.
+
+Starts gunicorn with each worker count against DATABASE_URL (Postgres),
+drives /r/<short_name> while a writer keeps updating links, and counts
+redirects that still served the old URL after the PUT returned.
+
+    uv run python -m bench.redirect_workers --workers 1,2,4,8,16
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from bench.common import HttpClient, migrate, run_load, wait_for, write_results
+from bench.seed import seed_api
+
+
+def check_staleness(base_url: str, ids: dict[str, int], stop: threading.Event):
+    # PUT a new URL, then read it back a few times from whatever worker answers
+    client = HttpClient(base_url)
+    updates = stale = 0
+    names = list(ids)
+    while not stop.is_set():
+        short_name = random.choice(names)
+        target = f"https://example.com/{short_name}/{updates + 1}"
+        client.request("PUT", f"/api/links/{ids[short_name]}", {"original_url": target})
+        updates += 1
+        time.sleep(0.05)
+        for _ in range(8):
+            _, headers, _ = client.request("GET", f"/r/{short_name}")
+            if headers.get("Location") != target:
+                stale += 1
+        time.sleep(0.1)
+    client.close()
+    return updates, stale
+
+
+def run(workers: int, args) -> dict:
+    env = dict(
+        os.environ,
+        INVALIDATION_BACKEND=args.backend,
+        REDIRECT_CACHE_TTL=str(args.ttl),
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--workers",
+            str(workers),
+            "main:app",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(base_url)
+        ids = seed_api(base_url, args.links, lambda i: f"https://example.com/{i}/0")
+        names = list(ids)
+
+        stop = threading.Event()
+        staleness = {}
+        writer = threading.Thread(
+            target=lambda: staleness.update(
+                zip(("updates", "stale_reads"), check_staleness(base_url, ids, stop))
+            )
+        )
+        writer.start()
+        result = run_load(
+            base_url,
+            lambda: ("GET", f"/r/{random.choice(names)}", None),
+            args.concurrency,
+            args.duration,
+        )
+        stop.set()
+        writer.join()
+        result.update(staleness)
+        result["workers"] = workers
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default="1,2,4,8,16")
+    parser.add_argument("--backend", default="postgres")
+    parser.add_argument("--ttl", type=float, default=3600)
+    parser.add_argument("--links", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", default="bench_redirect_workers.json")
+    args = parser.parse_args()
+
+    migrate()
+    results = []
+    for workers in map(int, args.workers.split(",")):
+        result = run(workers, args)
+        print(
+            f"workers={workers:>3} rps={result['rps']:>8} "
+            f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+            f"stale={result['stale_reads']}/{result['updates'] * 8}"
+        )
+        results.append(result)
+
+    write_results(args.output, {"backend": args.backend, "runs": results})
+
+
+if __name__ == "__main__":
+    main()
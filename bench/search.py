@@ -0,0 +1,116 @@
+"""Latency of GET /api/links?q= searches on a large table.
+
+Seeds --links links spread over --domains hosts (bulk inserts, reused by
+later runs), then times the page query and the capped match count of each
+search with fetch_links_range, the helper the range listing uses. On
+Postgres, run after the migrations so that the pg_trgm indexes exist, and
+the plan of each search is printed. Uses a temporary SQLite database unless
+DATABASE_URL is set.
+
+    DATABASE_URL=postgresql://... uv run python -m bench.search --links 5000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench.common import migrate, percentile, write_results
+from bench.seed import seed_database
+
+
+def searches(args) -> dict:
+    # Name -> term; the comments give the links matched
+    last_domain = args.domains - 1
+    return {
+        "domain": f"host{last_domain % 10}.example{last_domain}.com",  # 1/domains
+        "short_name_prefix": "s12345",  # s12345 and s123450 to s1234599...
+        "url_path": "/item/4242",  # 11 per 100000
+        "broad": "example",  # all of them, counted up to the limit
+        "no_match": "nowhere.invalid",
+    }
+
+
+def seed(engine, count: int, domains: int):
+    def url(i: int) -> str:
+        return (
+            f"https://host{i % 10}.example{i % domains}.com/item/{i % 100000}?ref={i}"
+        )
+
+    seed_database(engine, count, url, prefix="s")
+
+
+def explain(session, term: str) -> str:
+    from sqlmodel import text
+
+    from app.destinations import select_links
+    from app.search import search_filter
+
+    statement = select_links().where(search_filter(session, term)).limit(25)
+    compiled = statement.compile(
+        session.get_bind(), compile_kwargs={"literal_binds": True}
+    )
+    rows = session.exec(text(f"EXPLAIN {compiled}")).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=200000)
+    parser.add_argument("--domains", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--output", default="bench_search.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    migrate()
+
+    from sqlmodel import Session
+
+    from app import database
+    from app.routes import fetch_links_range
+    from app.search import LINKS_SEARCH_COUNT_LIMIT
+
+    seed(database.engine, args.links, args.domains)
+    is_postgres = database.DATABASE_BACKEND == "postgresql"
+
+    results = {
+        "backend": database.DATABASE_BACKEND,
+        "links": args.links,
+        "count_limit": LINKS_SEARCH_COUNT_LIMIT,
+        "searches": {},
+    }
+    for name, term in searches(args).items():
+        latencies = []
+        with Session(database.engine) as session:
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                links, content_range = fetch_links_range(
+                    session, 0, args.page_size - 1, term
+                )
+                latencies.append(time.perf_counter() - started)
+            plan = explain(session, term) if is_postgres else None
+
+        result = {
+            "q": term,
+            "content_range": content_range,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        if plan:
+            result["plan"] = plan
+        results["searches"][name] = result
+        print(
+            f"{name:<18} q={term!r:<28} {content_range:<30} "
+            f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms"
+        )
+        if plan:
+            print(plan)
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Links for the benchmarks.
+
+seed_database inserts them straight into the database, so millions of links
+take minutes; seed_api creates them through a running server. Both name the
+links <prefix>0, <prefix>1... and keep the ones a previous run left behind.
+"""
+
+import json
+from datetime import datetime
+
+from bench.common import HttpClient
+
+SEED_BATCH_SIZE = 10000
+# Items per POST /api/links/bulk
+API_BATCH_SIZE = 500
+
+
+def example_url(i: int) -> str:
+    return f"https://example.com/{i}"
+
+
+def insert_links(connection, links: dict[str, str], created_at=None):
+    # Bulk inserts short_name -> URL, interning the URLs like the app does
+    from sqlmodel import insert
+
+    from app.destinations import intern_destinations
+    from app.models import Link
+
+    destination_ids = intern_destinations(connection, set(links.values()))
+    created_at = created_at or datetime.now()
+    connection.execute(
+        insert(Link),
+        [
+            {
+                "short_name": short_name,
+                "destination_id": destination_ids[url],
+                "created_at": created_at,
+            }
+            for short_name, url in links.items()
+        ],
+    )
+
+
+def seed_database(
+    engine, count: int, url=example_url, prefix: str = "bench"
+) -> tuple[int, int]:
+    # Returns the id range of the links
+    from sqlmodel import func, select
+
+    from app.models import Link
+
+    seeded = Link.short_name.startswith(prefix)
+    with engine.connect() as connection:
+        existing = connection.scalar(select(func.count()).where(seeded))
+        created_at = datetime.now()
+        for start in range(existing, count, SEED_BATCH_SIZE):
+            links = {
+                f"{prefix}{i}": url(i)
+                for i in range(start, min(start + SEED_BATCH_SIZE, count))
+            }
+            insert_links(connection, links, created_at)
+            connection.commit()
+            print(f"  seeded {start + len(links)}/{count}", end="\r", flush=True)
+        if count > existing:
+            print()
+
+        first_id, last_id = connection.execute(
+            select(func.min(Link.id), func.max(Link.id)).where(seeded)
+        ).one()
+    return first_id, last_id
+
+
+def seed_api(
+    base_url: str, count: int, url=example_url, prefix: str = "bench"
+) -> dict[str, int]:
+    # Returns short_name -> id
+    client = HttpClient(base_url)
+    ids = {}
+    for start in range(0, count, API_BATCH_SIZE):
+        items = [
+            {"original_url": url(i), "short_name": f"{prefix}{i}"}
+            for i in range(start, min(start + API_BATCH_SIZE, count))
+        ]
+        _, _, body = client.request("POST", "/api/links/bulk", items)
+        for item in json.loads(body)["items"]:
+            if item["status"] == 201:
+                ids[item["link"]["short_name"]] = item["link"]["id"]
+
+    if len(ids) < count:
+        # Links left over from a previous run
+        names = {f"{prefix}{i}" for i in range(count)}
+        _, _, body = client.request("GET", "/api/links")
+        for link in json.loads(body):
+            if link["short_name"] in names:
+                ids[link["short_name"]] = link["id"]
+    client.close()
+    return ids
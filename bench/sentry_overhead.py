@@ -0,0 +1,123 @@
+"""Redirect latency with Sentry off, with the sampling policy, and fully traced.
+
+Starts gunicorn for each mode and drives /r/<short_name>. Sentry events go
+to a local stand-in collector, so serialization and transport costs are
+included without sending anything out. Uses a temporary SQLite database
+unless DATABASE_URL is set.
+
+    uv run python -m bench.sentry_overhead --modes off,sampled,full
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.common import migrate, run_load, wait_for, write_results
+from bench.seed import seed_api
+
+MODES = {
+    "off": None,
+    "sampled": "",
+    # The previous traces_sample_rate=1.0
+    "full": "ping=1,redirect_to_original=1",
+}
+
+
+class Collector(BaseHTTPRequestHandler):
+    envelopes = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        Collector.envelopes += 1
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(mode: str, args, collector_port: int) -> dict:
+    env = dict(os.environ)
+    env.pop("SENTRY_DSN", None)
+    rates = MODES[mode]
+    if rates is not None:
+        env["SENTRY_DSN"] = f"http://public@127.0.0.1:{collector_port}/1"
+        env["SENTRY_TRACES_SAMPLE_RATES"] = rates
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--workers",
+            str(args.workers),
+            "main:app",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for(base_url)
+        names = list(seed_api(base_url, args.links))
+        Collector.envelopes = 0
+        result = run_load(
+            base_url,
+            lambda: ("GET", f"/r/{random.choice(names)}", None),
+            args.concurrency,
+            args.duration,
+        )
+        result["mode"] = mode
+        result["envelopes"] = Collector.envelopes
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", default="off,sampled,full")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--links", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--collector-port", type=int, default=8091)
+    parser.add_argument("--output", default="bench_sentry_overhead.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    migrate()
+
+    collector = ThreadingHTTPServer(("127.0.0.1", args.collector_port), Collector)
+    threading.Thread(target=collector.serve_forever, daemon=True).start()
+
+    results = []
+    try:
+        for mode in args.modes.split(","):
+            result = run(mode, args, args.collector_port)
+            print(
+                f"sentry={mode:<8} rps={result['rps']:>8} "
+                f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                f"envelopes={result['envelopes']}"
+            )
+            results.append(result)
+    finally:
+        collector.shutdown()
+
+    write_results(args.output, {"runs": results})
+
+
+if __name__ == "__main__":
+    main()
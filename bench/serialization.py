@@ -0,0 +1,109 @@
+"""Serialization cost of a 10k-link listing, step by step.
+
+Loads the links as ORM objects and as plain columns, and serializes the
+formatted list with the stdlib and the orjson JSON providers, checking that
+both produce the same bytes. Uses a temporary SQLite database unless
+DATABASE_URL is set.
+
+    uv run python -m bench.serialization --links 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench.common import migrate, percentile, write_results
+from bench.seed import seed_database
+
+
+def measure(function, rounds: int) -> dict:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(timings, 50) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--output", default="bench_serialization.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    migrate()
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlmodel import Session, delete
+
+    from app import database
+    from app.destinations import select_links
+    from app.models import Destination, Link
+    from app.routes import format_link_response, format_link_values
+    from app.serialization import OrjsonProvider
+    from main import app
+
+    with Session(database.engine) as session:
+        session.exec(delete(Link))
+        session.commit()
+    seed_database(database.engine, args.links)
+
+    def load_objects():
+        with Session(database.engine) as session:
+            return session.exec(
+                select_links(Link, Destination.url).order_by(Link.id)
+            ).all()
+
+    def load_columns():
+        with Session(database.engine) as session:
+            return session.exec(select_links().order_by(Link.id)).all()
+
+    objects, rows = load_objects(), load_columns()
+    links = [format_link_values(*row) for row in rows]
+    stdlib, orjson = DefaultJSONProvider(app), OrjsonProvider(app)
+    compact = {"separators": (",", ":")}
+    assert stdlib.dumps(links, **compact) == orjson.dumps(links, **compact)
+
+    steps = {
+        "load_orm_objects": load_objects,
+        "load_columns": load_columns,
+        "format_objects": lambda: [
+            format_link_response(link, url) for link, url in objects
+        ],
+        "format_columns": lambda: [format_link_values(*row) for row in rows],
+        "dumps_stdlib": lambda: stdlib.dumps(links, **compact),
+        "dumps_orjson": lambda: orjson.dumps(links, **compact),
+    }
+    with app.app_context():
+        steps["response_stdlib"] = lambda: stdlib.response(links)
+        steps["response_orjson"] = lambda: orjson.response(links)
+
+        results = {name: measure(step, args.rounds) for name, step in steps.items()}
+
+    for name, result in results.items():
+        print(f"{name:<18} p50={result['p50_ms']}ms min={result['min_ms']}ms")
+
+    before = (
+        results["load_orm_objects"]["p50_ms"]
+        + results["format_objects"]["p50_ms"]
+        + results["response_stdlib"]["p50_ms"]
+    )
+    after = (
+        results["load_columns"]["p50_ms"]
+        + results["format_columns"]["p50_ms"]
+        + results["response_orjson"]["p50_ms"]
+    )
+    print(f"listing: {before:.1f}ms -> {after:.1f}ms")
+
+    write_results(args.output, {"links": args.links, "steps": results})
+
+
+if __name__ == "__main__":
+    main()
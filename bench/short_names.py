@@ -0,0 +1,83 @@
+"""Creates/sec with server-generated short names across gunicorn workers.
+
+Every request is a POST /api/links without short_name, so the numbers
+include name allocation; any 409 would mean the strategy needed a retry
+round-trip from the client.
+
+    uv run python -m bench.short_names --strategies random,sequence,hashid
+"""
+
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+
+from bench.common import migrate, run_load, wait_for, write_results
+
+
+def run(strategy: str, workers: int, args) -> dict:
+    env = dict(os.environ, SHORT_NAME_STRATEGY=strategy)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--workers",
+            str(workers),
+            "main:app",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    counter = itertools.count()
+    try:
+        wait_for(base_url)
+        result = run_load(
+            base_url,
+            lambda: (
+                "POST",
+                "/api/links",
+                {"original_url": f"https://example.com/{strategy}/{next(counter)}"},
+            ),
+            args.concurrency,
+            args.duration,
+        )
+        result.update(strategy=strategy, workers=workers)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--strategies", default="random,sequence,hashid")
+    parser.add_argument("--workers", default="1,4,16")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", default="bench_short_names.json")
+    args = parser.parse_args()
+
+    migrate()
+    results = []
+    for strategy in args.strategies.split(","):
+        for workers in map(int, args.workers.split(",")):
+            result = run(strategy, workers, args)
+            print(
+                f"strategy={strategy:<8} workers={workers:>3} "
+                f"creates/s={result['rps']:>8} p99={result['p99_ms']}ms "
+                f"statuses={result['statuses']}"
+            )
+            results.append(result)
+
+    write_results(args.output, {"runs": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Table and index sizes, and redirect lookup latency, before and after
+destination URLs moved out of the link table.
+
+Migrates a fresh database to the revision before the destination table,
+seeds --links links pointing at --urls long campaign URLs (so that many
+links share a URL, as they do in production), then reports the size of
+each table and its indexes and times RawQuery redirect lookups. Then it
+runs the expand migration and reports again, and once more after the
+contract migration drops original_url. Postgres only reclaims the space of
+the dropped column once the table is rewritten, so with --vacuum-full the
+report is repeated after VACUUM FULL. Uses a temporary SQLite database
+unless DATABASE_URL is set (it must point at an empty database).
+
+    DATABASE_URL=postgresql://... uv run python -m bench.storage_report --links 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from bench.common import percentile, write_results
+from bench.seed import SEED_BATCH_SIZE
+
+REVISION_BEFORE = "9d4b2f6e1a37"
+TABLES = ("link", "destination")
+
+
+def campaign_url(i: int) -> str:
+    return (
+        f"https://shop{i % 50}.example.com/collections/spring-sale/item-{i}"
+        f"?utm_source=newsletter&utm_medium=email&utm_campaign=spring-{i % 7}"
+        f"&utm_content=banner-{i % 3}"
+    )
+
+
+def seed(engine, links: int, urls: int):
+    import sqlalchemy as sa
+
+    link = sa.table(
+        "link",
+        sa.column("short_name", sa.String),
+        sa.column("original_url", sa.String),
+        sa.column("created_at", sa.DateTime),
+    )
+    created_at = datetime.now()
+    with engine.connect() as connection:
+        for start in range(0, links, SEED_BATCH_SIZE):
+            rows = [
+                {
+                    "short_name": f"bench{i}",
+                    "original_url": campaign_url(i % urls),
+                    "created_at": created_at,
+                }
+                for i in range(start, min(start + SEED_BATCH_SIZE, links))
+            ]
+            connection.execute(sa.insert(link), rows)
+            connection.commit()
+            print(f"  seeded {start + len(rows)}/{links}", end="\r", flush=True)
+    print()
+
+
+def sizes(engine) -> dict:
+    # Bytes per table: heap (with TOAST on Postgres) and all indexes
+    from sqlalchemy import bindparam, inspect, text
+
+    report = {}
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as connection:
+        for table in TABLES:
+            if table not in existing:
+                continue
+            if engine.dialect.name == "postgresql":
+                heap, indexes = connection.execute(
+                    text("SELECT pg_table_size(:t), pg_indexes_size(:t)"),
+                    {"t": table},
+                ).one()
+            else:
+                pages = text(
+                    "SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name IN :names"
+                ).bindparams(bindparam("names", expanding=True))
+                index_names = [
+                    index["name"] for index in inspect(engine).get_indexes(table)
+                ]
+                heap = connection.scalar(pages, {"names": [table]})
+                indexes = connection.scalar(pages, {"names": index_names or [""]})
+            report[table] = {
+                "table_mb": round(heap / 2**20, 2),
+                "indexes_mb": round(indexes / 2**20, 2),
+            }
+    report["total_mb"] = round(
+        sum(t["table_mb"] + t["indexes_mb"] for t in report.values()), 2
+    )
+    return report
+
+
+def redirect_latency(engine, query, links: int, lookups: int) -> dict:
+    names = [f"bench{random.randrange(links)}" for _ in range(lookups)]
+    assert query.first(engine, short_name=names[0]) is not None
+
+    latencies = []
+    for name in names:
+        started = time.perf_counter()
+        query.first(engine, short_name=name)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+    }
+
+
+def report(label: str, engine, query, args) -> dict:
+    result = {
+        "sizes": sizes(engine),
+        "redirect": redirect_latency(engine, query, args.links, args.lookups),
+    }
+    tables = "  ".join(
+        f"{table}={size['table_mb']}MB+{size['indexes_mb']}MB idx"
+        for table, size in result["sizes"].items()
+        if table != "total_mb"
+    )
+    print(
+        f"{label:<12} {tables}  total={result['sizes']['total_mb']}MB  "
+        f"redirect p50={result['redirect']['p50_us']}us "
+        f"p99={result['redirect']['p99_us']}us"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=200000)
+    parser.add_argument("--urls", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--vacuum-full", action="store_true")
+    parser.add_argument("--output", default="bench_storage_report.json")
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+    import sqlalchemy as sa
+
+    from app import database
+    from app.migrations import upgrade
+    from app.routes import redirect_target_query
+
+    engine = database.engine
+    upgrade(engine, REVISION_BEFORE)
+    seed(engine, args.links, args.urls)
+
+    old_link = sa.table(
+        "link",
+        sa.column("id", sa.Integer),
+        sa.column("short_name", sa.String),
+        sa.column("original_url", sa.String),
+    )
+    old_query = database.RawQuery(
+        sa.select(old_link.c.id, old_link.c.original_url).where(
+            old_link.c.short_name == sa.bindparam("short_name")
+        )
+    )
+
+    results = {
+        "backend": database.DATABASE_BACKEND,
+        "links": args.links,
+        "urls": args.urls,
+    }
+    results["before"] = report("before", engine, old_query, args)
+
+    started = time.perf_counter()
+    upgrade(engine)
+    results["migration_seconds"] = round(time.perf_counter() - started, 2)
+    print(f"expand migration took {results['migration_seconds']}s")
+    results["expand"] = report("expand", engine, redirect_target_query, args)
+
+    upgrade(engine, contract=True)
+    results["after"] = report("contract", engine, redirect_target_query, args)
+
+    if args.vacuum_full and database.DATABASE_BACKEND == "postgresql":
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(
+                sa.text("VACUUM FULL link")
+            )
+        results["vacuum_full"] = report(
+            "vacuum full", engine, redirect_target_query, args
+        )
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Loaded by gunicorn from the working directory. GUNICORN_PROFILE picks the
+# worker class; sizes default from the CPUs available to the container.
+import os
+import sys
+
+GUNICORN_PROFILE = os.getenv("GUNICORN_PROFILE", "gthread")
+
+if GUNICORN_PROFILE == "gevent":
+    # Before anything else is imported, including the preloaded app
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+CPUS = available_cpus()
+
+# worker_class, app, default workers, threads and timeout per profile.
+# A sync worker cannot heartbeat while it serves a request, so its timeout
+# must cover the longest response (streamed exports, unpaginated listings);
+# the other workers heartbeat from their main loop during long requests.
+PROFILES = {
+    # Threads overlap the database round trips of redirects
+    "gthread": ("gthread", "main:app", CPUS + 1, 4, 30),
+    # One request per process: CPU-bound work, simplest failure model
+    "sync": ("sync", "main:app", 2 * CPUS + 1, 1, 300),
+    # Greenlets for many concurrent, mostly waiting requests (pip install gevent)
+    "gevent": ("gevent", "main:app", CPUS + 1, 1, 30),
+    # Redirects and reads on the event loop (app/asgi.py)
+    "uvicorn": ("uvicorn.workers.UvicornWorker", "asgi:app", CPUS + 1, 1, 30),
+}
+
+if GUNICORN_PROFILE not in PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE: {GUNICORN_PROFILE}")
+
+(
+    worker_class,
+    wsgi_app,
+    default_workers,
+    default_threads,
+    default_timeout,
+) = PROFILES[GUNICORN_PROFILE]
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8080")
+workers = env_int("GUNICORN_WORKERS", env_int("WEB_CONCURRENCY", default_workers))
+threads = env_int("GUNICORN_THREADS", default_threads)
+worker_connections = env_int("GUNICORN_WORKER_CONNECTIONS", 1000)
+
+# Import the app once in the master, workers share its memory copy-on-write
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true")
+
+# Recycle workers to bound leaks, jittered so they do not restart together
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10)
+
+# nginx keeps upstream connections open, so keep them a bit longer than it
+keepalive = env_int("GUNICORN_KEEPALIVE", 75)
+timeout = env_int("GUNICORN_TIMEOUT", default_timeout)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+
+# Worker heartbeats on tmpfs, a disk-backed /tmp can stall them in containers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def on_starting(server):
+    # The bloom filter learns names created by other workers from the
+    # invalidation bus; the local bus stays in one process, so their new
+    # links would get 404s until the next rebuild
+    from app.bloom import BLOOM_FILTER_ENABLED
+    from app.invalidation import INVALIDATION_BACKEND
+
+    if (
+        BLOOM_FILTER_ENABLED
+        and INVALIDATION_BACKEND != "postgres"
+        and server.cfg.workers > 1
+    ):
+        raise RuntimeError(
+            "BLOOM_FILTER_ENABLED with several workers needs "
+            "INVALIDATION_BACKEND=postgres"
+        )
+
+
+def post_fork(server, worker):
+    # Connections, threads and locks of the master must not be shared
+    if "app.database" in sys.modules:
+        from app.database import reset_after_fork
+
+        reset_after_fork()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a worker that exited (PROMETHEUS_MULTIPROC_DIR)
+    from app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -1,63 +1,70 @@
 import os
-import subprocess
 
-import sentry_sdk
 from dotenv import load_dotenv
-from flask import Flask, jsonify
-from flask_cors import CORS
-from sentry_sdk.integrations.flask import FlaskIntegration
-
-from app.routes import api
+from flask import Flask, current_app, jsonify
 
 load_dotenv()
 
-# Run database migrations on startup
-try:
-    subprocess.run(["alembic", "upgrade", "head"], check=True, capture_output=True)
-    print("Database migrations applied successfully")
-except subprocess.CalledProcessError as e:
-    print(f"Warning: Migration failed: {e.stderr.decode()}")
-
-app = Flask(__name__)
-
-# Register blueprints
-app.register_blueprint(api)
-
-if os.getenv("DEBUG"):
-    CORS(
-        app,
-        origins=["http://localhost:5173"],
-        methods=["GET", "POST", "PUT", "DELETE"],
-    )
-
-# SENTRY
-sentry_dsn = os.getenv("SENTRY_DSN")
-if sentry_dsn:
-    sentry_sdk.init(
-        dsn=sentry_dsn,
-        integrations=[FlaskIntegration()],
-        traces_sample_rate=1.0,
-        environment="production",
-    )
+from app import metrics, ratelimit  # noqa: E402
+from app.routes import api  # noqa: E402
+from app.serialization import json_provider_class  # noqa: E402
 
 
 # ERRORS
-@app.errorhandler(404)
 def not_found(error):
     return jsonify({"detail": "The requested URL was not found on the server."}), 404
 
 
-@app.errorhandler(500)
 def internal_error(error):
     return jsonify({"detail": "An unexpected error occurred."}), 500
 
 
-@app.errorhandler(Exception)
 def handle_exception(error):
-    app.logger.error(f"Unhandled exception: {error}", exc_info=True)
+    current_app.logger.error(f"Unhandled exception: {error}", exc_info=True)
 
     return jsonify({"detail": "An unexpected error occurred."}), 500
 
 
+# Migrations are a separate step (python -m app.migrations), so creating
+# the app never touches the database
+def create_app() -> Flask:
+    app = Flask(__name__)
+    app.json = json_provider_class()(app)
+
+    # Register blueprints
+    app.register_blueprint(api)
+
+    # METRICS
+    metrics.init_app(app)
+
+    # RATE LIMITS, after the metrics so that 429s are measured
+    ratelimit.init_app(app)
+
+    if os.getenv("DEBUG"):
+        from flask_cors import CORS
+
+        CORS(
+            app,
+            origins=["http://localhost:5173"],
+            methods=["GET", "POST", "PUT", "DELETE"],
+        )
+
+    # SENTRY
+    sentry_dsn = os.getenv("SENTRY_DSN")
+    if sentry_dsn:
+        from app.tracing import init_sentry
+
+        init_sentry(app, sentry_dsn)
+
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, internal_error)
+    app.register_error_handler(Exception, handle_exception)
+
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080, debug=True)
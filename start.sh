@@ -3,8 +3,27 @@ set -e
 
 envsubst '${PORT}' < /etc/nginx/nginx.conf.template > /etc/nginx/nginx.conf
 
-uv run alembic upgrade head
+# Once per container, before the workers start
+uv run python -m app.migrations
 
+# Counts the clicks nginx logs (nginx.conf), including cache hits
+uv run python -m app.clicklog &
+
+mkdir -p /var/cache/nginx/redirects
 nginx
 
-exec uv run gunicorn --bind 127.0.0.1:8080 --workers 2 main:app
\ No newline at end of file
+# Changed links are re-fetched into the nginx redirect cache (nginx.conf)
+export CACHE_PURGE_URL="${CACHE_PURGE_URL:-http://127.0.0.1:8081}"
+
+# Workers share metrics through files, stale ones from a previous run are removed
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# ASYNC_SERVING=1 serves redirects and link reads on the event loop
+if [ -n "$ASYNC_SERVING" ]; then
+    export GUNICORN_PROFILE="${GUNICORN_PROFILE:-uvicorn}"
+fi
+
+# Worker class, workers and threads come from gunicorn.conf.py
+exec uv run gunicorn
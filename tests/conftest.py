@@ -4,7 +4,11 @@ from sqlmodel.pool import StaticPool
 
 import app.database as database
 import app.routes as routes
-from app.models import Link
+from app.bloom import short_name_filter
+from app.cache import redirect_cache
+from app.clicks import click_buffer
+from app.counting import link_count_cache
+from app.models import ClickStat, Destination, Link
 from main import app as flask_app
 
 
@@ -28,10 +32,19 @@ def test_engine():
 @pytest.fixture(scope="function")
 def client(test_engine, monkeypatch):
     with Session(bind=test_engine) as session:
+        session.exec(delete(ClickStat))
         statement = delete(Link)
         session.exec(statement)
+        session.exec(delete(Destination))
         session.commit()
 
+    redirect_cache.clear()
+    click_buffer.clear()
+    # Tests flush explicitly instead of racing the background thread
+    monkeypatch.setattr(click_buffer._flusher, "ensure_running", lambda: None)
+    link_count_cache.reset()
+    short_name_filter.clear()
+
     monkeypatch.setattr(database, "engine", test_engine)
     monkeypatch.setattr(routes, "BASE_URL", "http://testserver")
 
@@ -39,3 +52,34 @@ def client(test_engine, monkeypatch):
 
     with flask_app.test_client() as test_client:
         yield test_client
+
+    click_buffer.clear()
+
+
+# LINKS CREATED THROUGH THE API
+@pytest.fixture
+def create_link(client):
+    def create(short_name: str, url: str = None) -> int:
+        response = client.post(
+            "/api/links",
+            json={
+                "original_url": url or f"https://example.com/{short_name}",
+                "short_name": short_name,
+            },
+        )
+        assert response.status_code == 201
+        return response.get_json()["id"]
+
+    return create
+
+
+@pytest.fixture
+def create_links(create_link):
+    # link0, link1... pointing at https://example.com/0, /1...
+    def create(count: int, first: int = 0) -> list[int]:
+        return [
+            create_link(f"link{i}", f"https://example.com/{i}")
+            for i in range(first, first + count)
+        ]
+
+    return create
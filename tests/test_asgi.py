@@ -0,0 +1,263 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine
+
+import app.counting as counting
+import app.database as database
+import app.ratelimit as ratelimit
+from app.asgi import create_asgi_app
+from app.bloom import short_name_filter
+from main import app as flask_app
+
+
+# The async app needs its own engine, so both engines share a SQLite file
+@pytest.fixture
+def asgi_client(client, tmp_path, monkeypatch):
+    path = tmp_path / "links.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", async_engine)
+
+    asgi_app = create_asgi_app(flask_app)
+
+    def request(method, path, query="", body=None, headers=()):
+        return asyncio.run(call(asgi_app, method, path, query, body, headers))
+
+    yield request
+
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+
+async def call(asgi_app, method, path, query, body, headers):
+    body = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *((name.lower().encode(), value.encode()) for name, value in headers),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"body": b""}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                key.decode().lower(): value.decode()
+                for key, value in message["headers"]
+            }
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await asgi_app(scope, receive, send)
+    return response
+
+
+def create_links(request, count):
+    for i in range(count):
+        response = request(
+            "POST",
+            "/api/links",
+            body={"original_url": f"https://example.com/{i}", "short_name": f"l{i}"},
+        )
+        assert response["status"] == 201
+
+
+def test_async_redirect(asgi_client):
+    create_links(asgi_client, 1)
+
+    response = asgi_client("GET", "/r/l0")
+    assert response["status"] == 301
+    assert response["headers"]["location"] == "https://example.com/0"
+
+    response = asgi_client("GET", "/r/missing")
+    assert response["status"] == 404
+    assert "detail" in json.loads(response["body"])
+
+
+def test_async_redirect_bloom_filter(asgi_client):
+    create_links(asgi_client, 1)
+    short_name_filter.rebuild()
+
+    assert asgi_client("GET", "/r/l0")["status"] == 301
+    assert asgi_client("GET", "/r/probe")["status"] == 404
+    assert short_name_filter.stats()["rejections"] == 1
+
+
+def test_async_redirect_rate_limit(asgi_client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "limiter", ratelimit.LocalRateLimiter(1000))
+    monkeypatch.setattr(ratelimit, "RATE_LIMITS", {"redirect": ratelimit.Limit(1, 2)})
+    create_links(asgi_client, 1)
+
+    headers = [("X-Real-IP", "203.0.113.7")]
+    statuses = [
+        asgi_client("GET", "/r/l0", headers=headers)["status"] for _ in range(3)
+    ]
+    assert statuses == [301, 301, 429]
+
+    response = asgi_client("GET", "/r/l0", headers=headers)
+    assert response["headers"]["retry-after"] == "1"
+    assert response["headers"]["cache-control"] == "no-store"
+
+
+def test_async_get_link_matches_flask(asgi_client, client):
+    create_links(asgi_client, 1)
+
+    response = asgi_client("GET", "/api/links/1")
+    assert response["status"] == 200
+    assert response["body"] == client.get("/api/links/1").data
+
+    assert asgi_client("GET", "/api/links/99")["status"] == 404
+
+
+def test_async_get_links_range_matches_flask(asgi_client, client):
+    create_links(asgi_client, 5)
+
+    response = asgi_client("GET", "/api/links", "range=[1,2]")
+    flask_response = client.get("/api/links?range=[1,2]")
+    assert response["status"] == 200
+    assert response["body"] == flask_response.data
+    assert response["headers"]["content-range"] == "links 2-3/5"
+
+    assert asgi_client("GET", "/api/links", "range=bad")["status"] == 400
+
+
+def test_async_cached_count_serves_concurrent_ranges(asgi_client, monkeypatch):
+    monkeypatch.setattr(counting, "LINK_COUNT_STRATEGY", "cached")
+    create_links(asgi_client, 5)
+    asgi_app = create_asgi_app(flask_app)
+
+    async def fetch_ranges():
+        return await asyncio.gather(
+            *(
+                call(asgi_app, "GET", "/api/links", "range=[0,9]", None, ())
+                for _ in range(10)
+            )
+        )
+
+    # A deadlock blocks the event loop itself, so wait from another thread
+    responses = []
+    thread = threading.Thread(
+        target=lambda: responses.extend(asyncio.run(fetch_ranges())), daemon=True
+    )
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert [response["status"] for response in responses] == [200] * 10
+    assert {response["headers"]["content-range"] for response in responses} == {
+        "links 1-5/5"
+    }
+
+
+def test_async_search_matches_flask(asgi_client, client):
+    create_links(asgi_client, 12)
+
+    response = asgi_client("GET", "/api/links", "q=example.com/1&range=[0,1]")
+    flask_response = client.get("/api/links?q=example.com/1&range=[0,1]")
+    assert response["body"] == flask_response.data
+    assert response["headers"]["content-range"] == "links 1-2/3"
+
+    response = asgi_client("GET", "/api/links", "q=l1&cursor=")
+    assert response["status"] == 400
+
+
+def test_async_get_links_cursor(asgi_client):
+    create_links(asgi_client, 3)
+
+    response = asgi_client("GET", "/api/links", "cursor=&limit=2")
+    assert [link["id"] for link in json.loads(response["body"])] == [1, 2]
+    cursor = response["headers"]["x-next-cursor"]
+
+    response = asgi_client("GET", "/api/links", f"cursor={cursor}&limit=2")
+    assert [link["id"] for link in json.loads(response["body"])] == [3]
+    assert "x-next-cursor" not in response["headers"]
+
+
+def test_async_app_passes_other_requests_to_flask(asgi_client):
+    create_links(asgi_client, 2)
+
+    response = asgi_client("GET", "/api/links")
+    assert response["status"] == 200
+    assert len(json.loads(response["body"])) == 2
+
+    assert asgi_client("GET", "/ping")["body"] == b"pong"
+
+
+def test_async_requests_are_measured(asgi_client):
+    create_links(asgi_client, 1)
+    labels = {"endpoint": "get_link"}
+    queries = REGISTRY.get_sample_value("http_request_db_queries_sum", labels) or 0
+
+    asgi_client("GET", "/api/links/1")
+
+    sample = REGISTRY.get_sample_value(
+        "http_requests_total",
+        {"endpoint": "get_link", "method": "GET", "status": "200"},
+    )
+    assert sample >= 1
+    assert REGISTRY.get_sample_value("http_request_db_queries_sum", labels) > queries
+
+
+def test_async_redirect_caching_headers(asgi_client, client):
+    create_links(asgi_client, 1)
+
+    response = asgi_client("GET", "/r/l0")
+    flask_response = client.get("/r/l0")
+    assert response["headers"]["etag"] == flask_response.headers["ETag"]
+    assert (
+        response["headers"]["cache-control"] == flask_response.headers["Cache-Control"]
+    )
+
+    etag = response["headers"]["etag"]
+    response = asgi_client("GET", "/r/l0", headers=[("If-None-Match", etag)])
+    assert response["status"] == 304
+    assert "location" not in response["headers"]
+
+
+def test_async_link_reads_etags_match_flask(asgi_client, client):
+    create_links(asgi_client, 3)
+
+    for path, query in [("/api/links/1", ""), ("/api/links", "range=[0,1]")]:
+        response = asgi_client("GET", path, query)
+        flask_response = client.get(f"{path}?{query}")
+        etag = response["headers"]["etag"]
+        assert etag == flask_response.headers["ETag"]
+        assert response["headers"]["cache-control"] == "no-cache"
+
+        response = asgi_client("GET", path, query, headers=[("If-None-Match", etag)])
+        assert response["status"] == 304
+        assert response["body"] == b""
+
+    response = asgi_client(
+        "GET", "/api/links", "cursor=", headers=[("If-None-Match", etag)]
+    )
+    assert response["status"] == 304
@@ -0,0 +1,28 @@
+import os
+import threading
+
+import app.background as background
+from app.background import WorkerThread
+
+
+def test_worker_thread_starts_once_per_process(monkeypatch):
+    started = []
+    done = threading.Event()
+
+    def target():
+        started.append(threading.current_thread().name)
+        done.set()
+
+    worker = WorkerThread(target, "test-worker")
+    worker.ensure_running()
+    worker.ensure_running()
+    assert done.wait(5)
+    assert started == ["test-worker"]
+
+    # A forked worker has no thread, so it starts its own
+    done.clear()
+    forked_pid = os.getpid() + 1
+    monkeypatch.setattr(background.os, "getpid", lambda: forked_pid)
+    worker.ensure_running()
+    assert done.wait(5)
+    assert started == ["test-worker", "test-worker"]
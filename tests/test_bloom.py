@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import insert
+
+import app.database as database
+from app.bloom import BloomFilter, short_name_filter
+from app.destinations import intern_destination
+from app.httpcache import REFRESH_HEADER
+from app.models import Link
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    durations = []
+    monkeypatch.setattr(database, "raw_query_listeners", [durations.append])
+    return durations
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000, 0.01, 2**20)
+    names = [f"name{i}" for i in range(10000)]
+    for name in names:
+        bloom.add(name)
+
+    assert all(name in bloom for name in names)
+    false_positives = sum(f"other{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert bloom.false_positive_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_bloom_filter_memory_cap():
+    bloom = BloomFilter(10000, 0.001, 1024)
+
+    assert bloom.memory_bytes == 1024
+    for i in range(10000):
+        bloom.add(f"name{i}")
+    # Smaller than 0.001 would need, so more false positives
+    assert bloom.false_positive_rate() > 0.1
+
+
+def test_unknown_names_skip_the_database(client, queries, create_link):
+    create_link("known")
+    short_name_filter.rebuild()
+
+    assert client.get("/r/probe").status_code == 404
+    assert queries == []
+    assert client.get("/r/known").status_code == 301
+    assert len(queries) == 1
+
+    stats = client.get("/api/cache/stats").get_json()["bloom"]
+    assert stats["ready"] is True
+    assert stats["names"] == 1
+    assert stats["checks"] == 2
+    assert stats["rejections"] == 1
+    assert stats["memory_bytes"] > 0
+
+
+def test_created_and_renamed_links_are_added(client, create_link):
+    short_name_filter.rebuild()
+
+    create_link("new")
+    assert client.get("/r/new").status_code == 301
+
+    link_id = client.get("/api/links").get_json()[0]["id"]
+    client.put(
+        f"/api/links/{link_id}",
+        json={"original_url": "https://example.com", "short_name": "renamed"},
+    )
+    assert client.get("/r/renamed").status_code == 301
+
+    response = client.post(
+        "/api/links/bulk",
+        json=[{"original_url": "https://example.com", "short_name": "bulk"}],
+    )
+    assert response.status_code == 200
+    assert client.get("/r/bulk").status_code == 301
+
+
+def test_names_added_during_a_rebuild_are_kept(client, monkeypatch, create_link):
+    scan = short_name_filter._scan
+
+    def scan_while_creating():
+        bloom = scan()
+        create_link("during")
+        return bloom
+
+    monkeypatch.setattr(short_name_filter, "_scan", scan_while_creating)
+    short_name_filter.rebuild()
+
+    assert client.get("/r/during").status_code == 301
+
+
+def test_reset_and_refreshes_bypass_the_filter(client, queries):
+    short_name_filter.rebuild()
+    # Inserted behind the app's back, e.g. by another worker
+    with database.engine.connect() as connection:
+        destination_id = intern_destination(connection, "https://example.com/")
+        connection.execute(
+            insert(Link).values(
+                destination_id=destination_id,
+                short_name="elsewhere",
+                created_at=datetime(2026, 1, 1),
+            )
+        )
+        connection.commit()
+
+    assert client.get("/r/elsewhere").status_code == 404
+    assert client.get("/r/elsewhere", headers={REFRESH_HEADER: "1"}).status_code == 301
+
+    short_name_filter.reset()
+    assert client.get("/r/unknown").status_code == 404
+    assert len(queries) == 2
@@ -0,0 +1,55 @@
+import app.cache as cache
+from app.cache import MISSING, TTLCache
+
+
+def test_get_missing_key():
+    lru = TTLCache(maxsize=2, ttl=60)
+    assert lru.get("a") is MISSING
+    assert lru.stats()["misses"] == 1
+
+
+def test_negative_entries_are_cached():
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", None)
+    assert lru.get("a") is None
+    assert lru.stats()["hits"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert lru.get("b") is MISSING
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = TTLCache(maxsize=2, ttl=10)
+    lru.set("a", 1)
+
+    now[0] += 9
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is MISSING
+    assert lru.stats()["expirations"] == 1
+
+
+def test_set_with_outdated_version_is_ignored():
+    lru = TTLCache(maxsize=2, ttl=60)
+    version = lru.version
+    lru.invalidate("a")
+    lru.set("a", "stale", version)
+    assert lru.get("a") is MISSING
+
+
+def test_zero_size_disables_cache():
+    lru = TTLCache(maxsize=0, ttl=60)
+    lru.set("a", 1)
+    assert lru.get("a") is MISSING
@@ -0,0 +1,39 @@
+import socket
+
+from app.clicklog import count_clicks, parse_message, receive
+from app.clicks import click_buffer
+
+
+def test_parse_message():
+    assert parse_message(b"<190>Oct 18 19:50:47 nginx: 1792353047.5 /r/abc") == (
+        1792353047.5,
+        "abc",
+    )
+    assert parse_message(b"<190>Oct 18 19:50:47 host nginx: 1.0 /r/a") == (1.0, "a")
+    assert parse_message(b"<190>Oct 18 19:50:47 nginx: 1.0 /api/links") is None
+    assert parse_message(b"<190>Oct 18 19:50:47 nginx: - /r/abc") is None
+    assert parse_message(b"garbage") is None
+
+
+def test_clicks_are_counted_in_their_minute(client, create_link):
+    link_id = create_link("logged")
+
+    counted = count_clicks([(120.5, "logged"), (179.0, "logged"), (0.0, "missing")])
+
+    assert counted == 2
+    assert click_buffer.pending() == {(link_id, 2): 2}
+
+
+def test_receive_batches_datagrams():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for message in (b"nginx: 1.0 /r/a", b"nginx: 2.0 /favicon.ico", b"nginx: 3.0 /r/b"):
+        sender.sendto(message, receiver.getsockname())
+
+    try:
+        assert receive(receiver, 2, 1) == [(1.0, "a"), (3.0, "b")]
+        assert receive(receiver, 2, 0.05) == []
+    finally:
+        sender.close()
+        receiver.close()
@@ -0,0 +1,136 @@
+from sqlmodel import Session, select
+
+import app.clicks as clicks
+from app.clicks import click_buffer
+from app.models import ClickStat
+
+
+def test_redirects_are_buffered_until_flush(client, create_link):
+    link_id = create_link("clicked")
+
+    for _ in range(3):
+        response = client.get("/r/clicked", follow_redirects=False)
+        assert response.status_code == 301
+
+    assert sum(click_buffer.pending().values()) == 3
+    assert client.get(f"/api/links/{link_id}/stats").get_json()["total"] == 0
+
+    assert click_buffer.flush() == 1
+    assert click_buffer.pending() == {}
+
+    data = client.get(f"/api/links/{link_id}/stats").get_json()
+    assert data["link_id"] == link_id
+    assert data["total"] == 3
+    assert len(data["buckets"]) == 1
+    assert data["buckets"][0]["clicks"] == 3
+
+
+def test_flushes_add_to_existing_buckets(client, create_link):
+    link_id = create_link("clicked")
+
+    client.get("/r/clicked")
+    click_buffer.flush()
+    client.get("/r/clicked")
+    client.get("/r/clicked")
+    click_buffer.flush()
+
+    data = client.get(f"/api/links/{link_id}/stats").get_json()
+    assert data["total"] == 3
+
+
+def test_cached_redirects_are_counted(client, create_link):
+    link_id = create_link("clicked")
+
+    client.get("/r/clicked")
+    client.get("/r/clicked")
+    click_buffer.flush()
+
+    assert client.get("/api/cache/stats").get_json()["redirect"]["hits"] == 1
+    assert client.get(f"/api/links/{link_id}/stats").get_json()["total"] == 2
+
+
+def test_missing_links_are_not_counted(client):
+    client.get("/r/missing")
+    assert click_buffer.pending() == {}
+
+
+def test_failed_flush_keeps_counts(client, monkeypatch, create_link):
+    create_link("clicked")
+    client.get("/r/clicked")
+
+    def fail(rows):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(click_buffer, "_upsert", fail)
+    assert click_buffer.flush() == 0
+    assert sum(click_buffer.pending().values()) == 1
+
+
+def test_failed_batch_keeps_only_unwritten_counts(client, monkeypatch, create_link):
+    for short_name in ("a", "b", "c"):
+        create_link(short_name)
+        client.get(f"/r/{short_name}")
+
+    upsert = click_buffer._upsert
+    calls = []
+
+    def fail_second_batch(rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError("database is down")
+        upsert(rows)
+
+    monkeypatch.setattr(clicks, "UPSERT_BATCH_SIZE", 1)
+    monkeypatch.setattr(click_buffer, "_upsert", fail_second_batch)
+    assert click_buffer.flush() == 1
+    assert sum(click_buffer.pending().values()) == 2
+
+    monkeypatch.setattr(click_buffer, "_upsert", upsert)
+    assert click_buffer.flush() == 2
+    assert client.get("/api/links/1/stats").get_json()["total"] == 1
+
+
+def test_restore_drops_the_oldest_buckets(client, monkeypatch):
+    monkeypatch.setattr(click_buffer, "max_pending", 2)
+    monkeypatch.setattr(click_buffer, "_counts", {(1, 10): 1, (1, 12): 2})
+
+    def fail(rows):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(click_buffer, "_upsert", fail)
+    click_buffer.flush()
+    click_buffer.record(1)
+    click_buffer.flush()
+
+    pending = click_buffer.pending()
+    assert len(pending) == 2
+    assert (1, 10) not in pending
+    assert pending[(1, 12)] == 2
+
+
+def test_clicks_of_deleted_links_are_dropped(client, test_engine, create_link):
+    link_id = create_link("clicked")
+    kept_id = create_link("kept")
+    client.get("/r/clicked")
+    client.get("/r/kept")
+    client.delete(f"/api/links/{link_id}")
+
+    # SQLite only enforces foreign keys when asked to
+    with test_engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+    try:
+        click_buffer.flush()
+    finally:
+        with test_engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+
+    assert click_buffer.pending() == {}
+    assert client.get(f"/api/links/{kept_id}/stats").get_json()["total"] == 1
+    with Session(test_engine) as session:
+        assert session.exec(select(ClickStat.link_id)).all() == [kept_id]
+
+
+def test_stats_for_missing_link(client):
+    response = client.get("/api/links/999/stats")
+    assert response.status_code == 404
+    assert response.get_json() == {"detail": "Link with id 999 not found"}
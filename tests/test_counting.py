@@ -0,0 +1,48 @@
+from sqlmodel import Session
+
+import app.counting as counting
+import app.database as database
+from app.counting import count_links, estimated_count
+
+
+def test_estimated_strategy_falls_back_to_exact_on_sqlite(
+    client, monkeypatch, create_links
+):
+    monkeypatch.setattr(counting, "LINK_COUNT_STRATEGY", "estimated")
+    create_links(3)
+
+    response = client.get("/api/links?range=[0,1]")
+    assert response.headers["Content-Range"] == "links 1-2/3"
+
+
+def test_estimated_total_is_marked(client, monkeypatch, create_links):
+    monkeypatch.setattr(counting, "estimated_count", lambda session: 1000)
+    monkeypatch.setattr(counting, "LINK_COUNT_STRATEGY", "estimated")
+    create_links(3)
+
+    response = client.get("/api/links?range=[0,1]")
+    assert response.headers["Content-Range"] == "links 1-2/1000 (estimated)"
+
+    # The streamed listing cannot claim 1000 rows it never counted
+    response = client.get("/api/links")
+    assert len(response.get_json()) == 3
+    assert response.headers["Content-Range"] == "links */1000 (estimated)"
+
+
+def test_cached_strategy_tracks_creates_and_deletes(client, monkeypatch, create_links):
+    monkeypatch.setattr(counting, "LINK_COUNT_STRATEGY", "cached")
+    create_links(3)
+
+    response = client.get("/api/links?range=[0,9]")
+    assert response.headers["Content-Range"] == "links 1-3/3"
+
+    create_links(2, first=3)
+    client.delete("/api/links/1")
+    response = client.get("/api/links?range=[0,1]")
+    assert response.headers["Content-Range"] == "links 1-2/4"
+
+
+def test_count_links_exact_by_default(client):
+    with Session(database.engine) as session:
+        assert count_links(session) == (0, False)
+        assert estimated_count(session) is None
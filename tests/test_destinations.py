@@ -0,0 +1,191 @@
+import sqlite3
+
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import Session, func, select
+
+import app.search as search
+from alembic import command
+from app.destinations import intern_destinations
+from app.migrations import ALEMBIC_INI, upgrade
+from app.models import Destination, Link
+
+
+def destination_count(engine) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Destination)).one()
+
+
+def test_links_to_the_same_url_share_a_destination(client, test_engine):
+    for short_name, url in (
+        ("first", "https://example.com/page"),
+        ("second", "HTTPS://Example.COM:443/page"),
+        ("other", "https://example.com/other"),
+    ):
+        response = client.post(
+            "/api/links", json={"original_url": url, "short_name": short_name}
+        )
+        assert response.status_code == 201
+
+    assert client.get("/api/links/2").get_json()["original_url"] == (
+        "https://example.com/page"
+    )
+    assert destination_count(test_engine) == 2
+    with Session(test_engine) as session:
+        first, second = session.exec(
+            select(Link.destination_id).where(Link.short_name != "other")
+        ).all()
+    assert first == second
+
+
+def test_bulk_create_interns_destinations(client, test_engine):
+    response = client.post(
+        "/api/links/bulk",
+        json=[
+            {"original_url": "https://example.com/a", "short_name": "bulk1"},
+            {"original_url": "https://example.com/a", "short_name": "bulk2"},
+            {"original_url": "https://example.com/b", "short_name": "bulk3"},
+        ],
+    )
+    assert response.get_json()["created"] == 3
+
+    assert destination_count(test_engine) == 2
+    assert client.get("/r/bulk2", follow_redirects=False).location == (
+        "https://example.com/a"
+    )
+
+
+def test_update_moves_link_to_another_destination(client, test_engine):
+    client.post(
+        "/api/links",
+        json={"original_url": "https://example.com/old", "short_name": "moving"},
+    )
+    response = client.put(
+        "/api/links/1",
+        json={"original_url": "https://example.com/new", "short_name": "moving"},
+    )
+    assert response.get_json()["original_url"] == "https://example.com/new"
+    assert client.get("/r/moving", follow_redirects=False).location == (
+        "https://example.com/new"
+    )
+    # The old destination is kept for links that may point at it again
+    assert destination_count(test_engine) == 2
+
+    response = client.put("/api/links/1", json={"short_name": "renamed"})
+    assert response.get_json()["original_url"] == "https://example.com/new"
+
+
+def test_intern_destinations_returns_existing_ids(test_engine):
+    with test_engine.connect() as connection:
+        first = intern_destinations(connection, ["https://example.com/x"])
+        both = intern_destinations(
+            connection, ["https://example.com/x", "https://example.com/y"]
+        )
+        connection.rollback()
+
+    assert both["https://example.com/x"] == first["https://example.com/x"]
+    assert len(set(both.values())) == 2
+
+
+def test_search_with_many_matching_destinations(client, monkeypatch):
+    for i in range(3):
+        client.post(
+            "/api/links",
+            json={
+                "original_url": f"https://docs.example.com/{i}",
+                "short_name": f"d{i}",
+            },
+        )
+    # Falls back to a subquery instead of a list of destination ids
+    monkeypatch.setattr(search, "SEARCH_MAX_DESTINATIONS", 1)
+
+    response = client.get("/api/links?q=docs.example&range=[0,9]")
+    assert [link["short_name"] for link in response.get_json()] == ["d0", "d1", "d2"]
+    assert response.headers["Content-Range"] == "links 1-3/3"
+
+
+def migrated_engine(tmp_path):
+    # A database from before the destination table, with links
+    database_path = tmp_path / "links.db"
+    engine = create_engine(f"sqlite:///{database_path}")
+    upgrade(engine, "9d4b2f6e1a37")
+    with sqlite3.connect(database_path) as connection:
+        connection.executemany(
+            "INSERT INTO link (original_url, short_name, created_at) VALUES (?, ?, ?)",
+            [
+                ("https://example.com/a", "one", "2026-01-01 00:00:00"),
+                ("https://example.com/b", "two", "2026-01-01 00:00:00"),
+                ("https://example.com/a", "three", "2026-01-01 00:00:00"),
+            ],
+        )
+    return engine
+
+
+def link_columns(engine) -> set[str]:
+    return {column["name"] for column in inspect(engine).get_columns("link")}
+
+
+def test_migration_moves_existing_urls(tmp_path):
+    engine = migrated_engine(tmp_path)
+
+    upgrade(engine)
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Link.short_name, Destination.url)
+            .join(Destination, Link.destination_id == Destination.id)
+            .order_by(Link.id)
+        ).all()
+    assert rows == [
+        ("one", "https://example.com/a"),
+        ("two", "https://example.com/b"),
+        ("three", "https://example.com/a"),
+    ]
+    assert destination_count(engine) == 2
+    engine.dispose()
+
+
+def test_original_url_is_dropped_only_when_contracting(tmp_path):
+    engine = migrated_engine(tmp_path)
+
+    # Instances of the previous version still read original_url
+    upgrade(engine)
+    assert {"original_url", "destination_id"} <= link_columns(engine)
+    with Session(engine) as session:
+        session.add(Link(short_name="new", destination_id=1))
+        session.commit()
+
+    upgrade(engine, contract=True)
+    assert "original_url" not in link_columns(engine)
+    engine.dispose()
+
+
+def test_fresh_database_is_migrated_to_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'links.db'}")
+
+    upgrade(engine)
+
+    assert "original_url" not in link_columns(engine)
+    engine.dispose()
+
+
+def test_migrations_downgrade(tmp_path):
+    engine = migrated_engine(tmp_path)
+    upgrade(engine, contract=True)
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, "c4f7a2e9d815")
+        connection.commit()
+        rows = connection.execute(
+            text("SELECT short_name, original_url FROM link ORDER BY id")
+        ).all()
+        assert rows[1] == ("two", "https://example.com/b")
+
+        command.downgrade(config, "9d4b2f6e1a37")
+        connection.commit()
+    assert "destination_id" not in link_columns(engine)
+    assert "destination" not in inspect(engine).get_table_names()
+    engine.dispose()
@@ -0,0 +1,90 @@
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import app.bloom as bloom
+import app.database as database
+import app.invalidation as invalidation
+
+CONFIG = Path(__file__).parent.parent / "gunicorn.conf.py"
+
+
+def load_config(monkeypatch, **env):
+    for name in (
+        "GUNICORN_PROFILE",
+        "GUNICORN_WORKERS",
+        "WEB_CONCURRENCY",
+        "GUNICORN_THREADS",
+        "GUNICORN_TIMEOUT",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(CONFIG))
+
+
+def test_profiles(monkeypatch):
+    config = load_config(monkeypatch)
+    assert config["worker_class"] == "gthread"
+    assert config["wsgi_app"] == "main:app"
+    assert config["threads"] == 4
+    assert config["timeout"] == 30
+    assert config["preload_app"] is True
+
+    # Sync workers are killed when a single response outlasts the timeout
+    config = load_config(monkeypatch, GUNICORN_PROFILE="sync")
+    assert config["worker_class"] == "sync"
+    assert config["workers"] == 2 * config["CPUS"] + 1
+    assert config["timeout"] == 300
+
+    config = load_config(monkeypatch, GUNICORN_PROFILE="sync", GUNICORN_TIMEOUT="60")
+    assert config["timeout"] == 60
+
+    config = load_config(monkeypatch, GUNICORN_PROFILE="uvicorn")
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert config["wsgi_app"] == "asgi:app"
+
+
+def test_sizes_from_env(monkeypatch):
+    config = load_config(
+        monkeypatch,
+        GUNICORN_PROFILE="gthread",
+        WEB_CONCURRENCY="3",
+        GUNICORN_THREADS="8",
+    )
+    assert (config["workers"], config["threads"]) == (3, 8)
+
+    config = load_config(monkeypatch, GUNICORN_WORKERS="5", WEB_CONCURRENCY="3")
+    assert config["workers"] == 5
+    assert config["max_requests_jitter"] == config["max_requests"] // 10
+
+
+def test_unknown_profile(monkeypatch):
+    with pytest.raises(ValueError):
+        load_config(monkeypatch, GUNICORN_PROFILE="tornado")
+
+
+def test_bloom_filter_needs_the_postgres_bus(monkeypatch):
+    config = load_config(monkeypatch)
+    monkeypatch.setattr(bloom, "BLOOM_FILTER_ENABLED", True)
+    monkeypatch.setattr(invalidation, "INVALIDATION_BACKEND", "local")
+
+    def start(workers):
+        config["on_starting"](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    start(1)
+    with pytest.raises(RuntimeError):
+        start(2)
+
+    monkeypatch.setattr(invalidation, "INVALIDATION_BACKEND", "postgres")
+    start(2)
+
+
+def test_reset_after_fork(monkeypatch):
+    monkeypatch.setattr(database, "async_engine", object())
+
+    database.reset_after_fork()
+
+    assert database.async_engine is None
@@ -0,0 +1,203 @@
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from werkzeug.serving import make_server
+
+import app.routes as routes
+from app.cache import redirect_cache
+from app.clicklog import count_clicks
+from app.clicks import click_buffer
+from app.httpcache import CachePurger, etag_matches
+from main import app as flask_app
+
+
+def test_redirect_is_cacheable(client, create_link):
+    create_link("cached")
+
+    response = client.get("/r/cached")
+    assert response.status_code == 301
+    assert "s-maxage=60" in response.headers["Cache-Control"]
+    assert "stale-while-revalidate=30" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+
+    response = client.get("/r/cached", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert "Location" not in response.headers
+
+    response = client.get("/r/missing")
+    assert response.status_code == 404
+    assert response.headers["Cache-Control"] == "public, max-age=0, s-maxage=10"
+
+
+def test_etag_changes_with_target(client, create_link):
+    link_id = create_link("cached")
+    etag = client.get("/r/cached").headers["ETag"]
+
+    client.put(
+        f"/api/links/{link_id}",
+        data=json.dumps({"original_url": "https://example.com/2"}),
+        content_type="application/json",
+    )
+
+    response = client.get("/r/cached", headers={"If-None-Match": etag})
+    assert response.status_code == 301
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_matches():
+    assert etag_matches('"1-ab"', '"1-ab"')
+    assert etag_matches('W/"1-ab", "2-cd"', '"1-ab"')
+    assert etag_matches("*", '"1-ab"')
+    assert not etag_matches('"2-cd"', '"1-ab"')
+    assert not etag_matches(None, '"1-ab"')
+
+
+def test_refresh_skips_worker_cache(client, create_link):
+    link_id = create_link("cached")
+    redirect_cache.set("cached", (link_id, "https://stale.example.com"))
+
+    assert client.get("/r/cached").location == "https://stale.example.com"
+    response = client.get("/r/cached", headers={"X-Cache-Refresh": "1"})
+    assert response.location == "https://example.com/cached"
+
+
+def test_logged_clicks_are_not_counted_by_the_app(client, create_link):
+    create_link("cached")
+
+    client.get("/r/cached", headers={"X-Clicks-Logged": "1"})
+    assert click_buffer.pending() == {}
+
+
+# Stand-in for the nginx.conf redirect cache: honours s-maxage, re-fetches
+# and stores on X-Cache-Refresh, and logs every redirect it serves
+class CachingProxy(BaseHTTPRequestHandler):
+    backend = None
+    cache = {}
+    clicks = []
+
+    def do_GET(self):
+        refresh = "X-Cache-Refresh" in self.headers
+        entry = self.cache.get(self.path)
+        if entry and not refresh and entry[0] > time.monotonic():
+            self.respond(*entry[1:], "HIT")
+        else:
+            headers = {"X-Clicks-Logged": "1"}
+            if refresh:
+                headers["X-Cache-Refresh"] = "1"
+            status, response_headers, body = self.forward("GET", headers)
+            max_age = shared_max_age(response_headers.get("Cache-Control", ""))
+            if max_age:
+                self.cache[self.path] = (
+                    time.monotonic() + max_age,
+                    status,
+                    response_headers,
+                    body,
+                )
+            self.respond(status, response_headers, body, "MISS")
+
+    def forward(self, method, headers):
+        connection = http.client.HTTPConnection(*self.backend)
+        connection.request(method, self.path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        connection.close()
+        return response.status, dict(response.getheaders()), body
+
+    def respond(self, status, headers, body, cache_status):
+        # The purge server does not log clicks
+        if status in (301, 304) and "X-Cache-Refresh" not in self.headers:
+            self.clicks.append((time.time(), self.path.removeprefix("/r/")))
+        self.send_response(status)
+        for name in ("Location", "Cache-Control", "ETag"):
+            if name in headers:
+                self.send_header(name, headers[name])
+        self.send_header("X-Cache-Status", cache_status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def shared_max_age(cache_control):
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "s-maxage":
+            return int(value)
+    return 0
+
+
+@pytest.fixture
+def proxy(client, monkeypatch):
+    backend = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+
+    CachingProxy.backend = ("127.0.0.1", backend.server_port)
+    CachingProxy.cache = {}
+    CachingProxy.clicks = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CachingProxy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    purger = CachePurger(base_url, 2)
+    monkeypatch.setattr(routes, "cache_purger", purger)
+
+    def get(path):
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response
+
+    yield get, purger
+
+    server.shutdown()
+    backend.shutdown()
+
+
+def test_update_and_delete_purge_the_proxy_cache(client, proxy, create_link):
+    get, purger = proxy
+    link_id = create_link("cached")
+    purger.join()
+
+    # The purge on create already stored the redirect
+    response = get("/r/cached")
+    assert response.getheader("X-Cache-Status") == "HIT"
+    assert response.getheader("Location") == "https://example.com/cached"
+
+    client.put(
+        f"/api/links/{link_id}",
+        data=json.dumps({"original_url": "https://example.com/2"}),
+        content_type="application/json",
+    )
+    purger.join()
+
+    response = get("/r/cached")
+    assert response.getheader("X-Cache-Status") == "HIT"
+    assert response.getheader("Location") == "https://example.com/2"
+
+    client.delete(f"/api/links/{link_id}")
+    purger.join()
+
+    assert get("/r/cached").status == 404
+
+
+def test_cached_redirects_are_counted(client, proxy, create_link):
+    get, purger = proxy
+    create_link("cached")
+    purger.join()
+
+    for _ in range(3):
+        assert get("/r/cached").status == 301
+
+    # The purge of the new link is not a click, nor do the app's misses count
+    assert click_buffer.pending() == {}
+    assert count_clicks(CachingProxy.clicks) == 3
+    assert sum(click_buffer.pending().values()) == 3
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+import app.database as database
+from app.cache import MISSING, TTLCache
+from app.invalidation import (
+    NOTIFY_PAYLOAD_LIMIT,
+    RESET_PAYLOAD,
+    LocalInvalidationBus,
+    PostgresInvalidationBus,
+    create_bus,
+    default_backend,
+    notify_payloads,
+)
+
+
+def test_local_bus_invalidates_subscribers():
+    lru = TTLCache(maxsize=10, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    bus = LocalInvalidationBus()
+    bus.subscribe(lru.invalidate, lru.invalidate_all)
+
+    bus.publish("a")
+
+    assert lru.get("a") is MISSING
+    assert lru.get("b") == 2
+
+
+def test_postgres_bus_dispatches_notifications():
+    lru = TTLCache(maxsize=10, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    bus = PostgresInvalidationBus("test_channel")
+    bus.subscribe(lru.invalidate, lru.invalidate_all)
+
+    bus._dispatch(["a"])
+    assert lru.get("a") is MISSING
+    assert lru.get("b") == 2
+
+    bus._reset()
+    assert lru.get("b") is MISSING
+
+
+def test_postgres_bus_evicts_locally_when_notify_fails(client):
+    # The test engine is SQLite, so pg_notify is not available
+    lru = TTLCache(maxsize=10, ttl=60)
+    lru.set("a", 1)
+    bus = PostgresInvalidationBus("test_channel")
+    bus.subscribe(lru.invalidate)
+
+    bus.publish("a")
+
+    assert lru.get("a") is MISSING
+
+
+def test_notify_payloads_stay_under_the_postgres_limit():
+    short_names = [f"bulk-{i:04d}-" + "x" * 20 for i in range(500)]
+
+    payloads = notify_payloads(short_names)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) < NOTIFY_PAYLOAD_LIMIT for payload in payloads)
+    assert [name for p in payloads for name in json.loads(p)] == short_names
+    assert notify_payloads(["x" * NOTIFY_PAYLOAD_LIMIT]) == [RESET_PAYLOAD]
+
+
+def test_postgres_bus_broadcasts_reset_when_notify_fails(monkeypatch):
+    sent = []
+
+    def notify(payloads):
+        sent.append(payloads)
+        if len(sent) == 1:
+            raise RuntimeError("connection lost")
+
+    bus = PostgresInvalidationBus("test_channel")
+    monkeypatch.setattr(bus, "_notify", notify)
+
+    bus.publish("a", "b")
+
+    assert sent == [['["a","b"]'], [RESET_PAYLOAD]]
+
+
+def test_postgres_databases_default_to_the_postgres_bus():
+    assert default_backend("postgresql") == "postgres"
+    assert default_backend("sqlite") == "local"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_bus("redis")
+
+
+def test_postgres_bus_needs_a_direct_url_behind_a_pooler(monkeypatch):
+    # DB_EXTERNAL_POOLER without DATABASE_DIRECT_URL
+    monkeypatch.setattr(database, "DATABASE_DIRECT_URL", None)
+
+    with pytest.raises(ValueError, match="DATABASE_DIRECT_URL"):
+        create_bus("postgres")
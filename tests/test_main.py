@@ -1,3 +1,6 @@
+import csv
+import gzip
+import io
 import json
 
 
@@ -346,3 +349,337 @@ def test_get_all_links_without_pagination(client):
     assert response.headers["Content-Range"] == "links 1-5/5"
     data = response.get_json()
     assert len(data) == 5
+
+
+def test_redirect_after_update_is_not_stale(client):
+    create_response = client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/before", "short_name": "cached"}
+        ),
+        content_type="application/json",
+    )
+    link_id = create_response.get_json()["id"]
+    assert client.get("/r/cached").location == "https://example.com/before"
+
+    client.put(
+        f"/api/links/{link_id}",
+        data=json.dumps({"original_url": "https://example.com/after"}),
+        content_type="application/json",
+    )
+
+    response = client.get("/r/cached")
+    assert response.status_code == 301
+    assert response.location == "https://example.com/after"
+
+
+def test_redirect_after_rename_and_delete(client):
+    create_response = client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/page", "short_name": "oldcached"}
+        ),
+        content_type="application/json",
+    )
+    link_id = create_response.get_json()["id"]
+    assert client.get("/r/oldcached").status_code == 301
+    assert client.get("/r/newcached").status_code == 404
+
+    client.put(
+        f"/api/links/{link_id}",
+        data=json.dumps({"short_name": "newcached"}),
+        content_type="application/json",
+    )
+    assert client.get("/r/oldcached").status_code == 404
+    assert client.get("/r/newcached").status_code == 301
+
+    client.delete(f"/api/links/{link_id}")
+    assert client.get("/r/newcached").status_code == 404
+
+
+def test_redirect_negative_cache_invalidated_on_create(client):
+    assert client.get("/r/later").status_code == 404
+
+    client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/later", "short_name": "later"}
+        ),
+        content_type="application/json",
+    )
+
+    response = client.get("/r/later")
+    assert response.status_code == 301
+    assert response.location == "https://example.com/later"
+
+
+def test_cache_stats(client):
+    client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/stats", "short_name": "stats"}
+        ),
+        content_type="application/json",
+    )
+    client.get("/r/stats")
+    client.get("/r/stats")
+
+    response = client.get("/api/cache/stats")
+    assert response.status_code == 200
+    stats = response.get_json()["redirect"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_cursor_pagination(client):
+    for i in range(5):
+        client.post(
+            "/api/links",
+            data=json.dumps(
+                {"original_url": f"https://example.com/{i}", "short_name": f"link{i}"}
+            ),
+            content_type="application/json",
+        )
+
+    response = client.get("/api/links?cursor=&limit=2")
+    assert response.status_code == 200
+    assert [link["id"] for link in response.get_json()] == [1, 2]
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/links?cursor={next_cursor}&limit=2")
+    assert [link["id"] for link in response.get_json()] == [3, 4]
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/links?cursor={next_cursor}&limit=2")
+    assert [link["id"] for link in response.get_json()] == [5]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_cursor_pagination_invalid_cursor(client):
+    response = client.get("/api/links?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert "detail" in response.get_json()
+
+
+def test_cursor_pagination_invalid_limit(client):
+    response = client.get("/api/links?cursor=&limit=0")
+    assert response.status_code == 400
+    assert "detail" in response.get_json()
+
+
+def test_get_all_links_is_streamed_as_jsonify_output(client, monkeypatch):
+    monkeypatch.setattr("app.routes.LINKS_STREAM_CHUNK_SIZE", 2)
+    for i in range(3):
+        client.post(
+            "/api/links",
+            data=json.dumps(
+                {"original_url": f"https://example.com/{i}", "short_name": f"link{i}"}
+            ),
+            content_type="application/json",
+        )
+    links = client.get("/api/links?range=[0,2]").get_json()
+
+    response = client.get("/api/links")
+    assert response.is_streamed
+    assert response.mimetype == "application/json"
+    expected = json.dumps(links, separators=(",", ":"), sort_keys=True) + "\n"
+    assert response.data == expected.encode()
+
+
+def test_get_empty_links_list_is_streamed_as_jsonify_output(client):
+    response = client.get("/api/links")
+    assert response.data == b"[]\n"
+    assert response.headers["Content-Range"] == "links */0"
+
+
+def test_export_links_ndjson(client, create_links):
+    create_links(3)
+    links = client.get("/api/links?range=[0,2]").get_json()
+
+    response = client.get("/api/links/export?format=ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.data.decode().splitlines()
+    assert [json.loads(line) for line in lines] == links
+
+
+def test_export_links_csv(client, create_links):
+    create_links(3)
+    links = client.get("/api/links?range=[0,2]").get_json()
+
+    response = client.get("/api/links/export?format=csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row["short_url"] for row in rows] == [link["short_url"] for link in links]
+    assert rows[0]["id"] == str(links[0]["id"])
+
+
+def test_export_links_gzip(client, create_links):
+    create_links(3)
+    links = client.get("/api/links?range=[0,2]").get_json()
+
+    response = client.get("/api/links/export?format=ndjson&gzip=1")
+    assert response.mimetype == "application/gzip"
+    assert "links.ndjson.gz" in response.headers["Content-Disposition"]
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert len(lines) == len(links)
+
+
+def test_export_links_invalid_format(client):
+    response = client.get("/api/links/export?format=xml")
+    assert response.status_code == 400
+    assert "detail" in response.get_json()
+
+
+def test_bulk_create_links(client):
+    client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/taken", "short_name": "taken"}
+        ),
+        content_type="application/json",
+    )
+
+    response = client.post(
+        "/api/links/bulk",
+        data=json.dumps(
+            [
+                {"original_url": "https://example.com/1", "short_name": "bulk1"},
+                {"original_url": "https://example.com/2", "short_name": "taken"},
+                {"original_url": "not-a-url", "short_name": "bulk3"},
+                {"original_url": "https://example.com/4", "short_name": "bulk1"},
+                {"original_url": "https://example.com/5", "short_name": "bulk5"},
+            ]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["created"] == 2
+    assert data["duplicates"] == 2
+    assert data["invalid"] == 1
+    assert [item["status"] for item in data["items"]] == [201, 409, 422, 409, 201]
+    assert data["items"][0]["link"]["short_url"] == "http://testserver/r/bulk1"
+    assert data["items"][2]["detail"][0]["loc"][:2] == ["body", 2]
+
+    response = client.get("/r/bulk5", follow_redirects=False)
+    assert response.location == "https://example.com/5"
+
+
+def test_bulk_create_links_ndjson_in_batches(client, monkeypatch):
+    monkeypatch.setattr("app.routes.BULK_INSERT_BATCH_SIZE", 2)
+    lines = [
+        json.dumps({"original_url": f"https://example.com/{i}", "short_name": f"n{i}"})
+        for i in range(5)
+    ]
+    lines.insert(2, "{not json")
+
+    response = client.post(
+        "/api/links/bulk",
+        data="\n".join(lines) + "\n",
+        content_type="application/x-ndjson",
+    )
+
+    data = response.get_json()
+    assert data["created"] == 5
+    assert data["invalid"] == 1
+    assert [item["index"] for item in data["items"]] == list(range(6))
+    assert client.get("/api/links?range=[0,9]").headers["Content-Range"] == (
+        "links 1-5/5"
+    )
+
+
+def test_bulk_create_links_requires_array(client):
+    response = client.post(
+        "/api/links/bulk",
+        data=json.dumps({"original_url": "https://example.com"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+
+def test_links_list_etag_revalidation(client):
+    client.post("/api/links", json={"original_url": "https://example.com/a"})
+    response = client.get("/api/links?range=[0,9]")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = client.get("/api/links?range=[0,9]", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # Every mode of the listing shares the version
+    response = client.get("/api/links?cursor=", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.get("/api/links", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_links_list_etag_changes_on_writes(client):
+    response = client.post("/api/links", json={"original_url": "https://example.com/a"})
+    link_id = response.get_json()["id"]
+    etags = [client.get("/api/links").headers["ETag"]]
+
+    client.post("/api/links", json={"original_url": "https://example.com/b"})
+    etags.append(client.get("/api/links").headers["ETag"])
+    client.put(f"/api/links/{link_id}", json={"original_url": "https://example.com/c"})
+    etags.append(client.get("/api/links").headers["ETag"])
+    client.delete(f"/api/links/{link_id}")
+    etags.append(client.get("/api/links").headers["ETag"])
+    client.post("/api/links/bulk", json=[{"original_url": "https://example.com/d"}])
+    etags.append(client.get("/api/links").headers["ETag"])
+
+    assert len(set(etags)) == len(etags)
+
+
+def test_links_list_etag_ignores_failed_writes(client):
+    client.post("/api/links", json={"original_url": "https://a.com", "short_name": "a"})
+    response = client.post("/api/links", json={"original_url": "https://b.com"})
+    link_id = response.get_json()["id"]
+    etag = client.get("/api/links").headers["ETag"]
+
+    response = client.put(f"/api/links/{link_id}", json={"short_name": "a"})
+    assert response.status_code == 409
+    response = client.post("/api/links/bulk", json=[{"short_name": "a"}])
+    assert response.get_json()["invalid"] == 1
+
+    assert client.get("/api/links").headers["ETag"] == etag
+
+
+def test_links_list_etag_changes_when_the_last_link_is_replaced(client):
+    client.post("/api/links", json={"original_url": "https://example.com/a"})
+    response = client.post("/api/links", json={"original_url": "https://example.com/b"})
+    link_id = response.get_json()["id"]
+    etag = client.get("/api/links").headers["ETag"]
+
+    # SQLite hands the highest id out again, so max(id) is unchanged
+    client.delete(f"/api/links/{link_id}")
+    response = client.post("/api/links", json={"original_url": "https://example.com/c"})
+    assert response.get_json()["id"] == link_id
+
+    assert client.get("/api/links").headers["ETag"] != etag
+
+
+def test_link_etag_revalidation(client):
+    response = client.post("/api/links", json={"original_url": "https://example.com/a"})
+    link_id = response.get_json()["id"]
+
+    response = client.get(f"/api/links/{link_id}")
+    etag = response.headers["ETag"]
+    response = client.get(f"/api/links/{link_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.put(f"/api/links/{link_id}", json={"original_url": "https://example.com/b"})
+    response = client.get(f"/api/links/{link_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["original_url"] == "https://example.com/b"
+    assert response.headers["ETag"] != etag
+
+    client.delete(f"/api/links/{link_id}")
+    response = client.get(f"/api/links/{link_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 404
@@ -0,0 +1,116 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+
+ROOT = Path(__file__).parent.parent
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_counted_per_endpoint_and_status(client):
+    labels = {"endpoint": "redirect_to_original", "method": "GET"}
+    found = sample("http_requests_total", status="301", **labels)
+    not_found = sample("http_requests_total", status="404", **labels)
+
+    client.post(
+        "/api/links",
+        data=json.dumps({"original_url": "https://example.com", "short_name": "m"}),
+        content_type="application/json",
+    )
+    client.get("/r/m")
+    client.get("/r/missing")
+
+    assert sample("http_requests_total", status="301", **labels) == found + 1
+    assert sample("http_requests_total", status="404", **labels) == not_found + 1
+    assert (
+        sample(
+            "http_request_duration_seconds_count",
+            endpoint="create_link",
+            method="POST",
+            status="201",
+        )
+        >= 1
+    )
+
+
+def test_unknown_paths_share_one_label(client):
+    before = sample(
+        "http_requests_total", endpoint="unmatched", method="GET", status="404"
+    )
+    client.get("/no/such/page")
+    client.get("/another/page")
+
+    after = sample(
+        "http_requests_total", endpoint="unmatched", method="GET", status="404"
+    )
+    assert after == before + 2
+
+
+def test_database_time_is_recorded_per_request(client):
+    count = sample("http_request_db_seconds_count", endpoint="get_links")
+    queries = sample("http_request_db_queries_sum", endpoint="get_links")
+
+    client.get("/api/links?range=[0,9]")
+
+    assert sample("http_request_db_seconds_count", endpoint="get_links") == count + 1
+    # The version for the ETag, the page and the total count
+    assert sample("http_request_db_queries_sum", endpoint="get_links") == queries + 3
+
+
+def test_raw_redirect_lookup_is_recorded(client):
+    queries = sample("http_request_db_queries_sum", endpoint="redirect_to_original")
+
+    # Served from the redirect cache the second time
+    client.get("/r/missing")
+    client.get("/r/missing")
+
+    after = sample("http_request_db_queries_sum", endpoint="redirect_to_original")
+    assert after == queries + 1
+
+
+def test_metrics_endpoint(client):
+    client.get("/ping")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{endpoint="ping"' in body
+    assert "db_pool_checked_out" in body
+
+
+WORKER = """
+from app import metrics
+metrics.observe_request("ping", "GET", 200, 0.01, [0.0, 0])
+"""
+
+SCRAPE = """
+from flask import Flask
+from app import metrics
+app = Flask(__name__)
+metrics.init_app(app)
+print(app.test_client().get("/metrics").get_data(as_text=True))
+"""
+
+
+def test_workers_are_aggregated_in_multiprocess_mode(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, cwd=ROOT, check=True)
+
+    result = subprocess.run(
+        [sys.executable, "-c", SCRAPE],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    line = 'http_requests_total{endpoint="ping",method="GET",status="200"} 2.0'
+    assert line in result.stdout
@@ -0,0 +1,63 @@
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine
+
+import app.pool as pool
+from app.pool import Histogram, InstrumentedQueuePool, PoolMetrics, engine_options
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram([0.1, 1])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 1, "1": 2, "+Inf": 3}
+    assert snapshot["count"] == 3
+
+
+def test_pool_metrics_track_checkouts(tmp_path, monkeypatch):
+    metrics = PoolMetrics()
+    monkeypatch.setattr(pool, "pool_metrics", metrics)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+    )
+    metrics.attach(engine.pool)
+
+    with engine.connect() as first, engine.connect():
+        first.execute(text("SELECT 1"))
+        stats = metrics.stats(engine.pool)
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+
+    stats = metrics.stats(engine.pool)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["connects"] == 2
+    assert stats["checkout_wait_seconds"]["count"] == 2
+    engine.dispose()
+
+
+def test_engine_options(monkeypatch):
+    assert engine_options("sqlite") == {}
+
+    options = engine_options("postgresql")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == pool.DB_POOL_SIZE
+    assert options["connect_args"]["prepare_threshold"] is None
+    assert "poolclass" not in engine_options("postgresql", is_async=True)
+
+    monkeypatch.setattr(pool, "DB_EXTERNAL_POOLER", True)
+    options = engine_options("postgresql")
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+
+
+def test_pool_stats_endpoint(client):
+    response = client.get("/api/pool/stats")
+    assert response.status_code == 200
+    assert "checkout_wait_seconds" in response.get_json()
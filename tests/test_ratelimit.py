@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+import app.ratelimit as ratelimit
+from app.ratelimit import Limit, LocalRateLimiter, client_key, parse_limits
+from main import create_app
+
+CLIENT = {"X-Real-IP": "203.0.113.7"}
+
+
+@pytest.fixture
+def limited_client(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "limiter", LocalRateLimiter(1000))
+    monkeypatch.setattr(
+        ratelimit,
+        "RATE_LIMITS",
+        {"redirect": Limit(rate=1, burst=3), "write": Limit(rate=1, burst=2)},
+    )
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as test_client:
+        yield test_client
+
+
+def test_token_bucket_allows_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    limiter = LocalRateLimiter(1000)
+    limit = Limit(rate=2, burst=3)
+
+    assert [limiter.acquire("a", limit) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a", limit) == pytest.approx(0.5)
+    # Other keys have their own bucket
+    assert limiter.acquire("b", limit) == 0
+
+    now[0] += 0.5
+    assert limiter.acquire("a", limit) == 0
+    assert limiter.acquire("a", limit) > 0
+
+    # An idle key is back to a full bucket
+    now[0] += 10
+    assert [limiter.acquire("a", limit) for _ in range(3)] == [0, 0, 0]
+
+
+def test_local_limiter_evicts_keys_beyond_its_size():
+    limiter = LocalRateLimiter(max_keys=10)
+    for i in range(100):
+        limiter.acquire(f"client{i}", Limit(rate=1, burst=5))
+
+    assert len(limiter._arrivals) <= 10
+
+
+def test_redirects_over_the_limit_get_429(limited_client):
+    limited_client.post(
+        "/api/links",
+        json={"original_url": "https://example.com", "short_name": "hot"},
+    )
+
+    statuses = [
+        limited_client.get("/r/hot", headers=CLIENT).status_code for _ in range(4)
+    ]
+    assert statuses == [301, 301, 301, 429]
+
+    response = limited_client.get("/r/hot", headers=CLIENT)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "detail" in response.get_json()
+
+    # Another client, and reads, are not affected
+    assert (
+        limited_client.get("/r/hot", headers={"X-Real-IP": "198.51.100.1"}).status_code
+        == 301
+    )
+    assert limited_client.get("/api/links", headers=CLIENT).status_code == 200
+
+
+def test_writes_are_limited_separately(limited_client):
+    for _ in range(3):
+        limited_client.get("/r/missing", headers=CLIENT)
+
+    statuses = [
+        limited_client.post(
+            "/api/links", json={"original_url": "https://example.com"}, headers=CLIENT
+        ).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [201, 201, 429]
+
+
+def test_limit_refills(limited_client):
+    for _ in range(3):
+        limited_client.get("/r/missing", headers=CLIENT)
+    assert limited_client.get("/r/missing", headers=CLIENT).status_code == 429
+
+    time.sleep(1.05)
+    assert limited_client.get("/r/missing", headers=CLIENT).status_code == 404
+
+
+def test_proxy_requests_without_client_ip_are_not_limited(limited_client):
+    # Cache refreshes from nginx's purge server
+    statuses = [limited_client.get("/r/missing").status_code for _ in range(10)]
+    assert 429 not in statuses
+
+
+def test_client_key(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_API_KEYS", {"partner"})
+
+    assert client_key("127.0.0.1", CLIENT) == "ip:203.0.113.7"
+    assert client_key("127.0.0.1", {}) is None
+    # X-Real-IP is only trusted from the proxy
+    assert client_key("192.0.2.1", CLIENT) == "ip:192.0.2.1"
+    assert client_key("192.0.2.1", {"X-API-Key": "partner"}) == "key:partner"
+    # Unknown keys could be made up per request
+    assert client_key("192.0.2.1", {"X-API-Key": "made-up"}) == "ip:192.0.2.1"
+
+
+def test_parse_limits():
+    assert parse_limits("redirect=50:200, write=0.5:10") == {
+        "redirect": Limit(50, 200),
+        "write": Limit(0.5, 10),
+    }
+    assert parse_limits("") == {}
+
+    for value in ("reads=1:1", "write=0:10", "write=1:0", "write=fast"):
+        with pytest.raises(ValueError):
+            parse_limits(value)
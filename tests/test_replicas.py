@@ -0,0 +1,160 @@
+import time
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import app.database as database
+from app.cache import redirect_cache
+from app.database import ReplicaRouter
+from app.destinations import intern_destination
+from app.httpcache import REFRESH_HEADER
+from app.invalidation import invalidation_bus
+from app.models import Link
+
+STICKINESS = 0.2
+
+
+def add_link(engine, short_name: str) -> int:
+    with Session(engine) as session:
+        url = f"https://example.com/{short_name}"
+        link = Link(
+            short_name=short_name,
+            destination_id=intern_destination(session.connection(), url),
+            created_at=datetime.now(),
+        )
+        session.add(link)
+        session.commit()
+        return link.id
+
+
+# Two SQLite files stand in for the primary and a replica that never
+# receives the primary's writes
+@pytest.fixture
+def databases(client, tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    SQLModel.metadata.create_all(primary)
+    router = ReplicaRouter(
+        [f"sqlite:///{tmp_path / 'replica.db'}"], "round_robin", STICKINESS
+    )
+    SQLModel.metadata.create_all(router.engines[0])
+
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replicas", router)
+
+    yield primary, router.engines[0]
+
+    primary.dispose()
+    router.engines[0].dispose()
+
+
+def test_reads_go_to_the_replica(client, databases):
+    _, replica = databases
+    link_id = add_link(replica, "replicated")
+
+    response = client.get("/r/replicated")
+    assert response.status_code == 301
+    assert response.headers["Location"] == "https://example.com/replicated"
+
+    assert client.get(f"/api/links/{link_id}").status_code == 200
+    links = client.get("/api/links?range=[0,9]").get_json()
+    assert [link["short_name"] for link in links] == ["replicated"]
+
+
+def test_writes_go_to_the_primary(client, databases):
+    primary, replica = databases
+    response = client.post("/api/links", json={"original_url": "https://example.com"})
+    short_name = response.get_json()["short_name"]
+
+    with Session(primary) as session:
+        assert session.exec(select(Link.short_name)).all() == [short_name]
+    with Session(replica) as session:
+        assert session.exec(select(Link.short_name)).all() == []
+
+
+def test_reads_stick_to_the_primary_after_a_write(client, databases):
+    response = client.post("/api/links", json={"original_url": "https://example.com"})
+    link = response.get_json()
+
+    assert client.get(f"/api/links/{link['id']}").status_code == 200
+    assert client.get(f"/r/{link['short_name']}").status_code == 301
+
+    # The replica never catches up in this test
+    time.sleep(STICKINESS)
+    redirect_cache.clear()
+    assert client.get(f"/api/links/{link['id']}").status_code == 404
+    assert client.get(f"/r/{link['short_name']}").status_code == 404
+
+
+def test_links_changed_elsewhere_stick_only_their_names(client, databases):
+    primary, replica = databases
+    add_link(primary, "changed")
+    add_link(replica, "replicated")
+
+    # As delivered by the bus from another worker
+    invalidation_bus._dispatch(["changed"])
+
+    assert client.get("/r/changed").status_code == 301
+    assert client.get("/r/replicated").status_code == 301
+    links = client.get("/api/links?range=[0,9]").get_json()
+    assert [link["short_name"] for link in links] == ["replicated"]
+
+    time.sleep(STICKINESS)
+    redirect_cache.clear()
+    assert client.get("/r/changed").status_code == 404
+
+
+def test_lost_invalidations_stick_the_worker(client, databases):
+    primary, _ = databases
+    add_link(primary, "changed")
+
+    invalidation_bus._reset()
+
+    links = client.get("/api/links?range=[0,9]").get_json()
+    assert [link["short_name"] for link in links] == ["changed"]
+
+
+def test_expired_names_are_pruned(monkeypatch):
+    router = ReplicaRouter([], "round_robin", 0)
+    monkeypatch.setattr(router, "prune_size", 2)
+
+    router.stick_names_to_primary("a", "b", "c")
+    router.stick_names_to_primary("d")
+    assert list(router._names_until) == ["d"]
+
+
+def test_cache_refresh_reads_the_primary(client, databases):
+    primary, _ = databases
+    add_link(primary, "fresh")
+
+    assert client.get("/r/fresh").status_code == 404
+    response = client.get("/r/fresh", headers={REFRESH_HEADER: "1"})
+    assert response.status_code == 301
+
+
+def test_round_robin(tmp_path):
+    urls = [f"sqlite:///{tmp_path / f'replica{i}.db'}" for i in range(2)]
+    router = ReplicaRouter(urls, "round_robin", STICKINESS)
+
+    picked = [router.engine() for _ in range(4)]
+    assert picked == router.engines * 2
+
+
+def test_least_connections(tmp_path):
+    urls = [f"sqlite:///{tmp_path / f'replica{i}.db'}" for i in range(2)]
+    router = ReplicaRouter(urls, "least_connections", STICKINESS)
+
+    with router.engines[0].connect():
+        assert router.engine() is router.engines[1]
+    with router.engines[1].connect():
+        assert router.engine() is router.engines[0]
+
+
+def test_without_replicas_reads_use_the_primary():
+    router = ReplicaRouter([], "round_robin", STICKINESS)
+    assert router.engine() is database.engine
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        ReplicaRouter([], "random", STICKINESS)
@@ -0,0 +1,90 @@
+import pytest
+
+import app.search as search
+
+LINKS = [
+    ("docs", "https://docs.example.com/guide"),
+    ("docs-v2", "https://example.org/v2"),
+    ("blog", "https://blog.test/posts/docs"),
+    ("shop", "https://SHOP.example.com/cart?x=100%_off"),
+]
+
+
+@pytest.fixture
+def links(client):
+    for short_name, original_url in LINKS:
+        response = client.post(
+            "/api/links", json={"original_url": original_url, "short_name": short_name}
+        )
+        assert response.status_code == 201
+
+
+def short_names(response) -> list[str]:
+    return [link["short_name"] for link in response.get_json()]
+
+
+def test_search_short_name_prefix_and_url_substring(client, links):
+    response = client.get("/api/links?q=doc&range=[0,9]")
+    assert response.status_code == 200
+    # Prefix of docs and docs-v2, substring of blog's URL
+    assert short_names(response) == ["docs", "docs-v2", "blog"]
+    assert response.headers["Content-Range"] == "links 1-3/3"
+
+
+def test_search_by_domain_ignores_case(client, links):
+    response = client.get("/api/links?q=example.com&range=[0,9]")
+    assert short_names(response) == ["docs", "shop"]
+
+    response = client.get("/api/links?q=shop.EXAMPLE&range=[0,9]")
+    assert short_names(response) == ["shop"]
+
+
+def test_search_by_short_name_ignores_case(client, links):
+    # Only SQLite's LIKE ignores case by itself
+    response = client.get("/api/links?q=DOCS-V&range=[0,9]")
+    assert short_names(response) == ["docs-v2"]
+
+
+def test_search_pages_with_range(client, links):
+    response = client.get("/api/links?q=doc&range=[1,1]")
+    assert short_names(response) == ["docs-v2"]
+    assert response.headers["Content-Range"] == "links 2-2/3"
+
+    response = client.get("/api/links?q=nothing&range=[0,9]")
+    assert response.get_json() == []
+    assert response.headers["Content-Range"] == "links */0"
+
+
+def test_search_wildcards_are_literal(client, links):
+    response = client.get("/api/links?q=100%25_off&range=[0,9]")
+    assert short_names(response) == ["shop"]
+
+    response = client.get("/api/links?q=d_cs&range=[0,9]")
+    assert response.get_json() == []
+
+
+def test_search_with_cursor_and_stream(client, links):
+    response = client.get("/api/links?q=doc&cursor=&limit=2")
+    assert short_names(response) == ["docs", "docs-v2"]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/links?q=doc&cursor={cursor}&limit=2")
+    assert short_names(response) == ["blog"]
+
+    response = client.get("/api/links?q=doc")
+    assert short_names(response) == ["docs", "docs-v2", "blog"]
+    assert response.headers["Content-Range"] == "links 1-3/3"
+
+
+def test_search_count_limit(client, links, monkeypatch):
+    monkeypatch.setattr(search, "LINKS_SEARCH_COUNT_LIMIT", 2)
+
+    response = client.get("/api/links?q=doc&range=[0,0]")
+    assert response.headers["Content-Range"] == "links 1-1/2 (estimated)"
+
+
+@pytest.mark.parametrize("q", ["", "ab", "  ab  ", "x" * 201])
+def test_invalid_search(client, q):
+    response = client.get("/api/links", query_string={"q": q, "range": "[0,9]"})
+    assert response.status_code == 400
+    assert "detail" in response.get_json()
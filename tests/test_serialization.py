@@ -0,0 +1,79 @@
+import dataclasses
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.serialization import OrjsonProvider
+
+pytest.importorskip("orjson")
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: float
+
+
+PAYLOADS = [
+    [
+        {
+            "id": 1,
+            "original_url": "https://example.com/a?b=c&d=%20",
+            "short_name": "abc",
+            "short_url": "http://testserver/r/abc",
+            "created_at": "2026-10-18T12:00:00.123456",
+        }
+    ],
+    {"detail": 'Short name "x" already exists', "b": None, "a": [True, False]},
+    {"detail": "Invalid range format. Expected [start,end], got: [ä,ö]"},
+    {"emoji": "\U0001f517", "escapes": "<tab>\t</tab> "},
+    # DEL is ASCII, but only json.dumps escapes it
+    {"controls": "\x00\x01\x08\x1f", "delete": "a\x7fb"},
+    {"ratios": [0.0, 1.0, 0.1, 1 / 3, 1e-5, 2.5e-7, 1e16, 1e22, -0.0]},
+    {"big": 2**70, "small": -(2**63)},
+    {"when": datetime(2026, 10, 18, 12, 0), "day": date(2026, 10, 18)},
+    {"id": uuid.UUID(int=1), "amount": Decimal("1.10"), "point": Point(1, 2.0)},
+    [],
+    {},
+    "pong",
+]
+
+
+@pytest.fixture
+def providers():
+    # Providers only hold a weak reference to the app
+    app = Flask(__name__)
+    yield DefaultJSONProvider(app), OrjsonProvider(app)
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_orjson_provider_matches_stdlib(providers, payload):
+    stdlib, orjson = providers
+    for kwargs in ({"separators": (",", ":")}, {"indent": 2}, {}):
+        assert orjson.dumps(payload, **kwargs) == stdlib.dumps(payload, **kwargs)
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_orjson_provider_response_matches_jsonify(providers, payload):
+    stdlib, orjson = providers
+    assert orjson.response(payload).data == stdlib.response(payload).data
+
+
+def test_link_list_is_byte_identical_with_both_providers(client, monkeypatch):
+    for i in range(3):
+        client.post("/api/links", json={"original_url": f"https://example.com/{i}"})
+
+    app = client.application
+    responses = {}
+    for provider_class in (DefaultJSONProvider, OrjsonProvider):
+        monkeypatch.setattr(app, "json", provider_class(app))
+        responses[provider_class] = [
+            client.get(path).data
+            for path in ("/api/links", "/api/links?range=[0,1]", "/api/links/1")
+        ]
+
+    assert responses[DefaultJSONProvider] == responses[OrjsonProvider]
@@ -0,0 +1,103 @@
+import json
+
+import app.database as database
+import app.shortnames as shortnames
+from app.schemas import validate_short_name
+from app.shortnames import RandomAllocator, encode, scramble
+
+
+class StubAllocator:
+    def __init__(self, names):
+        self.names = iter(names)
+
+    def reserve(self, connection, count):
+        return [(None, next(self.names)) for _ in range(count)]
+
+
+def test_encode_is_fixed_length_lowercase_base36():
+    assert encode(0, 4) == "0000"
+    assert encode(35, 4) == "000z"
+    assert encode(36, 4) == "0010"
+
+
+def test_scramble_is_a_bijection():
+    names = {scramble(number, 2) for number in range(36**2)}
+    assert len(names) == 36**2
+    assert all(validate_short_name(name) == name for name in names)
+
+
+def test_random_allocator_skips_taken_names(client, monkeypatch):
+    client.post(
+        "/api/links",
+        data=json.dumps({"original_url": "https://example.com", "short_name": "aa"}),
+        content_type="application/json",
+    )
+    candidates = iter("aaaabbcc")
+    monkeypatch.setattr(shortnames.secrets, "choice", lambda _: next(candidates))
+
+    allocator = RandomAllocator(length=2, block_size=2)
+    with database.engine.connect() as connection:
+        reserved = allocator.reserve(connection, 2)
+
+    assert sorted(name for _, name in reserved) == ["bb", "cc"]
+
+
+def test_create_link_with_generated_short_name(client):
+    response = client.post(
+        "/api/links",
+        data=json.dumps({"original_url": "https://example.com/generated"}),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 201
+    short_name = response.get_json()["short_name"]
+    assert len(short_name) == shortnames.SHORT_NAME_LENGTH
+    assert validate_short_name(short_name) == short_name
+
+    response = client.get(f"/r/{short_name}")
+    assert response.location == "https://example.com/generated"
+
+
+def test_generated_short_name_clash_is_retried(client, monkeypatch):
+    client.post(
+        "/api/links",
+        data=json.dumps(
+            {"original_url": "https://example.com/custom", "short_name": "clash"}
+        ),
+        content_type="application/json",
+    )
+    monkeypatch.setattr(
+        shortnames,
+        "short_name_allocator",
+        StubAllocator(["clash", "clash", "free1", "free2"]),
+    )
+
+    response = client.post(
+        "/api/links",
+        data=json.dumps({"original_url": "https://example.com/generated"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    assert response.get_json()["short_name"] == "free1"
+
+    response = client.post(
+        "/api/links/bulk",
+        data=json.dumps([{"original_url": "https://example.com/bulk"}]),
+        content_type="application/json",
+    )
+    assert response.get_json()["items"][0]["link"]["short_name"] == "free2"
+
+
+def test_bulk_create_links_with_generated_short_names(client):
+    response = client.post(
+        "/api/links/bulk",
+        data=json.dumps(
+            [{"original_url": f"https://example.com/{i}"} for i in range(5)]
+        ),
+        content_type="application/json",
+    )
+
+    data = response.get_json()
+    assert data["created"] == 5
+    short_names = {item["link"]["short_name"] for item in data["items"]}
+    assert len(short_names) == 5
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import app.database as database
+from app.migrations import direct_engine, upgrade
+
+ROOT = Path(__file__).parent.parent
+# Cumulative `python -X importtime` time of `import main`, generous for CI
+IMPORT_TIME_BUDGET_US = 2_000_000
+LAZY_MODULES = {"alembic", "flask_cors", "psycopg", "sentry_sdk"}
+
+
+def import_main(database_url: str) -> dict[str, int]:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    env.pop("SENTRY_DSN", None)
+    env.pop("DEBUG", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env,
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    # "import time:  self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def test_import_is_fast_and_does_not_touch_the_database(tmp_path):
+    database_path = tmp_path / "links.db"
+    imports = import_main(f"sqlite:///{database_path}")
+
+    assert imports["main"] < IMPORT_TIME_BUDGET_US
+    assert LAZY_MODULES.isdisjoint(imports)
+    assert not database_path.exists()
+
+
+def test_migrations_upgrade_to_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'links.db'}")
+
+    upgrade(engine)
+    # Already at head: a no-op
+    upgrade(engine)
+
+    assert {"link", "click_stat", "alembic_version"} <= set(
+        inspect(engine).get_table_names()
+    )
+    with engine.connect() as connection:
+        versions = connection.execute(text("SELECT version_num FROM alembic_version"))
+        assert len(versions.all()) == 1
+    engine.dispose()
+
+
+def test_migrations_connect_to_the_direct_url(tmp_path, monkeypatch):
+    path = tmp_path / "direct.db"
+    monkeypatch.setattr(database, "DATABASE_DIRECT_URL", f"sqlite:///{path}")
+
+    upgrade()
+
+    engine = create_engine(f"sqlite:///{path}")
+    assert "link" in inspect(engine).get_table_names()
+    engine.dispose()
+
+
+def test_migrations_need_a_direct_url_behind_a_pooler(monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_DIRECT_URL", None)
+
+    with pytest.raises(ValueError, match="DATABASE_DIRECT_URL"):
+        direct_engine()
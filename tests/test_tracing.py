@@ -0,0 +1,47 @@
+import pytest
+
+from app.tracing import DEFAULT_ENDPOINT_RATES, TracesSampler, parse_rates
+from main import app as flask_app
+
+
+def sampling_context(path, method="GET", **extra):
+    return {"wsgi_environ": {"PATH_INFO": path, "REQUEST_METHOD": method}, **extra}
+
+
+@pytest.fixture
+def sampler():
+    rates = {**DEFAULT_ENDPOINT_RATES, "create_link": 0.5}
+    return TracesSampler(flask_app.url_map, 0.1, rates)
+
+
+def test_hot_paths_are_rarely_traced(sampler):
+    assert sampler(sampling_context("/ping")) == 0.0
+    assert sampler(sampling_context("/r/example")) == 0.001
+
+
+def test_rate_per_endpoint(sampler):
+    assert sampler(sampling_context("/api/links", "POST")) == 0.5
+    assert sampler(sampling_context("/api/links", "GET")) == 0.1
+    assert sampler(sampling_context("/api/links/1", "PUT")) == 0.1
+
+
+def test_unknown_paths_use_default_rate(sampler):
+    assert sampler(sampling_context("/no/such/page")) == 0.1
+    assert sampler(sampling_context("/ping", "DELETE")) == 0.1
+
+
+def test_parent_decision_is_kept(sampler):
+    assert sampler(sampling_context("/ping", parent_sampled=True)) == 1.0
+    assert sampler(sampling_context("/api/links", parent_sampled=False)) == 0.0
+
+
+def test_parse_rates():
+    assert parse_rates("") == {}
+    assert parse_rates("ping=0, create_link=0.25") == {
+        "ping": 0.0,
+        "create_link": 0.25,
+    }
+
+    for value in ("ping", "ping=fast", "ping=2", "=0.5"):
+        with pytest.raises(ValueError):
+            parse_rates(value)